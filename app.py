@@ -8,6 +8,15 @@ from flask import Flask
 from config import SECRET_KEY, DEBUG
 from db import close_db
 from utils import format_sei
+from indices import comando_advisor
+from portarias import comando_backfill
+import log_estruturado
+import perfilamento
+import instrumentacao
+import metricas
+import disjuntor
+import compressao
+import estaticos
 
 # Importar blueprints
 from routes.main import main_bp
@@ -17,6 +26,10 @@ from routes.instrucoes import instrucoes_bp
 from routes.despesas import despesas_bp
 from routes.parcerias import parcerias_bp
 from routes.listas import listas_bp
+from routes.importacao import importacao_bp
+from routes.jobs import jobs_bp
+from routes.metricas import metricas_bp
+from routes.perfis import perfis_bp
 
 
 def create_app():
@@ -30,6 +43,27 @@ def create_app():
     # Registrar função de limpeza do banco de dados
     app.teardown_appcontext(close_db)
     
+    # Compressão brotli/gzip das respostas; registrada primeiro para rodar depois dos demais ganchos
+    compressao.instalar(app)
+    
+    # Log estruturado (JSON, nível em LOG_NIVEL) com request_id por requisição
+    log_estruturado.instalar(app)
+    
+    # Perfilamento sob demanda (cProfile) de qualquer rota, antes dos demais ganchos
+    perfilamento.instalar(app)
+    
+    # Medir SQL por requisição (Server-Timing e log de consultas lentas)
+    instrumentacao.instalar(app)
+    
+    # Latência, tempo de SQL e contadores expostos em /metrics
+    metricas.instalar(app)
+    
+    # Banco com circuito aberto responde 503 em vez de 500 (ver disjuntor.py)
+    disjuntor.instalar(app)
+    
+    # JS/CSS das páginas minificados, com hash no nome e cache de um ano (helper estatico())
+    estaticos.instalar(app)
+    
     # Registrar filtro Jinja2 para formatação de SEI
     @app.template_filter("format_sei")
     def format_sei_filter(sei_number):
@@ -60,6 +94,16 @@ def create_app():
     app.register_blueprint(despesas_bp)
     app.register_blueprint(parcerias_bp)
     app.register_blueprint(listas_bp)
+    app.register_blueprint(importacao_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(metricas_bp)
+    app.register_blueprint(perfis_bp)
+    
+    # Comando de linha: flask --app app indices-advisor
+    app.cli.add_command(comando_advisor)
+    
+    # Comando de linha: flask --app app portarias-backfill [--aplicar]
+    app.cli.add_command(comando_backfill)
     
     return app
 
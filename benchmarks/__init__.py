@@ -0,0 +1,105 @@
+"""
+Benchmarks reprodutíveis dos principais endpoints
+
+Os scripts de testes/ verificam se as rotas funcionam; este pacote mede
+quanto tempo elas levam com um volume de dados próximo ao de produção, para
+comparar commits entre si:
+
+ 1. `gerar` popula os bancos configurados (DB_LOCAL_* e DB_RAILWAY_*, de
+    preferência dois bancos PostgreSQL locais) com dados sintéticos (ver
+    dados_sinteticos.py): ~2.600 termos × rubricas × categorias × 60 meses;
+ 2. `medir` roda os cenários de cenarios.py com o cliente de teste do Flask
+    e grava um JSON com o commit, a data, o volume de dados e os tempos;
+ 3. `comparar` mostra a variação da mediana e do p95 entre dois JSONs.
+
+Uso:
+    python -m benchmarks gerar [--termos 2600] [--meses 60] [--semente 42]
+    python -m benchmarks medir [--cenario NOME ...] [--repeticoes N] [--saida arquivo.json]
+    python -m benchmarks comparar antes.json depois.json
+    python -m benchmarks limpar
+
+O esquema precisa estar atualizado (python -m migracoes) antes de gerar os dados.
+"""
+
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+from benchmarks.cenarios import medir
+from benchmarks.dados_sinteticos import PREFIXO_TERMO, termo_de_referencia
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Variação (%) a partir da qual `comparar` destaca o cenário
+LIMIAR_VARIACAO = 10
+
+
+def commit_atual():
+    """
+    Hash curto do commit em que o benchmark rodou (None fora de um repositório git).
+    """
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                               cwd=os.path.dirname(DIRETORIO_RESULTADOS), check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def volume_de_dados(cur):
+    """
+    Quantidade de termos, despesas e categorias no banco (sintéticos e totais).
+    """
+    cur.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM Parcerias) AS termos,
+            (SELECT COUNT(*) FROM Parcerias WHERE numero_termo LIKE %(prefixo)s) AS termos_sinteticos,
+            (SELECT COUNT(*) FROM Parcerias_Despesas) AS despesas,
+            (SELECT COUNT(*) FROM Parcerias_Despesas WHERE numero_termo LIKE %(prefixo)s) AS despesas_sinteticas,
+            (SELECT COUNT(*) FROM categorias_despesa) AS categorias
+    """, {'prefixo': PREFIXO_TERMO + '%'})
+    return dict(zip([coluna.name for coluna in cur.description], cur.fetchone()))
+
+
+def executar(cliente, cur, nomes, repeticoes=None, aquecimento=1, ao_progresso=None):
+    """
+    Mede os cenários `nomes` e devolve o resultado completo, pronto para gravar em JSON.
+    `cur` é um cursor do banco de leitura (Railway), usado para o volume e o termo de referência.
+    """
+    termo = termo_de_referencia(cur)
+    if termo is None:
+        raise RuntimeError("Nenhum termo sintético conforme no banco: rode `python -m benchmarks gerar` antes")
+
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'dados': volume_de_dados(cur),
+        'termo_referencia': termo,
+        'aquecimento': aquecimento,
+        'cenarios': {},
+    }
+    for nome in nomes:
+        if ao_progresso:
+            ao_progresso(f"{nome}...")
+        resultado['cenarios'][nome] = medir(cliente, nome, termo, repeticoes, aquecimento)
+    return resultado
+
+
+def comparar(antes, depois):
+    """
+    Linhas (cenario, mediana_antes, mediana_depois, variacao_mediana_%, p95_antes, p95_depois, variacao_p95_%)
+    para os cenários presentes nos dois resultados.
+    """
+    def variacao(a, b):
+        return round((b - a) / a * 100, 1) if a else None
+
+    linhas = []
+    for nome, medicao in antes['cenarios'].items():
+        if nome not in depois['cenarios']:
+            continue
+        a, b = medicao['ms'], depois['cenarios'][nome]['ms']
+        linhas.append((nome, a['mediana'], b['mediana'], variacao(a['mediana'], b['mediana']),
+                       a['p95'], b['p95'], variacao(a['p95'], b['p95'])))
+    return linhas
@@ -0,0 +1,239 @@
+"""
+Linha de comando dos benchmarks (ver benchmarks/__init__.py)
+
+    python -m benchmarks gerar [--termos N] [--meses N] [--semente N] [--banco local|railway]
+    python -m benchmarks medir [--cenario NOME ...] [--repeticoes N] [--aquecimento N] [--saida ARQUIVO]
+    python -m benchmarks comparar ANTES.json DEPOIS.json
+    python -m benchmarks carga [--url URL] [--usuarios N] [--duracao S] [--mix gravar=0.5,...] [--pensar 1:3]
+    python -m benchmarks limpar [--banco local|railway]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from benchmarks import DIRETORIO_RESULTADOS, LIMIAR_VARIACAO, commit_atual, comparar, executar
+from benchmarks.carga import ETAPAS, executar_carga, ler_mix
+from benchmarks.cenarios import CENARIOS
+from benchmarks.dados_sinteticos import (EMAIL_CARGA, SENHA_CARGA, gerar_termos, limpar, popular,
+                                         termos_conformes)
+from db import BANCOS, conectar
+
+HOSTS_LOCAIS = ('localhost', '127.0.0.1', '::1')
+
+
+def _banco_local(banco):
+    host = BANCOS[banco]['host'] or ''
+    return host in HOSTS_LOCAIS or host.startswith('/')
+
+
+def _conferir_bancos(bancos, permitir_remoto):
+    """
+    Os dados sintéticos só vão para bancos locais, a menos que --permitir-remoto seja passado.
+    """
+    remotos = [banco for banco in bancos if not _banco_local(banco)]
+    if remotos and not permitir_remoto:
+        print(f"❌ {', '.join(remotos).upper()} não aponta para um PostgreSQL local "
+              f"({', '.join(BANCOS[b]['host'] for b in remotos)}). "
+              "Configure DB_*_HOST para um banco de benchmark ou use --permitir-remoto.")
+        return False
+    return True
+
+
+def _gerar(args):
+    bancos = args.banco or list(BANCOS)
+    if not _conferir_bancos(bancos, args.permitir_remoto):
+        return 1
+
+    inicio = time.perf_counter()
+    parcerias, categorias, despesas = gerar_termos(
+        termos=args.termos, meses=args.meses, categorias_por_rubrica=args.categorias_por_rubrica,
+        total_categorias=args.categorias, semente=args.semente
+    )
+    print(f"🧪 {len(parcerias)} termos, {len(despesas)} despesas, {len(categorias)} categorias "
+          f"gerados em {time.perf_counter() - inicio:.1f}s")
+
+    for banco in bancos:
+        inicio = time.perf_counter()
+        conn = conectar(banco)
+        try:
+            popular(conn, parcerias, categorias, despesas)
+        finally:
+            conn.close()
+        print(f"   ✅ {banco.upper()} populado em {time.perf_counter() - inicio:.1f}s")
+    return 0
+
+
+def _limpar(args):
+    bancos = args.banco or list(BANCOS)
+    if not _conferir_bancos(bancos, args.permitir_remoto):
+        return 1
+    for banco in bancos:
+        conn = conectar(banco)
+        try:
+            print(f"   🧹 {banco.upper()}: {limpar(conn)} termos sintéticos removidos")
+        finally:
+            conn.close()
+    return 0
+
+
+def _medir(args):
+    from app import app
+
+    # Os logs INFO de cada gravação poluiriam a saída do benchmark
+    logging.getLogger().setLevel(logging.WARNING)
+    app.config['TESTING'] = True
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = 1
+        sessao['usuario_id'] = 1
+        sessao['tipo_usuario'] = 'Agente Público'
+        sessao['email'] = EMAIL_CARGA
+
+    conn = conectar('railway')
+    try:
+        cur = conn.cursor()
+        resultado = executar(cliente, cur, args.cenario or list(CENARIOS), args.repeticoes,
+                             args.aquecimento, ao_progresso=lambda msg: print(f"⏱️  {msg}"))
+        cur.close()
+    finally:
+        conn.close()
+
+    for nome, medicao in resultado['cenarios'].items():
+        print(f"   {nome:<26} mediana {medicao['ms']['mediana']:>10.1f} ms   "
+              f"p95 {medicao['ms']['p95']:>10.1f} ms   status {medicao['status']}")
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS,
+                             f"{resultado['data'].replace(':', '')}_{resultado['commit'] or 'sem_commit'}.json")
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado gravado em {saida}")
+    return 0
+
+
+def _comparar(args):
+    resultados = []
+    for caminho in (args.antes, args.depois):
+        with open(caminho, encoding='utf-8') as arquivo:
+            resultados.append(json.load(arquivo))
+    antes, depois = resultados
+
+    print(f"{antes['commit']} ({antes['data']}) -> {depois['commit']} ({depois['data']})\n")
+    print(f"{'cenário':<26} {'mediana (ms)':>24} {'var.':>8} {'p95 (ms)':>24} {'var.':>8}")
+    for nome, med_a, med_b, var_med, p95_a, p95_b, var_p95 in comparar(antes, depois):
+        marca = ''
+        if var_med is not None and abs(var_med) >= LIMIAR_VARIACAO:
+            marca = ' 🔺' if var_med > 0 else ' 🔻'
+        print(f"{nome:<26} {med_a:>11.1f} {med_b:>11.1f} {_percentual(var_med):>8} "
+              f"{p95_a:>11.1f} {p95_b:>11.1f} {_percentual(var_p95):>8}{marca}")
+    return 0
+
+
+def _carga(args):
+    try:
+        mix = ler_mix(args.mix)
+        minimo, _, maximo = args.pensar.partition(':')
+        pensar = (float(minimo), float(maximo or minimo))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    conn = conectar('railway')
+    try:
+        cur = conn.cursor()
+        termos = termos_conformes(cur)
+        cur.close()
+    finally:
+        conn.close()
+    if not termos:
+        print("❌ Nenhum termo sintético conforme no banco: rode `python -m benchmarks gerar` antes")
+        return 1
+
+    print(f"🚦 {args.usuarios} usuários por {args.duracao}s contra {args.url} ({len(termos)} termos)")
+    resultado = executar_carga(args.url, termos, usuarios=args.usuarios, duracao=args.duracao,
+                               jornadas=args.jornadas, mix=mix, pensar=pensar, rampa=args.rampa,
+                               email=args.email, senha=args.senha, semente=args.semente)
+    resultado['commit'] = commit_atual()
+
+    print(f"\n{resultado['jornadas_concluidas']} jornadas concluídas "
+          f"({resultado['jornadas_por_minuto']}/min) em {resultado['duracao_s']}s\n")
+    print(f"{'etapa':<12} {'exec.':>6} {'erros':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for etapa, dados in resultado['etapas'].items():
+        print(f"{etapa:<12} {dados['execucoes']:>6} {dados['erros']:>6} {dados['ms']['p50']:>10.1f} "
+              f"{dados['ms']['p95']:>10.1f} {dados['ms']['p99']:>10.1f}")
+        for erro in dados['exemplos_erro']:
+            print(f"   ⚠️ {erro}")
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        saida = os.path.join(DIRETORIO_RESULTADOS,
+                             f"carga_{resultado['data'].replace(':', '')}_{resultado['commit'] or 'sem_commit'}.json")
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultado gravado em {saida}")
+    return 0
+
+
+def _percentual(valor):
+    return '-' if valor is None else f"{valor:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='acao', required=True)
+
+    gerar = subparsers.add_parser('gerar', help='Popula os bancos com dados sintéticos')
+    gerar.add_argument('--termos', type=int, default=2600)
+    gerar.add_argument('--meses', type=int, default=60)
+    gerar.add_argument('--categorias-por-rubrica', type=int, default=2)
+    gerar.add_argument('--categorias', type=int, default=1500, help='Tamanho do vocabulário de categorias')
+    gerar.add_argument('--semente', type=int, default=42)
+
+    limpar_parser = subparsers.add_parser('limpar', help='Remove os termos sintéticos')
+
+    for sub in (gerar, limpar_parser):
+        sub.add_argument('--banco', choices=sorted(BANCOS), action='append',
+                         help='Restringe a um banco (padrão: todos)')
+        sub.add_argument('--permitir-remoto', action='store_true',
+                         help='Aceita bancos fora de localhost (cuidado: grava dados sintéticos)')
+
+    medir = subparsers.add_parser('medir', help='Mede os cenários e grava o resultado em JSON')
+    medir.add_argument('--cenario', choices=list(CENARIOS), action='append',
+                       help='Cenário a medir (padrão: todos)')
+    medir.add_argument('--repeticoes', type=int, help='Repetições por cenário (padrão: a de cada cenário)')
+    medir.add_argument('--aquecimento', type=int, default=1)
+    medir.add_argument('--saida', help=f'Arquivo JSON (padrão: {DIRETORIO_RESULTADOS}/<data>_<commit>.json)')
+
+    comparar_parser = subparsers.add_parser('comparar', help='Compara dois resultados JSON')
+    comparar_parser.add_argument('antes')
+    comparar_parser.add_argument('depois')
+
+    carga = subparsers.add_parser('carga', help='Jornadas concorrentes contra uma instância em execução')
+    carga.add_argument('--url', default='http://localhost:5000')
+    carga.add_argument('--usuarios', type=int, default=5, help='Usuários virtuais concorrentes')
+    carga.add_argument('--duracao', type=int, default=60, help='Duração em segundos')
+    carga.add_argument('--jornadas', type=int, default=0, help='Máximo de jornadas por usuário (0 = sem limite)')
+    carga.add_argument('--mix', default='', help=f"Proporção das etapas opcionais, ex.: gravar=0.5,exportar=0.1 "
+                                                 f"(etapas: {', '.join(ETAPAS)})")
+    carga.add_argument('--pensar', default='1:3', help='Tempo de reflexão entre etapas, em segundos (min:max)')
+    carga.add_argument('--rampa', type=float, default=5.0, help='Segundos para todos os usuários entrarem')
+    carga.add_argument('--email', default=EMAIL_CARGA)
+    carga.add_argument('--senha', default=SENHA_CARGA)
+    carga.add_argument('--semente', type=int, default=42)
+    carga.add_argument('--saida', help=f'Arquivo JSON (padrão: {DIRETORIO_RESULTADOS}/carga_<data>_<commit>.json)')
+
+    args = parser.parse_args()
+    acoes = {'gerar': _gerar, 'limpar': _limpar, 'medir': _medir, 'comparar': _comparar, 'carga': _carga}
+    return acoes[args.acao](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
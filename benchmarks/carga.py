@@ -0,0 +1,240 @@
+"""
+Teste de carga com jornadas de analistas
+
+Simula usuários concorrentes contra uma instância em execução (python app.py
+ou gunicorn), com os bancos LOCAL e RAILWAY apontando para PostgreSQL locais
+populados por `python -m benchmarks gerar`. Cada usuário virtual repete a
+jornada de um analista, numa sessão HTTP própria:
+
+    login -> listagem do orçamento -> editor -> gravar orçamento
+          -> busca no dicionário -> exportar CSV
+
+Login, listagem e editor acontecem em toda jornada; as demais etapas entram
+com a proporção do mix (ex.: gravar=0.5 grava em metade das jornadas). Entre
+as etapas o usuário "pensa" por um tempo sorteado no intervalo configurado.
+
+O resultado traz, por etapa, o número de execuções, os erros e os
+percentis p50/p95/p99 de latência, além da vazão de jornadas. Serve para
+dimensionar os workers do gunicorn e flagrar regressões nas escritas duais
+sob contenção.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from benchmarks.cenarios import percentil
+from benchmarks.dados_sinteticos import EMAIL_CARGA, FUNCOES, ITENS, SENHA_CARGA
+
+# Ordem das etapas e proporção padrão de jornadas que passam por cada uma
+ETAPAS = ['login', 'listagem', 'editor', 'gravar', 'dicionario', 'exportar']
+MIX_PADRAO = {
+    'login': 1.0,
+    'listagem': 1.0,
+    'editor': 1.0,
+    'gravar': 0.5,
+    'dicionario': 0.3,
+    'exportar': 0.1,
+}
+ETAPAS_OBRIGATORIAS = ('login', 'listagem', 'editor')
+
+TIMEOUT_REQUISICAO = 120
+
+
+class ErroEtapa(Exception):
+    """
+    Resposta inesperada numa etapa da jornada (status ou conteúdo).
+    """
+
+
+def despesas_da_matriz(matriz):
+    """
+    Lista de despesas no formato do POST /api/despesa a partir de uma matriz colunar,
+    como o editor monta ao salvar (meses sem valor ficam de fora).
+    """
+    meses = matriz['meses']
+    despesas = []
+    for i, (rubrica, categoria, quantidade) in enumerate(matriz['linhas']):
+        valores = matriz['valores'][i * len(meses):(i + 1) * len(meses)]
+        despesas.append({
+            'rubrica': rubrica,
+            'quantidade': quantidade,
+            'categoria_despesa': categoria,
+            'valores_por_mes': {str(mes): valor for mes, valor in zip(meses, valores) if valor is not None},
+        })
+    return despesas
+
+
+class UsuarioVirtual:
+    """
+    Um analista simulado: sessão HTTP própria e o termo aberto no editor.
+    """
+
+    def __init__(self, url, email, senha, termos, rnd):
+        self.url = url.rstrip('/')
+        self.email = email
+        self.senha = senha
+        self.termos = termos
+        self.rnd = rnd
+        self.sessao = requests.Session()
+        self.termo = None
+        self.despesas = None
+
+    def _get(self, caminho, **kwargs):
+        resposta = self.sessao.get(self.url + caminho, timeout=TIMEOUT_REQUISICAO, **kwargs)
+        if resposta.status_code != 200:
+            raise ErroEtapa(f"GET {caminho}: HTTP {resposta.status_code}")
+        return resposta
+
+    def login(self):
+        self.sessao.cookies.clear()
+        resposta = self.sessao.post(self.url + '/login', data={'username': self.email, 'password': self.senha},
+                                    allow_redirects=False, timeout=TIMEOUT_REQUISICAO)
+        # Sucesso redireciona para a tela inicial; falha volta para /login
+        if resposta.status_code != 302 or resposta.headers.get('Location', '').endswith('/login'):
+            raise ErroEtapa(f"login recusado (HTTP {resposta.status_code})")
+
+    def listagem(self):
+        self._get('/orcamento/')
+
+    def editor(self):
+        # A página do editor e as matrizes de todos os aditivos carregadas por ela via fetch
+        self.termo = self.rnd.choice(self.termos)
+        self._get(f'/orcamento/editar/{self.termo}')
+        aditivos = self._get(f'/api/despesas-aditivos/{self.termo}').json()['aditivos']
+        base = next((matriz for matriz in aditivos if matriz['aditivo'] == 0), None)
+        self.despesas = despesas_da_matriz(base) if base else []
+
+    def gravar(self):
+        resposta = self.sessao.post(self.url + '/api/despesa', timeout=TIMEOUT_REQUISICAO, json={
+            'numero_termo': self.termo, 'aditivo': 0, 'despesas': self.despesas,
+        })
+        if resposta.status_code != 201:
+            raise ErroEtapa(f"gravar {self.termo}: HTTP {resposta.status_code}")
+        bancos = resposta.json().get('databases', {})
+        if not (bancos.get('local') and bancos.get('railway')):
+            raise ErroEtapa(f"gravar {self.termo}: escrita dual parcial {bancos}")
+
+    def dicionario(self):
+        busca = self.rnd.choice(FUNCOES + ITENS)[:4]
+        self._get('/orcamento/buscar-categorias', params={'q': busca})
+
+    def exportar(self):
+        self._get('/orcamento/exportar-csv')
+
+
+class Coletor:
+    """
+    Acumula as latências (ms) e erros por etapa, de todas as threads.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.latencias = {etapa: [] for etapa in ETAPAS}
+        self.erros = {etapa: [] for etapa in ETAPAS}
+        self.jornadas = 0
+
+    def registrar(self, etapa, ms, erro=None):
+        with self._trava:
+            self.latencias[etapa].append(ms)
+            if erro is not None:
+                self.erros[etapa].append(erro)
+
+    def jornada_concluida(self):
+        with self._trava:
+            self.jornadas += 1
+
+
+def _executar_usuario(indice, url, email, senha, termos, mix, pensar, fim, jornadas_max, semente, coletor):
+    rnd = random.Random(semente + indice)
+    usuario = UsuarioVirtual(url, email, senha, termos, rnd)
+    jornadas = 0
+    while time.monotonic() < fim and (not jornadas_max or jornadas < jornadas_max):
+        for etapa in ETAPAS:
+            if etapa not in ETAPAS_OBRIGATORIAS and rnd.random() >= mix.get(etapa, 0):
+                continue
+            inicio = time.perf_counter()
+            erro = None
+            try:
+                getattr(usuario, etapa)()
+            except (ErroEtapa, requests.RequestException, ValueError, KeyError) as e:
+                erro = str(e)
+            coletor.registrar(etapa, (time.perf_counter() - inicio) * 1000, erro)
+            if erro is not None:
+                break  # jornada interrompida, como um analista que recarrega do início
+            time.sleep(rnd.uniform(*pensar))
+        else:
+            coletor.jornada_concluida()
+        jornadas += 1
+
+
+def executar_carga(url, termos, usuarios=5, duracao=60, jornadas=0, mix=None, pensar=(1.0, 3.0),
+                   rampa=5.0, email=EMAIL_CARGA, senha=SENHA_CARGA, semente=42):
+    """
+    Roda `usuarios` jornadas concorrentes por `duracao` segundos (ou até `jornadas` por usuário)
+    e devolve o resumo por etapa. `rampa` espalha a entrada dos usuários ao longo de N segundos.
+    """
+    mix = {**MIX_PADRAO, **(mix or {})}
+    coletor = Coletor()
+    inicio = time.monotonic()
+    fim = inicio + duracao
+
+    threads = []
+    for indice in range(usuarios):
+        thread = threading.Thread(
+            target=_executar_usuario, daemon=True, name=f"usuario-{indice}",
+            args=(indice, url, email, senha, termos, mix, pensar, fim, jornadas, semente, coletor)
+        )
+        threads.append(thread)
+        thread.start()
+        if usuarios > 1:
+            time.sleep(rampa / usuarios)
+    for thread in threads:
+        thread.join()
+    decorrido = time.monotonic() - inicio
+
+    etapas = {}
+    for etapa in ETAPAS:
+        latencias = coletor.latencias[etapa]
+        if not latencias:
+            continue
+        etapas[etapa] = {
+            'execucoes': len(latencias),
+            'erros': len(coletor.erros[etapa]),
+            'exemplos_erro': sorted(set(coletor.erros[etapa]))[:5],
+            'ms': {
+                'p50': round(percentil(latencias, 50), 1),
+                'p95': round(percentil(latencias, 95), 1),
+                'p99': round(percentil(latencias, 99), 1),
+                'max': round(max(latencias), 1),
+            },
+        }
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'url': url,
+        'usuarios': usuarios,
+        'duracao_s': round(decorrido, 1),
+        'pensar_s': list(pensar),
+        'mix': mix,
+        'jornadas_concluidas': coletor.jornadas,
+        'jornadas_por_minuto': round(coletor.jornadas / decorrido * 60, 1) if decorrido else 0,
+        'etapas': etapas,
+    }
+
+
+def ler_mix(texto):
+    """
+    "gravar=0.5,exportar=0.2" -> {'gravar': 0.5, 'exportar': 0.2}
+    """
+    mix = {}
+    for item in filter(None, (parte.strip() for parte in texto.split(','))):
+        etapa, _, proporcao = item.partition('=')
+        if etapa not in ETAPAS or etapa in ETAPAS_OBRIGATORIAS:
+            raise ValueError(f"Etapa opcional desconhecida no mix: {etapa} "
+                             f"(use {', '.join(e for e in ETAPAS if e not in ETAPAS_OBRIGATORIAS)})")
+        mix[etapa] = min(max(float(proporcao), 0.0), 1.0)
+    return mix
@@ -0,0 +1,148 @@
+"""
+Cenários de benchmark: endpoints medidos com o cliente de teste do Flask
+
+Cada cenário faz uma requisição real à aplicação (rotas, templates e SQL nos
+bancos configurados) com a sessão de um Agente Público. A medição repete o
+cenário após algumas execuções de aquecimento e resume os tempos (mínimo,
+mediana, p95, máximo), o tamanho da resposta e o tempo de SQL por banco
+lido do cabeçalho Server-Timing (ver instrumentacao.py).
+"""
+
+import re
+import statistics
+import time
+
+REGEX_SERVER_TIMING = re.compile(r'db-(\w+);dur=([\d.]+);desc="(\d+) consultas"')
+
+
+def _payload_gravacao(cliente, termo):
+    # O mesmo JSON que o editor envia: as despesas atuais do termo, regravadas
+    resposta = cliente.get(f'/api/despesas/{termo}')
+    return {'numero_termo': termo, 'aditivo': 0, 'despesas': resposta.get_json()['despesas']}
+
+
+def _gravar_despesas(cliente, termo, payload):
+    return cliente.post('/api/despesa', json=payload)
+
+
+# nome: (descrição, executar(cliente, termo, preparado), preparar(cliente, termo) ou None, repetições padrão)
+CENARIOS = {
+    'orcamento_listagem': (
+        'GET /orcamento/ (100 primeiros termos + estatísticas)',
+        lambda cliente, termo, _: cliente.get('/orcamento/'),
+        None, 10
+    ),
+    'orcamento_listagem_todas': (
+        'GET /orcamento/?limite=todas',
+        lambda cliente, termo, _: cliente.get('/orcamento/?limite=todas'),
+        None, 5
+    ),
+    'dicionario_despesas': (
+        'GET /orcamento/dicionario-despesas (1ª página)',
+        lambda cliente, termo, _: cliente.get('/orcamento/dicionario-despesas'),
+        None, 10
+    ),
+    'despesas_termo': (
+        'GET /api/despesas/<termo> (matriz do editor)',
+        lambda cliente, termo, _: cliente.get(f'/api/despesas/{termo}'),
+        None, 20
+    ),
+    'despesas_termo_colunar': (
+        'GET /api/despesas/<termo> (matriz do editor, formato colunar)',
+        lambda cliente, termo, _: cliente.get(f'/api/despesas/{termo}',
+                                              headers={'Accept': 'application/vnd.faf.matriz+json'}),
+        None, 20
+    ),
+    'despesas_aditivos': (
+        'GET /api/despesas-aditivos/<termo> (matrizes e totais de todos os aditivos)',
+        lambda cliente, termo, _: cliente.get(f'/api/despesas-aditivos/{termo}'),
+        None, 20
+    ),
+    'gravar_despesas': (
+        'POST /api/despesa (regrava o orçamento do termo nos dois bancos)',
+        _gravar_despesas,
+        _payload_gravacao, 3
+    ),
+    'exportar_csv_orcamento': (
+        'GET /orcamento/exportar-csv',
+        lambda cliente, termo, _: cliente.get('/orcamento/exportar-csv'),
+        None, 5
+    ),
+    'exportar_csv_parcerias': (
+        'GET /parcerias/exportar-csv',
+        lambda cliente, termo, _: cliente.get('/parcerias/exportar-csv'),
+        None, 5
+    ),
+}
+
+
+def percentil(valores, p):
+    """
+    Percentil p (0-100) pelo método do posto mais próximo.
+    """
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicao = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[posicao]
+
+
+def _sql_da_resposta(resposta):
+    """
+    {banco: (ms, consultas)} a partir do Server-Timing da resposta.
+    """
+    sql = {}
+    for cabecalho in resposta.headers.getlist('Server-Timing'):
+        for banco, ms, consultas in REGEX_SERVER_TIMING.findall(cabecalho):
+            sql[banco] = (float(ms), int(consultas))
+    return sql
+
+
+def medir(cliente, nome, termo, repeticoes=None, aquecimento=1):
+    """
+    Executa o cenário `nome` e devolve o resumo das medições (tempos em ms).
+    """
+    descricao, executar, preparar, repeticoes_padrao = CENARIOS[nome]
+    repeticoes = repeticoes or repeticoes_padrao
+    preparado = preparar(cliente, termo) if preparar else None
+
+    for _ in range(aquecimento):
+        executar(cliente, termo, preparado).get_data()
+
+    tempos = []
+    status = {}
+    tamanhos = []
+    sql_por_banco = {}
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = executar(cliente, termo, preparado)
+        corpo = resposta.get_data()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+        tamanhos.append(len(corpo))
+        for banco, (ms, consultas) in _sql_da_resposta(resposta).items():
+            sql_por_banco.setdefault(banco, {'ms': [], 'consultas': []})
+            sql_por_banco[banco]['ms'].append(ms)
+            sql_por_banco[banco]['consultas'].append(consultas)
+
+    return {
+        'descricao': descricao,
+        'repeticoes': repeticoes,
+        'status': {str(codigo): vezes for codigo, vezes in sorted(status.items())},
+        'bytes': int(statistics.median(tamanhos)),
+        'ms': {
+            'min': round(min(tempos), 3),
+            'mediana': round(statistics.median(tempos), 3),
+            'p95': round(percentil(tempos, 95), 3),
+            'max': round(max(tempos), 3),
+            'media': round(statistics.mean(tempos), 3),
+        },
+        'sql': {
+            banco: {
+                'ms_mediana': round(statistics.median(valores['ms']), 3),
+                'consultas': int(statistics.median(valores['consultas'])),
+            }
+            for banco, valores in sorted(sql_por_banco.items())
+        },
+    }
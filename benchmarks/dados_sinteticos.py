@@ -0,0 +1,267 @@
+"""
+Gerador de dados sintéticos para os benchmarks
+
+Popula Parcerias, Parcerias_Despesas e categorias_despesa com termos
+fictícios no formato dos reais:
+ - tipo de termo, sigla e ano reamostrados de `outras coisas/parcerias.csv`
+   (cerca de 2.600 termos, então a listagem e as exportações ficam com o
+   mesmo volume e proporção de Convênios excluídos da tela de orçamento);
+ - despesas no leque termo × rubrica × categoria × mês, com até 60 meses
+   (o máximo do editor) e categorias sorteadas com distribuição enviesada,
+   como no dicionário real (poucas muito usadas, muitas raras);
+ - parte dos termos sem orçamento e parte com total divergente do previsto,
+   para as três situações da listagem aparecerem.
+
+Também cria o usuário EMAIL_CARGA (Agente Público), usado no login das
+jornadas de carga (carga.py).
+
+Os termos sintéticos começam com PREFIXO_TERMO e são apagados antes de cada
+geração; os demais dados do banco não são tocados. Os triggers de usuário de
+Parcerias_Despesas (auditoria e resolução de categoria_id) ficam desligados
+durante a carga, que preenche categoria_id diretamente; isso exige ser dono
+da tabela, o que é o caso de um PostgreSQL local de benchmark.
+"""
+
+import csv
+import io
+import os
+import random
+from datetime import date
+
+from psycopg2.extras import execute_values
+from werkzeug.security import generate_password_hash
+
+PREFIXO_TERMO = 'BENCH/'
+
+# Login usado pelos testes de carga (criado por `gerar`)
+EMAIL_CARGA = 'benchmark@localhost'
+SENHA_CARGA = 'benchmark'
+
+CSV_PARCERIAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'outras coisas', 'parcerias.csv')
+
+RUBRICAS = ['Pessoal', 'Serviços de Terceiros', 'Administrativas', 'Outras Despesas']
+
+# Raízes para o vocabulário de categorias (combinadas com os vínculos abaixo)
+FUNCOES = [
+    'Coordenador', 'Assistente Administrativo', 'Palestrante', 'Gerente', 'Educador Social',
+    'Psicólogo', 'Assistente Social', 'Oficineiro', 'Auxiliar de Limpeza', 'Cozinheiro',
+    'Motorista', 'Advogado', 'Contador', 'Monitor', 'Recepcionista', 'Técnico de Som',
+    'Produtor Cultural', 'Designer', 'Fotógrafo', 'Agente Comunitário',
+]
+VINCULOS = ['(PJ)', '(CLT)', '(RPA)', '(MEI)', '- Encargos', '- Benefícios']
+ITENS = [
+    'Kit Absorventes Reutilizáveis', 'Cesta Básica', 'Material de Escritório', 'Aluguel',
+    'Energia Elétrica', 'Internet', 'Transporte', 'Alimentação', 'Material Pedagógico',
+    'Locação de Equipamento', 'Tarifa Bancária', 'Água', 'Telefonia', 'Gráfica',
+]
+
+
+def _vocabulario_categorias(rnd, quantidade):
+    """
+    Nomes de categorias distintos: funções × vínculos, itens e variantes numeradas.
+    """
+    nomes = [f"{funcao} {vinculo}" for funcao in FUNCOES for vinculo in VINCULOS] + list(ITENS)
+    variante = 2
+    while len(nomes) < quantidade:
+        nomes.extend(f"{nome} {variante}" for nome in nomes[:len(FUNCOES) * len(VINCULOS) + len(ITENS)])
+        variante += 1
+    rnd.shuffle(nomes)
+    return nomes[:quantidade]
+
+
+def _formatos_reais():
+    """
+    (tipo_termo, sigla, ano) dos termos de parcerias.csv, ou um conjunto padrão se o arquivo não existir.
+    """
+    formatos = []
+    if os.path.exists(CSV_PARCERIAS):
+        with open(CSV_PARCERIAS, encoding='utf-8') as arquivo:
+            for linha in csv.DictReader(arquivo):
+                partes = linha['numero_termo'].split('/')
+                if len(partes) >= 3 and partes[2].isdigit():
+                    formatos.append((linha['tipo_termo'] or 'Fomento', partes[0], int(partes[2])))
+    return formatos or [('Fomento', 'TFM', 2022), ('Colaboração', 'TCL', 2023)]
+
+
+def gerar_termos(termos=2600, meses=60, categorias_por_rubrica=2, total_categorias=1500,
+                 sem_orcamento=0.25, divergentes=0.10, semente=42):
+    """
+    Gera (parcerias, categorias, despesas) em memória, de forma determinística pela semente.
+    parcerias: lista de dicts; categorias: nomes do vocabulário;
+    despesas: lista de tuplas (numero_termo, rubrica, quantidade, categoria, valor, mes).
+    """
+    rnd = random.Random(semente)
+    formatos = _formatos_reais()
+    categorias = _vocabulario_categorias(rnd, total_categorias)
+    # Distribuição enviesada (tipo Zipf): a categoria k tem peso 1/k
+    pesos = [1 / (k + 1) for k in range(len(categorias))]
+
+    parcerias = []
+    despesas = []
+    for i in range(1, termos + 1):
+        tipo_termo, sigla, ano = rnd.choice(formatos)
+        numero_termo = f"{PREFIXO_TERMO}{sigla}/{i:04d}/{ano}/SMDHC"
+        inicio = date(ano, rnd.randint(1, 12), 1)
+
+        total = 0.0
+        sorteio = rnd.random()
+        if sorteio >= sem_orcamento:
+            for rubrica in RUBRICAS:
+                # dict.fromkeys remove repetidas mantendo a ordem (set dependeria do PYTHONHASHSEED)
+                for categoria in dict.fromkeys(rnd.choices(categorias, weights=pesos, k=categorias_por_rubrica)):
+                    quantidade = rnd.randint(1, 5)
+                    valor_mensal = round(quantidade * rnd.uniform(200, 8000), 2)
+                    for mes in range(1, meses + 1):
+                        despesas.append((numero_termo, rubrica, quantidade, categoria, valor_mensal, mes))
+                    total += valor_mensal * meses
+        # Termos divergentes: previsto diferente do preenchido
+        if sorteio >= sem_orcamento and sorteio < sem_orcamento + divergentes:
+            total_previsto = round(total * rnd.uniform(1.01, 1.2), 2)
+        elif total:
+            total_previsto = round(total, 2)
+        else:
+            total_previsto = round(rnd.uniform(50000, 2000000), 2)
+
+        parcerias.append({
+            'numero_termo': numero_termo,
+            'osc': f"OSC Sintética {i:04d}",
+            'projeto': f"Projeto sintético {i:04d}",
+            'tipo_termo': tipo_termo,
+            'cnpj': f"{rnd.randrange(10 ** 13, 10 ** 14)}",
+            'inicio': inicio,
+            'final': date(ano + meses // 12, inicio.month, 1),
+            'meses': meses,
+            'total_previsto': total_previsto,
+            'sei_celeb': f"6074.{ano}/{i:07d}-{rnd.randint(0, 9)}",
+        })
+    return parcerias, categorias, despesas
+
+
+def _copiar_despesas(cur, despesas, ids_categorias, lote=50000):
+    """
+    Carrega as despesas com COPY, em blocos de `lote` linhas.
+    """
+    colunas = '(numero_termo, rubrica, quantidade, categoria_despesa, categoria_id, valor, mes, aditivo)'
+    for inicio in range(0, len(despesas), lote):
+        buffer = io.StringIO()
+        for numero_termo, rubrica, quantidade, categoria, valor, mes in despesas[inicio:inicio + lote]:
+            buffer.write(f"{numero_termo}\t{rubrica}\t{quantidade}\t{categoria}\t"
+                         f"{ids_categorias[categoria]}\t{valor:.2f}\t{mes}\t0\n")
+        buffer.seek(0)
+        cur.copy_expert(f"COPY Parcerias_Despesas {colunas} FROM STDIN", buffer)
+
+
+def limpar(conn):
+    """
+    Remove os termos sintéticos (e suas despesas) do banco. Retorna o número de termos removidos.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("ALTER TABLE Parcerias_Despesas DISABLE TRIGGER USER")
+        cur.execute("DELETE FROM Parcerias_Despesas WHERE numero_termo LIKE %s", (PREFIXO_TERMO + '%',))
+        cur.execute("ALTER TABLE Parcerias_Despesas ENABLE TRIGGER USER")
+        cur.execute("DELETE FROM Parcerias WHERE numero_termo LIKE %s", (PREFIXO_TERMO + '%',))
+        removidos = cur.rowcount
+        conn.commit()
+        return removidos
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def popular(conn, parcerias, categorias, despesas):
+    """
+    Substitui os termos sintéticos do banco pelos gerados (a carga roda numa única
+    transação) e atualiza as estatísticas do planejador.
+    """
+    limpar(conn)
+    cur = conn.cursor()
+    try:
+        execute_values(cur, """
+            INSERT INTO categorias_despesa (nome) VALUES %s
+            ON CONFLICT (nome) DO NOTHING
+        """, [(nome,) for nome in categorias], page_size=1000)
+        cur.execute("SELECT nome, id FROM categorias_despesa WHERE nome = ANY(%s)", (categorias,))
+        ids_categorias = dict(cur.fetchall())
+
+        execute_values(cur, """
+            INSERT INTO Parcerias (numero_termo, osc, projeto, tipo_termo, cnpj, inicio, final,
+                                   meses, total_previsto, sei_celeb)
+            VALUES %s
+        """, [(p['numero_termo'], p['osc'], p['projeto'], p['tipo_termo'], p['cnpj'], p['inicio'],
+               p['final'], p['meses'], p['total_previsto'], p['sei_celeb']) for p in parcerias],
+            page_size=1000)
+
+        cur.execute("ALTER TABLE Parcerias_Despesas DISABLE TRIGGER USER")
+        _copiar_despesas(cur, despesas, ids_categorias)
+        cur.execute("ALTER TABLE Parcerias_Despesas ENABLE TRIGGER USER")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    garantir_usuario(conn)
+
+    # ANALYZE fora da transação da carga, para o planejador já ver os volumes novos
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute("ANALYZE Parcerias")
+        cur.execute("ANALYZE Parcerias_Despesas")
+        cur.execute("ANALYZE categorias_despesa")
+        cur.close()
+    finally:
+        conn.autocommit = False
+
+
+def termos_conformes(cur):
+    """
+    Termos sintéticos com orçamento conforme o previsto (a gravação é aceita sem
+    aviso), do menor para o maior número de linhas.
+    """
+    cur.execute("""
+        SELECT p.numero_termo
+        FROM Parcerias p
+        JOIN (
+            SELECT numero_termo, COUNT(*) AS linhas, SUM(valor) AS total
+            FROM Parcerias_Despesas
+            WHERE numero_termo LIKE %s AND COALESCE(aditivo, 0) = 0
+            GROUP BY numero_termo
+        ) d ON d.numero_termo = p.numero_termo
+        WHERE ABS(d.total - p.total_previsto) < 0.01
+        ORDER BY d.linhas, p.numero_termo
+    """, (PREFIXO_TERMO + '%',))
+    return [linha[0] for linha in cur.fetchall()]
+
+
+def termo_de_referencia(cur):
+    """
+    Termo sintético usado nos cenários de leitura/gravação: o conforme de tamanho mediano.
+    """
+    conformes = termos_conformes(cur)
+    return conformes[len(conformes) // 2] if conformes else None
+
+
+def garantir_usuario(conn, email=EMAIL_CARGA, senha=SENHA_CARGA):
+    """
+    Cria (ou redefine a senha de) o Agente Público usado no login dos testes de carga.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM usuarios WHERE email = %s", (email,))
+        if cur.fetchone():
+            cur.execute("UPDATE usuarios SET senha = %s, tipo_usuario = 'Agente Público' WHERE email = %s",
+                        (generate_password_hash(senha), email))
+        else:
+            cur.execute("INSERT INTO usuarios (email, senha, tipo_usuario) VALUES (%s, %s, 'Agente Público')",
+                        (email, generate_password_hash(senha)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
@@ -0,0 +1,401 @@
+"""
+Categorias de despesa: consultas sobre a dimensão categorias_despesa e
+motor de renomeação em massa
+
+Desde a migração 001 cada linha de Parcerias_Despesas aponta para
+categorias_despesa por um id inteiro (categoria_id). Listagens e estatísticas
+agrupam pelo id e só juntam o nome no final; as funções de consulta abaixo
+devolvem os mesmos formatos JSON de antes (chave 'categoria_despesa' com o nome).
+
+Renomear uma categoria passa a ser:
+ - renomeação simples (o nome novo ainda não existe): UPDATE da linha em
+   categorias_despesa e, em seguida, o texto categoria_despesa das despesas
+   reescrito em lotes (ver abaixo), para que nenhuma escrita posterior com o
+   nome antigo recrie a categoria pelo trigger;
+ - mesclagem (o nome novo já existe): as linhas da categoria antiga são
+   reapontadas para a nova em lotes curtos, escolhidos por id com o índice
+   (categoria_id, id) e paginação por chave (id > último id processado),
+   com commit, pausa e lock_timeout curto a cada lote; no fim a categoria
+   antiga é removida da dimensão.
+
+Nos dois casos Parcerias_Despesas.categoria_despesa termina igual ao nome
+da dimensão.
+"""
+
+import time
+
+import psycopg2
+
+from config import RENOMEACAO_LOTE
+from db import BANCOS, conectar
+from jobs import registrar_job
+
+# Pausa entre lotes (segundos) para dar vez às transações dos editores
+PAUSA_ENTRE_LOTES = 0.05
+
+# Tempo máximo de espera por lock em cada lote e número de novas tentativas
+LOCK_TIMEOUT = '2s'
+MAX_TENTATIVAS_LOTE = 5
+
+CRIAR_INDICE_CATEGORIA = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pd_categoria_id_id
+    ON Parcerias_Despesas (categoria_id, id)
+"""
+
+# Reaponta um lote de linhas da categoria antiga para a nova e grava o nome novo
+# no texto (na renomeação simples id_antigo = id_novo: só o texto muda)
+ATUALIZAR_LOTE = """
+    WITH lote AS (
+        SELECT id
+        FROM Parcerias_Despesas
+        WHERE categoria_id = %(id_antigo)s AND id > %(ultimo_id)s
+          AND categoria_despesa IS DISTINCT FROM %(nome_novo)s
+        ORDER BY id
+        LIMIT %(tamanho_lote)s
+        FOR UPDATE
+    )
+    UPDATE Parcerias_Despesas pd
+    SET categoria_id = %(id_novo)s, categoria_despesa = %(nome_novo)s
+    FROM lote
+    WHERE pd.id = lote.id
+    RETURNING pd.id
+"""
+
+# Rubrica mais frequente de uma categoria (pelo nome)
+CONSULTA_RUBRICA_SUGERIDA = """
+    SELECT pd.rubrica, COUNT(*) as freq
+    FROM Parcerias_Despesas pd
+    JOIN categorias_despesa c ON c.id = pd.categoria_id
+    WHERE c.nome = %s AND pd.rubrica IS NOT NULL AND pd.rubrica != ''
+    GROUP BY pd.rubrica
+    ORDER BY freq DESC
+    LIMIT 1
+"""
+
+# Termos que usam uma categoria (pelo nome), com total de despesas e valor
+CONSULTA_TERMOS_DA_CATEGORIA = """
+    SELECT 
+        pd.numero_termo,
+        COUNT(*) as total_despesas,
+        SUM(pd.valor) as valor_total
+    FROM Parcerias_Despesas pd
+    JOIN categorias_despesa c ON c.id = pd.categoria_id
+    WHERE c.nome = %s
+    GROUP BY pd.numero_termo
+    ORDER BY pd.numero_termo
+"""
+
+# Estatísticas por categoria agrupadas pelo id inteiro (nome juntado no final)
+ESTATISTICAS_CATEGORIAS = """
+    WITH categoria_stats AS (
+        SELECT 
+            categoria_id,
+            COUNT(*) as total_ocorrencias,
+            COUNT(DISTINCT numero_termo) as total_termos
+        FROM Parcerias_Despesas
+        WHERE categoria_id IS NOT NULL
+        GROUP BY categoria_id
+    ),
+    rubrica_mais_comum AS (
+        SELECT DISTINCT ON (categoria_id)
+            categoria_id,
+            rubrica,
+            COUNT(*) as freq_rubrica
+        FROM Parcerias_Despesas
+        WHERE categoria_id IS NOT NULL
+            AND rubrica IS NOT NULL AND rubrica != ''
+        GROUP BY categoria_id, rubrica
+        ORDER BY categoria_id, freq_rubrica DESC, rubrica
+    )
+    SELECT 
+        c.nome as categoria_despesa,
+        cs.total_ocorrencias,
+        cs.total_termos,
+        COALESCE(rmc.rubrica, '') as rubrica_comum
+    FROM categoria_stats cs
+    JOIN categorias_despesa c ON c.id = cs.categoria_id
+    LEFT JOIN rubrica_mais_comum rmc ON rmc.categoria_id = cs.categoria_id
+"""
+
+
+def garantir_indice_categoria(conn):
+    """
+    Cria (se necessário) o índice usado pela renomeação, sem bloquear escritas.
+    CREATE INDEX CONCURRENTLY não pode rodar dentro de transação, por isso
+    a conexão é colocada temporariamente em autocommit.
+    """
+    autocommit_anterior = conn.autocommit
+    conn.rollback()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CRIAR_INDICE_CATEGORIA)
+    finally:
+        conn.autocommit = autocommit_anterior
+
+
+def obter_id_categoria(cur, nome):
+    """
+    Id da categoria na dimensão, ou None se o nome não existir.
+    """
+    cur.execute("SELECT id FROM categorias_despesa WHERE nome = %s", (nome,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row['id'] if isinstance(row, dict) else row[0]
+
+
+def contar_categoria(conn, categoria):
+    """
+    Quantidade de linhas de Parcerias_Despesas com a categoria informada.
+    """
+    with conn.cursor() as cur:
+        categoria_id = obter_id_categoria(cur, categoria)
+        total = 0
+        if categoria_id is not None:
+            cur.execute("SELECT COUNT(*) FROM Parcerias_Despesas WHERE categoria_id = %s", (categoria_id,))
+            total = cur.fetchone()[0]
+    conn.commit()
+    return total
+
+
+def _atualizar_lote(conn, id_antigo, id_novo, nome_novo, ultimo_id, tamanho_lote, usuario_id):
+    """
+    Reaponta um lote numa transação curta. Retorna a lista de ids atualizados.
+    Em caso de lock ocupado por outro usuário, espera e tenta de novo.
+    """
+    for tentativa in range(1, MAX_TENTATIVAS_LOTE + 1):
+        cur = conn.cursor()
+        try:
+            cur.execute("SET LOCAL app.current_user_id = %s", (str(usuario_id),))
+            cur.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            cur.execute(ATUALIZAR_LOTE, {
+                'id_antigo': id_antigo, 'ultimo_id': ultimo_id, 'tamanho_lote': tamanho_lote,
+                'id_novo': id_novo, 'nome_novo': nome_novo,
+            })
+            ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            return ids
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if tentativa == MAX_TENTATIVAS_LOTE:
+                raise
+            time.sleep(PAUSA_ENTRE_LOTES * 10 * tentativa)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def mesclar_em_lotes(conn, id_antigo, id_novo, nome_novo, usuario_id,
+                     tamanho_lote=None, ao_progresso=None):
+    """
+    Reaponta as linhas da categoria id_antigo para id_novo (gravando nome_novo no texto)
+    em lotes limitados por chave primária. Com id_novo = id_antigo só reescreve o texto.
+
+    Returns:
+        int: total de linhas atualizadas
+    """
+    tamanho_lote = tamanho_lote or RENOMEACAO_LOTE
+    total = 0
+
+    # Duas passadas: a segunda (de id 0 em diante) pega linhas gravadas com a
+    # categoria antiga por outros usuários enquanto a primeira estava em andamento.
+    for _ in range(2):
+        ultimo_id = 0
+        atualizadas_na_passada = 0
+        while True:
+            ids = _atualizar_lote(conn, id_antigo, id_novo, nome_novo, ultimo_id, tamanho_lote, usuario_id)
+            if not ids:
+                break
+            ultimo_id = max(ids)
+            total += len(ids)
+            atualizadas_na_passada += len(ids)
+            if ao_progresso:
+                ao_progresso(total)
+            time.sleep(PAUSA_ENTRE_LOTES)
+        if atualizadas_na_passada == 0:
+            break
+
+    return total
+
+
+def renomear_categoria(conn, categoria_antiga, categoria_nova, usuario_id,
+                       tamanho_lote=None, ao_progresso=None):
+    """
+    Renomeia uma categoria num banco.
+
+    Args:
+        conn: conexão (não compartilhada) com o banco a ser atualizado
+        categoria_antiga / categoria_nova: nomes da categoria
+        usuario_id: usuário gravado na auditoria das despesas atualizadas
+        tamanho_lote: linhas por lote (padrão: RENOMEACAO_LOTE)
+        ao_progresso: callback chamado com o total de linhas já atualizadas
+
+    Returns:
+        dict: {'modo': 'renomeada' | 'mesclada' | 'inexistente', 'linhas': int}
+    """
+    with conn.cursor() as cur:
+        id_antigo = obter_id_categoria(cur, categoria_antiga)
+        id_novo = obter_id_categoria(cur, categoria_nova)
+    conn.commit()
+
+    if id_antigo is None:
+        return {'modo': 'inexistente', 'linhas': 0}
+
+    if id_novo is None:
+        # Nome novo livre: renomeia a linha da dimensão antes de reescrever o texto das
+        # despesas (o trigger resolve o nome novo para o mesmo id)
+        with conn.cursor() as cur:
+            cur.execute("UPDATE categorias_despesa SET nome = %s WHERE id = %s", (categoria_nova, id_antigo))
+        conn.commit()
+        linhas = mesclar_em_lotes(conn, id_antigo, id_antigo, categoria_nova, usuario_id,
+                                  tamanho_lote=tamanho_lote, ao_progresso=ao_progresso)
+
+        # Escritas concorrentes com o nome antigo recriaram a categoria: junta na renomeada
+        with conn.cursor() as cur:
+            id_recriado = obter_id_categoria(cur, categoria_antiga)
+        conn.commit()
+        if id_recriado is not None:
+            progresso = (lambda n: ao_progresso(linhas + n)) if ao_progresso else None
+            linhas += _mesclar_e_remover(conn, id_recriado, id_antigo, categoria_nova, usuario_id,
+                                         tamanho_lote, progresso)
+        return {'modo': 'renomeada', 'linhas': linhas}
+
+    if id_novo == id_antigo:
+        return {'modo': 'renomeada', 'linhas': 0}
+
+    # Nome novo já existe: mesclar as duas categorias
+    linhas = _mesclar_e_remover(conn, id_antigo, id_novo, categoria_nova, usuario_id,
+                                tamanho_lote, ao_progresso)
+    return {'modo': 'mesclada', 'linhas': linhas}
+
+
+def _mesclar_e_remover(conn, id_antigo, id_novo, nome_novo, usuario_id, tamanho_lote, ao_progresso):
+    """
+    Mescla id_antigo em id_novo e remove id_antigo da dimensão (se ficou sem despesas).
+    """
+    linhas = mesclar_em_lotes(conn, id_antigo, id_novo, nome_novo, usuario_id,
+                              tamanho_lote=tamanho_lote, ao_progresso=ao_progresso)
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM categorias_despesa c
+            WHERE c.id = %s
+              AND NOT EXISTS (SELECT 1 FROM Parcerias_Despesas pd WHERE pd.categoria_id = c.id)
+        """, (id_antigo,))
+    conn.commit()
+    return linhas
+
+
+@registrar_job('renomear_categoria')
+def job_renomear_categoria(contexto, categoria_antiga, categoria_nova, usuario_auditoria):
+    """
+    Job que renomeia uma categoria de despesa nos dois bancos
+    """
+    resultado = {'local': False, 'railway': False, 'linhas_afetadas': {}, 'errors': {}}
+
+    conexoes = {}
+    for banco in BANCOS:
+        try:
+            conexoes[banco] = conectar(banco)
+        except Exception as e:
+            resultado['errors'][banco] = str(e)
+
+    try:
+        # Total esperado (soma dos dois bancos) para o progresso do job
+        totais = {}
+        for banco, conn in list(conexoes.items()):
+            try:
+                garantir_indice_categoria(conn)
+                totais[banco] = contar_categoria(conn, categoria_antiga)
+            except Exception as e:
+                resultado['errors'][banco] = str(e)
+                conn.close()
+                del conexoes[banco]
+        contexto.progresso(0, total=sum(totais.values()), mensagem='Renomeando categoria', forcar=True)
+
+        ja_atualizadas = 0
+        for banco, conn in conexoes.items():
+            try:
+                renomeacao = renomear_categoria(
+                    conn, categoria_antiga, categoria_nova, usuario_auditoria,
+                    ao_progresso=lambda n: contexto.progresso(ja_atualizadas + n)
+                )
+                resultado['linhas_afetadas'][banco] = renomeacao['linhas']
+                resultado.setdefault('modo', {})[banco] = renomeacao['modo']
+                resultado[banco] = True
+                ja_atualizadas += renomeacao['linhas']
+            except Exception as e:
+                resultado['errors'][banco] = str(e)
+    finally:
+        for conn in conexoes.values():
+            conn.close()
+
+    if not (resultado['local'] or resultado['railway']):
+        raise RuntimeError(f"Falha ao atualizar categoria em ambos os bancos: {resultado['errors']}")
+
+    bancos = [banco.upper() for banco in BANCOS if resultado[banco]]
+    resultado['message'] = f"Categoria atualizada em: {', '.join(bancos)}" if len(bancos) < 2 else "Categoria atualizada em ambos os bancos"
+    resultado['categoria_antiga'] = categoria_antiga
+    resultado['categoria_nova'] = categoria_nova
+    return resultado
+
+
+# ========== CONSULTAS (mantêm os formatos JSON anteriores) ==========
+
+def listar_categorias(cur):
+    """
+    Nomes das categorias em uso, em ordem alfabética.
+    """
+    cur.execute("""
+        SELECT c.nome as categoria_despesa
+        FROM categorias_despesa c
+        WHERE EXISTS (SELECT 1 FROM Parcerias_Despesas pd WHERE pd.categoria_id = c.id)
+        ORDER BY c.nome
+    """)
+    return [row['categoria_despesa'] for row in cur.fetchall()]
+
+
+def contar_categorias_em_uso(cur):
+    """
+    Total de categorias com pelo menos uma despesa (paginação do dicionário).
+    """
+    cur.execute("""
+        SELECT COUNT(*) as total
+        FROM categorias_despesa c
+        WHERE EXISTS (SELECT 1 FROM Parcerias_Despesas pd WHERE pd.categoria_id = c.id)
+    """)
+    return cur.fetchone()['total']
+
+
+def estatisticas_categorias(cur, termo_busca=None, limite=200, offset=0):
+    """
+    Categorias com total de ocorrências, total de termos e rubrica mais comum.
+    """
+    query = ESTATISTICAS_CATEGORIAS
+    params = []
+    if termo_busca:
+        query += " WHERE c.nome ILIKE %s"
+        params.append(f"%{termo_busca}%")
+    query += " ORDER BY c.nome LIMIT %s OFFSET %s"
+    params.extend([limite, offset])
+    cur.execute(query, params)
+    return cur.fetchall()
+
+
+def rubrica_sugerida(cur, categoria):
+    """
+    Rubrica mais frequente para a categoria, ou None.
+    """
+    cur.execute(CONSULTA_RUBRICA_SUGERIDA, (categoria,))
+    resultado = cur.fetchone()
+    return resultado['rubrica'] if resultado else None
+
+
+def termos_da_categoria(cur, categoria):
+    """
+    Termos que usam a categoria, com total de despesas e valor total.
+    """
+    cur.execute(CONSULTA_TERMOS_DA_CATEGORIA, (categoria,))
+    return cur.fetchall()
@@ -0,0 +1,164 @@
+"""
+Compressão das respostas (brotli ou gzip, conforme o Accept-Encoding)
+
+As páginas do orçamento e os JSON/CSV saíam sem compressão; em links lentos
+o tempo de transferência dominava o carregamento. O gancho after_request
+registrado por instalar(app):
+
+ - comprime HTML, JSON, CSV, JS, CSS, SVG e texto, com brotli quando o
+   navegador aceita (e o pacote Brotli está instalado) ou gzip;
+ - ignora respostas menores que COMPRESSAO_MINIMO_BYTES, já codificadas,
+   304/204, HEAD e as marcadas com Cache-Control: no-transform;
+ - respostas em streaming (exportações CSV) são comprimidas pedaço a pedaço,
+   sem juntar o arquivo inteiro na memória;
+ - arquivos estáticos são comprimidos uma vez, no nível máximo, e guardados
+   na memória do processo (até COMPRESSAO_CACHE_ESTATICOS arquivos; a chave
+   inclui data de modificação e tamanho, então um arquivo alterado é
+   comprimido de novo).
+
+Toda resposta de tipo comprimível recebe Vary: Accept-Encoding, para que
+proxies não entreguem a versão comprimida a quem não a aceita.
+"""
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from config import (COMPRESSAO_CACHE_ESTATICOS, COMPRESSAO_HABILITADA, COMPRESSAO_MINIMO_BYTES,
+                    COMPRESSAO_NIVEL_BROTLI, COMPRESSAO_NIVEL_GZIP)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli está no requirements.txt
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = {
+    'text/html', 'text/plain', 'text/csv', 'text/css', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+# Níveis usados nos estáticos, comprimidos uma única vez
+NIVEL_MAXIMO_BROTLI = 11
+NIVEL_MAXIMO_GZIP = 9
+
+_cache_estaticos = OrderedDict()
+_trava_cache = threading.Lock()
+
+
+def _codificacao_aceita():
+    """
+    'br', 'gzip' ou None, pela preferência do navegador (em empate, brotli).
+    """
+    aceitas = request.accept_encodings
+    br = aceitas.quality('br') if brotli is not None else 0
+    gz = aceitas.quality('gzip')
+    if br > 0 and br >= gz:
+        return 'br'
+    if gz > 0:
+        return 'gzip'
+    return None
+
+
+def comprimir(dados, codificacao, nivel=None):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=COMPRESSAO_NIVEL_BROTLI if nivel is None else nivel)
+    return gzip.compress(dados, compresslevel=COMPRESSAO_NIVEL_GZIP if nivel is None else nivel, mtime=0)
+
+
+def _comprimir_fluxo(pedacos, codificacao):
+    """
+    Comprime um iterável de pedaços (str ou bytes) à medida que são produzidos.
+    """
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=COMPRESSAO_NIVEL_BROTLI)
+        processar, finalizar = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        processar, finalizar = compressor.compress, compressor.flush
+    try:
+        for pedaco in pedacos:
+            if isinstance(pedaco, str):
+                pedaco = pedaco.encode('utf-8')
+            saida = processar(pedaco)
+            if saida:
+                yield saida
+        yield finalizar()
+    finally:
+        if hasattr(pedacos, 'close'):
+            pedacos.close()
+
+
+def _estatico_comprimido(response, codificacao):
+    """
+    Corpo comprimido de um arquivo estático, do cache ou comprimido agora (nível máximo).
+    """
+    chave = (request.path, response.last_modified, response.content_length, codificacao)
+    with _trava_cache:
+        corpo = _cache_estaticos.get(chave)
+        if corpo is not None:
+            _cache_estaticos.move_to_end(chave)
+            return corpo
+
+    nivel = NIVEL_MAXIMO_BROTLI if codificacao == 'br' else NIVEL_MAXIMO_GZIP
+    corpo = comprimir(response.get_data(), codificacao, nivel)
+    with _trava_cache:
+        _cache_estaticos[chave] = corpo
+        while len(_cache_estaticos) > COMPRESSAO_CACHE_ESTATICOS:
+            _cache_estaticos.popitem(last=False)
+    return corpo
+
+
+def comprimivel(mimetype):
+    # Tipos JSON próprios (application/vnd.*+json) também são texto
+    return mimetype in TIPOS_COMPRIMIVEIS or mimetype.endswith('+json')
+
+
+def _comprimir_resposta(response):
+    if not comprimivel(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    # 206/Content-Range: o corpo é um trecho e Content-Range conta bytes não comprimidos
+    if (request.method == 'HEAD' or response.status_code in (204, 206, 304) or response.status_code < 200
+            or 'Content-Range' in response.headers or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    codificacao = _codificacao_aceita()
+    if codificacao is None:
+        return response
+
+    if response.is_streamed and not response.direct_passthrough:
+        # Tamanho desconhecido: comprime enquanto o conteúdo é gerado
+        response.response = _comprimir_fluxo(response.response, codificacao)
+        response.headers.pop('Content-Length', None)
+    else:
+        if response.content_length is not None and response.content_length < COMPRESSAO_MINIMO_BYTES:
+            return response
+        estatico = request.endpoint == 'static'
+        # Arquivos (send_file) vêm em direct_passthrough: é preciso ler o conteúdo
+        response.direct_passthrough = False
+        if len(response.get_data()) < COMPRESSAO_MINIMO_BYTES:
+            return response
+        if estatico:
+            response.set_data(_estatico_comprimido(response, codificacao))
+        else:
+            response.set_data(comprimir(response.get_data(), codificacao))
+
+    response.headers['Content-Encoding'] = codificacao
+    # O mesmo ETag não pode valer para corpos diferentes
+    etag, fraco = response.get_etag()
+    if etag and not fraco:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def instalar(app):
+    """
+    Registra a compressão das respostas (chamar antes dos demais ganchos: roda por último).
+    """
+    if COMPRESSAO_HABILITADA:
+        app.after_request(_comprimir_resposta)
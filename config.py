@@ -3,6 +3,7 @@ Configurações da aplicação Flask
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente do arquivo .env
@@ -29,5 +30,88 @@ DB_CONFIG_RAILWAY = {
 # Mantém DB_CONFIG como referência ao Railway (padrão para produção)
 DB_CONFIG = DB_CONFIG_RAILWAY
 
+# Pool de conexões das requisições: máximo por banco em cada worker (0 = conexão
+# nova a cada requisição) e segundos de espera por uma conexão livre
+DB_POOL_MAXIMO = int(os.environ.get('DB_POOL_MAXIMO', '10'))
+DB_POOL_ESPERA = float(os.environ.get('DB_POOL_ESPERA', '10'))
+
+# Conexões ociosas no pool: fechadas após DB_POOL_OCIOSA_MAX_S segundos e testadas
+# (SELECT 1) antes do uso quando paradas há mais de DB_POOL_VERIFICAR_APOS_S
+DB_POOL_OCIOSA_MAX_S = float(os.environ.get('DB_POOL_OCIOSA_MAX_S', '300'))
+DB_POOL_VERIFICAR_APOS_S = float(os.environ.get('DB_POOL_VERIFICAR_APOS_S', '5'))
+
+# Timeouts das conexões: segundos para conectar e ms por comando SQL nas requisições (0 = sem limite)
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+# Disjuntor por banco (ver disjuntor.py): falhas de conexão seguidas que abrem o circuito e
+# espera (s) até a próxima tentativa, dobrando a cada sonda que falha até o máximo
+DISJUNTOR_FALHAS = int(os.environ.get('DISJUNTOR_FALHAS', '3'))
+DISJUNTOR_ESPERA_INICIAL = float(os.environ.get('DISJUNTOR_ESPERA_INICIAL', '5'))
+DISJUNTOR_ESPERA_MAXIMA = float(os.environ.get('DISJUNTOR_ESPERA_MAXIMA', '300'))
+
+# Leituras roteadas entre LOCAL e RAILWAY pela latência/saúde medida (ver roteamento_leitura.py):
+# intervalo e timeout (s) da sonda e tempo (s) que a sessão lê só dos bancos em que acabou de gravar
+LEITURA_ROTEADA = os.environ.get('LEITURA_ROTEADA', 'True') == 'True'
+LEITURA_SONDA_INTERVALO = float(os.environ.get('LEITURA_SONDA_INTERVALO', '5'))
+LEITURA_SONDA_TIMEOUT = float(os.environ.get('LEITURA_SONDA_TIMEOUT', '3'))
+LEITURA_FIXACAO_S = float(os.environ.get('LEITURA_FIXACAO_S', '300'))
+
+# Tipo de worker do gunicorn (sync ou gevent) e requisições simultâneas por worker gevent
+GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+GUNICORN_CONEXOES = int(os.environ.get('GUNICORN_CONEXOES', '200'))
+
+# Segundos até cada worker recarregar o índice de portarias de c_legislacao (ver portarias.py)
+PORTARIAS_RECARGA_S = float(os.environ.get('PORTARIAS_RECARGA_S', '60'))
+
+# Segundos até cada worker remontar os dados do formulário de parcerias (ver formulario_parceria.py)
+FORMULARIO_RECARGA_S = float(os.environ.get('FORMULARIO_RECARGA_S', '60'))
+
+# Segundos até cada worker remontar o índice do autocomplete de OSCs (ver oscs.py)
+OSCS_RECARGA_S = float(os.environ.get('OSCS_RECARGA_S', '60'))
+
+# Compressão das respostas (ver compressao.py): tamanho mínimo (bytes), níveis para respostas
+# dinâmicas e número de arquivos estáticos comprimidos guardados na memória de cada worker
+COMPRESSAO_HABILITADA = os.environ.get('COMPRESSAO_HABILITADA', 'True') == 'True'
+COMPRESSAO_MINIMO_BYTES = int(os.environ.get('COMPRESSAO_MINIMO_BYTES', '1024'))
+COMPRESSAO_NIVEL_GZIP = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', '6'))
+COMPRESSAO_NIVEL_BROTLI = int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', '5'))
+COMPRESSAO_CACHE_ESTATICOS = int(os.environ.get('COMPRESSAO_CACHE_ESTATICOS', '256'))
+
+# Número de processos usados para ler/validar planilhas na importação em lote
+IMPORTACAO_PROCESSOS = int(os.environ.get('IMPORTACAO_PROCESSOS', '4'))
+
+# Máximo de jobs em segundo plano executando ao mesmo tempo em cada processo
+JOBS_CONCORRENCIA = int(os.environ.get('JOBS_CONCORRENCIA', '2'))
+
+# Intervalo (segundos) em que cada processo marca seus jobs pendentes/em execução como vivos;
+# jobs sem sinal há JOBS_BATIMENTOS_PERDIDOS intervalos (processo reiniciado, deploy) viram erro
+JOBS_BATIMENTO_SEGUNDOS = int(os.environ.get('JOBS_BATIMENTO_SEGUNDOS', '15'))
+JOBS_BATIMENTOS_PERDIDOS = int(os.environ.get('JOBS_BATIMENTOS_PERDIDOS', '4'))
+
+# Linhas atualizadas por lote na renomeação em massa de categorias
+RENOMEACAO_LOTE = int(os.environ.get('RENOMEACAO_LOTE', '500'))
+
+# Nível mínimo de log (DEBUG, INFO, WARNING, ERROR) e formato da saída (json ou texto)
+LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO').upper()
+LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+
+# Instrumentação de SQL por requisição (Server-Timing e logs de consultas lentas)
+INSTRUMENTACAO_SQL = os.environ.get('INSTRUMENTACAO_SQL', 'True') == 'True'
+
+# Comandos SQL acima deste tempo (ms) são registrados no log de consultas lentas
+SQL_LENTA_MS = float(os.environ.get('SQL_LENTA_MS', '200'))
+
+# Repetições do mesmo comando numa requisição que indicam padrão N+1
+SQL_REPETICOES_ALERTA = int(os.environ.get('SQL_REPETICOES_ALERTA', '20'))
+
+# Perfilamento sob demanda (X-Perfilar: 1 ou ?_perfilar=1, só Agente Público)
+PERFILAMENTO_HABILITADO = os.environ.get('PERFILAMENTO_HABILITADO', 'True') == 'True'
+PERFIS_DIR = os.environ.get('PERFIS_DIR', os.path.join(tempfile.gettempdir(), 'faf_perfis'))
+PERFIS_MAX = int(os.environ.get('PERFIS_MAX', '50'))
+
+# Token exigido em /metrics (Authorization: Bearer <token>); vazio = só usuários logados ou localhost
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
 SECRET_KEY = os.environ.get('SECRET_KEY', 'chave-padrao')
 DEBUG = os.environ.get('DEBUG', 'False') == 'True'
\ No newline at end of file
@@ -4,10 +4,84 @@ Suporta conexões duais: local e Railway (para redundância)
 Inclui suporte para auditoria automática via triggers
 """
 
+import logging
+
 from flask import g, session
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG, DB_CONFIG_LOCAL, DB_CONFIG_RAILWAY
+from config import (DB_CONFIG_LOCAL, DB_CONFIG_RAILWAY, DB_CONNECT_TIMEOUT, DB_POOL_ESPERA, DB_POOL_MAXIMO,
+                    DB_POOL_OCIOSA_MAX_S, DB_POOL_VERIFICAR_APOS_S, DB_STATEMENT_TIMEOUT_MS)
+from disjuntor import BancoIndisponivel, obter_disjuntor
+from instrumentacao import ConexaoInstrumentada
+from metricas import registrar_escrita_dual, registrar_leitura
+from pool_conexoes import PoolEsgotado, fechar_ociosas, obter_pool
+import roteamento_leitura
+
+# Bancos que recebem as escritas duais, na ordem em que são gravados
+BANCOS = {
+    'local': DB_CONFIG_LOCAL,
+    'railway': DB_CONFIG_RAILWAY
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _abrir_conexao(config, banco, statement_timeout_ms=0):
+    """
+    Abre uma conexão instrumentada (ver instrumentacao.py), identificada pelo nome do banco.
+    """
+    opcoes = {}
+    if statement_timeout_ms:
+        opcoes['options'] = f"-c statement_timeout={statement_timeout_ms}"
+    conn = psycopg2.connect(**config, connect_timeout=DB_CONNECT_TIMEOUT,
+                            connection_factory=ConexaoInstrumentada, **opcoes)
+    conn.banco = banco
+    return conn
+
+
+def _registrar_falha_conexao(banco, erro):
+    if obter_disjuntor(banco).registrar_falha(erro):
+        # As conexões ociosas do pool caíram junto com o banco
+        fechar_ociosas(banco)
+
+
+def _obter_conexao(banco):
+    """
+    Conexão para a requisição atual: do pool do banco (ver pool_conexoes.py)
+    ou, com DB_POOL_MAXIMO=0, uma conexão nova.
+    Com o circuito do banco aberto (ver disjuntor.py) levanta BancoIndisponivel sem tentar conectar.
+    """
+    disjuntor = obter_disjuntor(banco)
+    disjuntor.verificar()
+    abrir = lambda: _abrir_conexao(BANCOS[banco], banco, DB_STATEMENT_TIMEOUT_MS)
+    try:
+        if DB_POOL_MAXIMO > 0:
+            pool = obter_pool(banco, abrir, DB_POOL_MAXIMO, DB_POOL_ESPERA,
+                              DB_POOL_OCIOSA_MAX_S, DB_POOL_VERIFICAR_APOS_S)
+            conn = pool.obter()
+            conn.pool = pool
+        else:
+            conn = abrir()
+    except PoolEsgotado:
+        raise  # banco no ar, só ocupado
+    except psycopg2.OperationalError as e:
+        _registrar_falha_conexao(banco, e)
+        raise
+    disjuntor.registrar_sucesso()
+    conn.autocommit = False  # Para controlar transações manualmente
+    return conn
+
+
+def _liberar_conexao(conn):
+    if conn.closed == 2:
+        # Conexão quebrada durante a requisição (servidor caiu ou rede)
+        _registrar_falha_conexao(conn.banco, "Conexão perdida durante a requisição")
+    pool = getattr(conn, 'pool', None)
+    if pool is not None:
+        conn.pool = None
+        pool.devolver(conn)
+    else:
+        conn.close()
 
 
 def get_db_local():
@@ -17,10 +91,12 @@ def get_db_local():
     """
     if "db_local" not in g:
         try:
-            g.db_local = psycopg2.connect(**DB_CONFIG_LOCAL)
-            g.db_local.autocommit = False  # Para controlar transações manualmente
+            g.db_local = _obter_conexao('local')
+        except BancoIndisponivel as e:
+            logger.debug("%s", e)
+            g.db_local = None
         except Exception as e:
-            print(f"[AVISO] Falha ao conectar no banco LOCAL: {e}")
+            logger.warning("Falha ao conectar no banco LOCAL: %s", e)
             g.db_local = None
     return g.db_local
 
@@ -30,16 +106,19 @@ def get_db_railway():
     Obtém a conexão com o banco de dados RAILWAY.
     Cria uma nova conexão se não existir uma no contexto da aplicação.
     """
+    if "db_railway" not in g and g.get("db") is not None:
+        # Mesma conexão de get_db(): uma conexão RAILWAY por requisição
+        g.db_railway = g.db
     if "db_railway" not in g:
         try:
-            print(f"[DEBUG] Tentando conectar ao banco RAILWAY...")
-            g.db_railway = psycopg2.connect(**DB_CONFIG_RAILWAY)
-            g.db_railway.autocommit = False  # Para controlar transações manualmente
-            print(f"[DEBUG] Conexão RAILWAY estabelecida com sucesso")
+            logger.debug("Tentando conectar ao banco RAILWAY...")
+            g.db_railway = _obter_conexao('railway')
+            logger.debug("Conexão RAILWAY estabelecida com sucesso")
+        except BancoIndisponivel as e:
+            logger.debug("%s", e)
+            g.db_railway = None
         except Exception as e:
-            print(f"[AVISO] Falha ao conectar no banco RAILWAY: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Falha ao conectar no banco RAILWAY: %s", e)
             g.db_railway = None
     return g.db_railway
 
@@ -50,11 +129,34 @@ def get_db():
     Mantida para retrocompatibilidade com código existente.
     """
     if "db" not in g:
-        g.db = psycopg2.connect(**DB_CONFIG)
-        g.db.autocommit = False
+        # Reaproveita a conexão de get_db_railway(), se já aberta: com o pool
+        # limitado, duas conexões do mesmo banco por requisição poderiam travar
+        # requisições concorrentes esperando umas pelas outras
+        g.db = g.get("db_railway") or _obter_conexao('railway')
     return g.db
 
 
+def conectar(banco, statement_timeout_ms=0):
+    """
+    Abre uma conexão avulsa com o banco indicado ('local' ou 'railway').
+    Usada por rotinas em segundo plano, que rodam fora do contexto da requisição
+    e não podem reaproveitar as conexões guardadas em `g`.
+    Respeita o disjuntor do banco (levanta BancoIndisponivel com o circuito aberto)
+    e o DB_CONNECT_TIMEOUT; statement_timeout_ms limita cada consulta (0 = sem limite).
+    O chamador é responsável por fechar a conexão.
+    """
+    disjuntor = obter_disjuntor(banco)
+    disjuntor.verificar()
+    try:
+        conn = _abrir_conexao(BANCOS[banco], banco, statement_timeout_ms)
+    except psycopg2.OperationalError as e:
+        _registrar_falha_conexao(banco, e)
+        raise
+    disjuntor.registrar_sucesso()
+    conn.autocommit = False
+    return conn
+
+
 def get_cursor_local():
     """
     Retorna um cursor do banco LOCAL que funciona como dictionary.
@@ -86,6 +188,24 @@ def get_cursor():
     return db.cursor(cursor_factory=RealDictCursor)
 
 
+def get_cursor_leitura(cursor_factory=RealDictCursor):
+    """
+    Cursor para consultas SOMENTE LEITURA, no banco indicado pelo roteamento
+    (ver roteamento_leitura.py): o mais rápido entre os saudáveis, respeitando
+    a fixação da sessão após uma escrita. Se o banco escolhido não conectar,
+    tenta o próximo.
+    Não use para escritas: elas devem ir aos dois bancos via execute_dual*.
+    """
+    for banco in roteamento_leitura.bancos_para_leitura(list(BANCOS)):
+        db = get_db_local() if banco == 'local' else get_db_railway()
+        if db is not None:
+            registrar_leitura(banco)
+            return db.cursor(cursor_factory=cursor_factory)
+        roteamento_leitura.marcar_falha(banco, "Falha ao conectar na requisição")
+    # Nenhum banco disponível: o erro de conexão do padrão sobe para a rota
+    return get_db().cursor(cursor_factory=cursor_factory)
+
+
 def execute_dual(query, params=None):
     """
     Executa uma operação de escrita (INSERT/UPDATE/DELETE) nos dois bancos de dados.
@@ -109,12 +229,12 @@ def execute_dual(query, params=None):
             cur_local.execute(query, params)
             get_db_local().commit()
             success_local = True
-            print(f"[DEBUG] Query executada com sucesso no banco LOCAL")
+            logger.debug("Query executada com sucesso no banco LOCAL")
         else:
             errors['local'] = "Cursor LOCAL não disponível"
     except Exception as e:
         error_msg = str(e)
-        print(f"[ERRO] Falha ao executar no banco LOCAL: {error_msg}")
+        logger.error("Falha ao executar no banco LOCAL: %s", error_msg)
         errors['local'] = error_msg
         try:
             db_local = get_db_local()
@@ -130,12 +250,12 @@ def execute_dual(query, params=None):
             cur_railway.execute(query, params)
             get_db_railway().commit()
             success_railway = True
-            print(f"[DEBUG] Query executada com sucesso no banco RAILWAY")
+            logger.debug("Query executada com sucesso no banco RAILWAY")
         else:
             errors['railway'] = "Cursor RAILWAY não disponível"
     except Exception as e:
         error_msg = str(e)
-        print(f"[ERRO] Falha ao executar no banco RAILWAY: {error_msg}")
+        logger.error("Falha ao executar no banco RAILWAY: %s", error_msg)
         errors['railway'] = error_msg
         try:
             db_railway = get_db_railway()
@@ -151,6 +271,8 @@ def execute_dual(query, params=None):
         'railway': success_railway,
         'errors': errors
     }
+    registrar_escrita_dual(result)
+    roteamento_leitura.registrar_escrita(result)
     
     return result
 
@@ -190,12 +312,12 @@ def execute_dual_with_audit(query, params=None, usuario_id=None):
             # Commit
             db_local.commit()
             success_local = True
-            print(f"[DEBUG] Query com auditoria executada no LOCAL (user_id={usuario_id})")
+            logger.debug("Query com auditoria executada no LOCAL (user_id=%s)", usuario_id)
         else:
             errors['local'] = "Conexão LOCAL não disponível"
     except Exception as e:
         error_msg = str(e)
-        print(f"[ERRO] Falha no LOCAL: {error_msg}")
+        logger.error("Falha no LOCAL: %s", error_msg)
         errors['local'] = error_msg
         try:
             db_local = get_db_local()
@@ -220,12 +342,12 @@ def execute_dual_with_audit(query, params=None, usuario_id=None):
             # Commit
             db_railway.commit()
             success_railway = True
-            print(f"[DEBUG] Query com auditoria executada no RAILWAY (user_id={usuario_id})")
+            logger.debug("Query com auditoria executada no RAILWAY (user_id=%s)", usuario_id)
         else:
             errors['railway'] = "Conexão RAILWAY não disponível"
     except Exception as e:
         error_msg = str(e)
-        print(f"[ERRO] Falha no RAILWAY: {error_msg}")
+        logger.error("Falha no RAILWAY: %s", error_msg)
         errors['railway'] = error_msg
         try:
             db_railway = get_db_railway()
@@ -234,29 +356,25 @@ def execute_dual_with_audit(query, params=None, usuario_id=None):
         except:
             pass
     
-    return {
+    result = {
         'success': success_local or success_railway,
         'local': success_local,
         'railway': success_railway,
         'errors': errors
     }
+    registrar_escrita_dual(result)
+    roteamento_leitura.registrar_escrita(result)
+    
+    return result
 
 
 def close_db(e=None):
     """
-    Fecha as conexões com os bancos de dados ao final do contexto da aplicação.
+    Devolve ao pool (ou fecha) as conexões da requisição ao final do contexto da aplicação.
     """
-    # Fechar conexão local
-    db_local = g.pop("db_local", None)
-    if db_local is not None:
-        db_local.close()
-    
-    # Fechar conexão railway
-    db_railway = g.pop("db_railway", None)
-    if db_railway is not None:
-        db_railway.close()
-    
-    # Fechar conexão padrão (retrocompatibilidade)
-    db = g.pop("db", None)
-    if db is not None:
-        db.close()
+    liberadas = set()
+    for chave in ("db_local", "db_railway", "db"):
+        conn = g.pop(chave, None)
+        if conn is not None and id(conn) not in liberadas:
+            liberadas.add(id(conn))
+            _liberar_conexao(conn)
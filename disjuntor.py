@@ -0,0 +1,179 @@
+"""
+Disjuntor (circuit breaker) por banco para as conexões das requisições
+
+Sem ele, com o RAILWAY fora do ar cada requisição tentava conectar de novo
+e ficava parada até o timeout TCP do sistema, e as escritas duais
+travavam junto. Agora:
+
+ - as conexões têm connect_timeout (DB_CONNECT_TIMEOUT) e as das
+   requisições também statement_timeout (DB_STATEMENT_TIMEOUT_MS);
+ - após DISJUNTOR_FALHAS falhas de conexão seguidas o circuito do banco
+   ABRE: as requisições seguintes recebem BancoIndisponivel na hora, sem
+   tentar conectar. execute_dual* registra o banco como não gravado e
+   segue com o outro; rotas que dependem só dele respondem 503;
+ - passado o tempo de espera, UMA requisição é liberada como sonda
+   (MEIO-ABERTO). Se conectar, o circuito fecha; se falhar, reabre com o
+   dobro da espera (de DISJUNTOR_ESPERA_INICIAL até DISJUNTOR_ESPERA_MAXIMA).
+
+O estado é por processo (cada worker tem o seu) e fica disponível em
+estado_disjuntores() e na métrica faf_disjuntor_estado.
+"""
+
+import logging
+import threading
+import time
+
+import psycopg2
+from flask import jsonify, request
+
+from config import (DB_CONNECT_TIMEOUT, DISJUNTOR_ESPERA_INICIAL, DISJUNTOR_ESPERA_MAXIMA,
+                    DISJUNTOR_FALHAS)
+from metricas import registrar_disjuntor
+
+logger = logging.getLogger(__name__)
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+
+class BancoIndisponivel(psycopg2.OperationalError):
+    """
+    Circuito do banco aberto: a conexão nem foi tentada.
+    """
+
+    def __init__(self, banco, tentar_em):
+        self.banco = banco
+        self.tentar_em = tentar_em
+        super().__init__(f"Banco {banco.upper()} indisponível (circuito aberto, "
+                         f"nova tentativa em {self.segundos_restantes():.0f}s)")
+
+    def segundos_restantes(self):
+        return max(0.0, self.tentar_em - time.time())
+
+
+class Disjuntor:
+    """
+    Estado do circuito de um banco: FECHADO, ABERTO ou MEIO_ABERTO.
+    """
+
+    def __init__(self, banco, falhas_para_abrir, espera_inicial, espera_maxima):
+        self.banco = banco
+        self.falhas_para_abrir = falhas_para_abrir
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._trava = threading.Lock()
+        self._estado = FECHADO
+        self._falhas = 0
+        self._espera = espera_inicial
+        self._tentar_em = 0.0
+        self._sonda_desde = None
+        self._ultimo_erro = None
+
+    def verificar(self):
+        """
+        Levanta BancoIndisponivel se a conexão não deve ser tentada agora.
+        Com o circuito aberto e a espera vencida, libera esta chamada como sonda.
+        """
+        with self._trava:
+            agora = time.time()
+            if self._estado == FECHADO:
+                return
+            if self._estado == MEIO_ABERTO:
+                # Uma sonda por vez; se ela não deu notícia (requisição abortada), libera outra
+                if agora - self._sonda_desde < DB_CONNECT_TIMEOUT * 2:
+                    raise BancoIndisponivel(self.banco, self._sonda_desde + DB_CONNECT_TIMEOUT * 2)
+            elif agora < self._tentar_em:
+                raise BancoIndisponivel(self.banco, self._tentar_em)
+            self._mudar(MEIO_ABERTO)
+            self._sonda_desde = agora
+
+    def registrar_sucesso(self):
+        with self._trava:
+            self._falhas = 0
+            if self._estado != FECHADO:
+                logger.info("Circuito fechado: banco de volta", extra={'banco': self.banco})
+                self._espera = self.espera_inicial
+                self._mudar(FECHADO)
+
+    def registrar_falha(self, erro):
+        """
+        Contabiliza uma falha de conexão. Retorna True se o circuito acabou de abrir.
+        """
+        with self._trava:
+            self._falhas += 1
+            self._ultimo_erro = str(erro).strip()
+            if self._estado == MEIO_ABERTO:
+                self._espera = min(self._espera * 2, self.espera_maxima)
+            elif self._estado == ABERTO or self._falhas < self.falhas_para_abrir:
+                return False
+
+            abriu = self._estado == FECHADO
+            self._tentar_em = time.time() + self._espera
+            self._mudar(ABERTO)
+            logger.warning("Circuito aberto: banco fora do ar", extra={
+                'banco': self.banco, 'falhas': self._falhas, 'espera_s': self._espera,
+                'erro': self._ultimo_erro,
+            })
+            return abriu
+
+    def aberto(self):
+        return self._estado != FECHADO
+
+    def estado(self):
+        with self._trava:
+            return {
+                'estado': self._estado,
+                'falhas_seguidas': self._falhas,
+                'espera_s': self._espera,
+                'tentar_em': self._tentar_em if self._estado == ABERTO else None,
+                'ultimo_erro': self._ultimo_erro,
+            }
+
+    def _mudar(self, estado):
+        self._estado = estado
+        registrar_disjuntor(self.banco, estado)
+
+
+_disjuntores = {}
+_trava_disjuntores = threading.Lock()
+
+
+def obter_disjuntor(banco):
+    with _trava_disjuntores:
+        disjuntor = _disjuntores.get(banco)
+        if disjuntor is None:
+            disjuntor = _disjuntores[banco] = Disjuntor(
+                banco, DISJUNTOR_FALHAS, DISJUNTOR_ESPERA_INICIAL, DISJUNTOR_ESPERA_MAXIMA
+            )
+        return disjuntor
+
+
+def estado_disjuntores():
+    """
+    {banco: {'estado', 'falhas_seguidas', 'espera_s', 'tentar_em', 'ultimo_erro'}} neste processo.
+    """
+    with _trava_disjuntores:
+        disjuntores = dict(_disjuntores)
+    return {banco: disjuntor.estado() for banco, disjuntor in disjuntores.items()}
+
+
+def _banco_indisponivel(erro):
+    """
+    Rota que dependia de um banco com circuito aberto: 503 com Retry-After, sem traceback.
+    """
+    logger.info("Requisição recusada: %s", erro, extra={'banco': erro.banco})
+    espera = max(1, round(erro.segundos_restantes()))
+    mensagem = f"Banco {erro.banco.upper()} temporariamente indisponível. Tente novamente em instantes."
+    if request.path.startswith('/api/') or request.is_json:
+        resposta = jsonify({'error': mensagem})
+    else:
+        resposta = mensagem
+    return resposta, 503, {'Retry-After': str(espera)}
+
+
+def instalar(app):
+    """
+    Responde 503 (em vez de 500) quando a rota esbarra num circuito aberto.
+    """
+    app.register_error_handler(BancoIndisponivel, _banco_indisponivel)
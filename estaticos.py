@@ -0,0 +1,141 @@
+"""
+JS/CSS das páginas como arquivos estáticos com hash do conteúdo no nome
+
+Os scripts e estilos das páginas (orçamento, dicionário, formulário de
+parcerias, listas) ficam em static/js e static/css. Na inicialização, cada
+arquivo é minificado (rjsmin/rcssmin, se instalados) e gravado em
+static/dist/ com o hash do conteúdo no nome:
+
+    static/js/orcamento_2.js  ->  static/dist/js/orcamento_2.3f9c2a1b7d4e.js
+
+Os templates apontam para os arquivos pelo helper estatico():
+
+    <script src="{{ estatico('js/orcamento_2.js') }}"></script>
+
+Os arquivos de dist/ são servidos com Cache-Control de um ano (immutable):
+uma alteração no arquivo muda o nome, então o navegador só baixa de novo o
+que mudou, e as visitas seguintes às páginas transferem apenas o HTML e os
+dados. Com DEBUG, arquivos alterados são reprocessados a cada página.
+
+static/dist/ é gerado (não versionado). Se não puder ser gravado, os
+templates recebem o endereço do arquivo original, sem cache longo.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from flask import current_app, request, url_for
+
+try:
+    import rjsmin
+    import rcssmin
+except ImportError:  # pragma: no cover - estão no requirements.txt
+    rjsmin = rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+PASTA_DIST = 'dist'
+EXTENSOES = ('.js', '.css')
+CACHE_UM_ANO = 365 * 24 * 3600
+
+# caminho de origem (relativo a static/) -> (mtime_ns, tamanho, caminho em dist/)
+_manifesto = {}
+_trava = threading.Lock()
+
+
+def minificar(conteudo, extensao):
+    if rjsmin is None:
+        return conteudo
+    if extensao == '.js':
+        return rjsmin.jsmin(conteudo)
+    return rcssmin.cssmin(conteudo)
+
+
+def _processar(pasta_static, caminho):
+    """
+    Minifica e grava em dist/ o arquivo `caminho`, se ainda não estiver no manifesto com o mesmo mtime/tamanho.
+    """
+    origem = os.path.join(pasta_static, caminho)
+    info = os.stat(origem)
+    with _trava:
+        atual = _manifesto.get(caminho)
+    if atual and atual[:2] == (info.st_mtime_ns, info.st_size):
+        return atual[2]
+
+    base, extensao = os.path.splitext(caminho)
+    with open(origem, encoding='utf-8') as arquivo:
+        conteudo = minificar(arquivo.read(), extensao).encode('utf-8')
+    versao = hashlib.sha256(conteudo).hexdigest()[:12]
+    destino = f'{PASTA_DIST}/{base}.{versao}{extensao}'.replace(os.sep, '/')
+
+    arquivo_destino = os.path.join(pasta_static, destino)
+    if not os.path.exists(arquivo_destino):
+        os.makedirs(os.path.dirname(arquivo_destino), exist_ok=True)
+        # Vários workers podem gravar o mesmo arquivo ao mesmo tempo: grava em temporário e troca
+        temporario = f'{arquivo_destino}.{os.getpid()}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, arquivo_destino)
+
+    with _trava:
+        _manifesto[caminho] = (info.st_mtime_ns, info.st_size, destino)
+    return destino
+
+
+def construir(pasta_static):
+    """
+    Processa todos os .js/.css de static/ (fora de dist/). Devolve {origem: destino}.
+    """
+    gerados = {}
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        if os.path.relpath(raiz, pasta_static) == '.':
+            pastas[:] = [p for p in pastas if p != PASTA_DIST]
+        for nome in sorted(arquivos):
+            if nome.endswith(EXTENSOES):
+                caminho = os.path.relpath(os.path.join(raiz, nome), pasta_static).replace(os.sep, '/')
+                gerados[caminho] = _processar(pasta_static, caminho)
+    return gerados
+
+
+def estatico(caminho):
+    """
+    Endereço da versão com hash de static/<caminho> (helper dos templates).
+    """
+    with _trava:
+        atual = _manifesto.get(caminho)
+    destino = atual[2] if atual else None
+    if destino is None or current_app.debug:
+        try:
+            destino = _processar(current_app.static_folder, caminho)
+        except OSError:
+            logger.warning("Arquivo estático sem versão com hash: %s", caminho, exc_info=True)
+            destino = caminho
+    return url_for('static', filename=destino)
+
+
+def _cache_longo(response):
+    if (request.endpoint == 'static' and response.status_code in (200, 304)
+            and request.path.startswith(f'{current_app.static_url_path}/{PASTA_DIST}/')):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = CACHE_UM_ANO
+        response.cache_control.immutable = True
+    return response
+
+
+def instalar(app):
+    """
+    Gera static/dist/, registra o helper estatico() nos templates e o cache longo dos arquivos com hash.
+    """
+    if rjsmin is None:
+        logger.warning("rjsmin/rcssmin não instalados: JS/CSS servidos sem minificação")
+    try:
+        gerados = construir(app.static_folder)
+        logger.info("Arquivos estáticos com hash: %d em %s/%s", len(gerados), app.static_folder, PASTA_DIST)
+    except OSError:
+        logger.warning("Não foi possível gerar %s/%s", app.static_folder, PASTA_DIST, exc_info=True)
+
+    app.add_template_global(estatico)
+    app.after_request(_cache_longo)
@@ -0,0 +1,97 @@
+"""
+Dados iniciais do formulário de parcerias (nova/editar)
+
+O formulário precisava de três consultas na renderização (tipos de contrato
+e legislações) e de mais duas requisições do navegador (/api/oscs e
+/api/sigla-tipo-termo). Agora tudo sai de um único pacote por processo:
+
+    {
+      "tipos_contrato": [...],            # opções do select de tipo de termo
+      "siglas": {"TFM": "Termo de Fomento", ...},
+      "legislacoes": [...]                # opções do select de portaria
+    }
+
+As OSCs não vão no pacote: o autocomplete consulta /parcerias/api/oscs/buscar
+a cada palavra digitada (ver oscs.py).
+
+A versão é o hash do conteúdo. A página renderizada aponta para
+/parcerias/api/formulario?v=<versão>, que o navegador guarda em cache
+indefinidamente: enquanto nada mudar, as próximas aberturas do formulário
+não fazem nenhuma requisição extra. O JSON fica pronto (e já comprimido
+com gzip) na memória do processo e é montado de novo após
+FORMULARIO_RECARGA_S segundos, ou na hora quando gerenciar_portarias grava
+neste worker.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+from config import FORMULARIO_RECARGA_S
+from metricas import registrar_cache
+
+DadosFormulario = namedtuple('DadosFormulario', 'versao tipos_contrato legislacoes corpo corpo_gzip')
+
+
+def montar(cur):
+    """
+    Executa as consultas e monta o pacote (JSON e gzip).
+    """
+    cur.execute("SELECT informacao, sigla FROM c_tipo_contrato ORDER BY informacao")
+    tipos = cur.fetchall()
+    cur.execute("SELECT lei FROM c_legislacao ORDER BY lei")
+    legislacoes = [row['lei'] for row in cur.fetchall()]
+
+    conteudo = {
+        'tipos_contrato': [row['informacao'] for row in tipos],
+        'siglas': {row['sigla'].upper(): row['informacao'] for row in tipos if row['sigla']},
+        'legislacoes': legislacoes,
+    }
+    corpo = json.dumps(conteudo, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return DadosFormulario(
+        versao=hashlib.sha256(corpo).hexdigest()[:16],
+        tipos_contrato=conteudo['tipos_contrato'],
+        legislacoes=legislacoes,
+        corpo=corpo,
+        corpo_gzip=gzip.compress(corpo, compresslevel=6),
+    )
+
+
+_dados = None
+_montado_em = 0.0
+_trava = threading.Lock()
+
+
+def obter(abrir_cursor):
+    """
+    Pacote deste processo; montado de novo se ausente ou mais velho que FORMULARIO_RECARGA_S.
+    `abrir_cursor` (ex.: get_cursor_leitura) só é chamado quando for preciso consultar o banco.
+    """
+    global _dados, _montado_em
+    with _trava:
+        dados = _dados
+        valido = dados is not None and time.monotonic() - _montado_em < FORMULARIO_RECARGA_S
+    registrar_cache('formulario_parceria', valido)
+    if valido:
+        return dados
+
+    cur = abrir_cursor()
+    try:
+        dados = montar(cur)
+    finally:
+        cur.close()
+    with _trava:
+        _dados, _montado_em = dados, time.monotonic()
+    return dados
+
+
+def invalidar():
+    """
+    Descarta o pacote deste processo (ex.: legislação gravada).
+    """
+    global _dados
+    with _trava:
+        _dados = None
@@ -0,0 +1,44 @@
+"""
+Configuração do gunicorn (lida automaticamente do diretório atual)
+
+Prepara o diretório compartilhado das métricas do Prometheus em modo
+multiprocesso, para que /metrics some os valores de todos os workers.
+
+Modo de alta concorrência: com GUNICORN_WORKER_CLASS=gevent cada worker
+atende até GUNICORN_CONEXOES requisições ao mesmo tempo, alternando entre
+elas enquanto esperam o banco (Railway). O psycopg2 passa a esperar de forma
+cooperativa (psycogreen) e as conexões vêm do pool limitado por DB_POOL_MAXIMO
+(ver pool_conexoes.py). Detalhes e comparação em melhorias/MODO_GEVENT.md.
+"""
+
+import os
+import shutil
+import tempfile
+
+from config import GUNICORN_CONEXOES, GUNICORN_WORKER_CLASS
+
+_diretorio_metricas = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'faf_metricas')
+)
+
+worker_class = GUNICORN_WORKER_CLASS
+if worker_class == 'gevent':
+    worker_connections = GUNICORN_CONEXOES
+
+
+def on_starting(server):
+    # Arquivos de uma execução anterior somariam valores antigos
+    shutil.rmtree(_diretorio_metricas, ignore_errors=True)
+    os.makedirs(_diretorio_metricas, exist_ok=True)
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # Sem isso cada consulta bloquearia o worker inteiro, não só a requisição
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
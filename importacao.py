@@ -0,0 +1,388 @@
+"""
+Importação em lote de planilhas de despesas (Parcerias_Despesas)
+
+Pipeline usado no cadastro de novas secretarias, quando chegam dezenas de
+planilhas de uma vez:
+ 1. cada arquivo é lido e validado em paralelo num pool de processos;
+ 2. as linhas válidas são fragmentadas (shards) por numero_termo;
+ 3. cada termo é gravado numa transação própria em cada banco (LOCAL e
+    RAILWAY), de modo que uma falha fica restrita àquele termo.
+
+Também concentra as funções de conversão (parse_*) que antes viviam apenas
+no script testes/t_importa_parcerias.py.
+"""
+
+import csv
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from io import BytesIO, StringIO
+
+from psycopg2.extras import execute_values
+
+from config import IMPORTACAO_PROCESSOS
+from db import BANCOS, conectar
+from jobs import registrar_job
+
+logger = logging.getLogger(__name__)
+
+MAX_MESES = 60
+
+# Despesas dos aditivos importados de um termo, substituídas pelas da planilha
+EXCLUIR_ADITIVOS_TERMO = "DELETE FROM Parcerias_Despesas WHERE numero_termo = %s AND COALESCE(aditivo, 0) = ANY(%s)"
+
+# Cabeçalhos de mês no formato "largo": "Mês 1", "mes_12", "MES3"...
+REGEX_COLUNA_MES = re.compile(r'^m[eê]s\s*_?\s*(\d+)$', re.IGNORECASE)
+
+
+# ========== FUNÇÕES DE CONVERSÃO ==========
+
+def parse_date_general(val):
+    """
+    Aceita:
+    - strings no formato ISO 'YYYY-MM-DD' -> retorna igual se válido
+    - strings em 'DD/MM/YYYY' (ou 'DD-MM-YYYY', 'DD/MM/YY') -> converte para 'YYYY-MM-DD'
+    - objetos date/datetime
+    """
+    if val is None:
+        return None
+    if isinstance(val, (datetime, date)):
+        return val.strftime("%Y-%m-%d")
+    s = str(val).strip()
+    if s == "":
+        return None
+    # já em ISO?
+    if re.match(r'^\d{4}-\d{2}-\d{2}$', s):
+        return s
+    # ISO com horário (ex: exportação do Excel "2023-01-31 00:00:00")
+    if re.match(r'^\d{4}-\d{2}-\d{2}[ T]', s):
+        return s[:10]
+    for formato in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(s, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def parse_number_br(val):
+    """
+    Converte número em formato brasileiro ("1.234,56", "R$ 52.499,56") para float.
+    Retorna None se o valor estiver vazio ou não for numérico.
+    """
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    s = str(val).strip()
+    if s == "":
+        return None
+    # remover espaços
+    s = s.replace(" ", "")
+    # remover pontos de milhar prováveis (ex: 1.234 -> 1234) - tentativa conservadora
+    s = re.sub(r'\.(?=\d{3}(?:[^\d]|$))', '', s)
+    s = s.replace(',', '.')
+    # remover símbolos de moeda, se houver
+    s = re.sub(r'[^\d\.\-]', '', s)
+    if s == "" or s == ".":
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def parse_int(val):
+    """
+    Converte para inteiro aproveitando apenas os dígitos ("12 meses" -> 12).
+    """
+    if val is None:
+        return None
+    if isinstance(val, int):
+        return val
+    if isinstance(val, float):
+        return int(val)
+    s = str(val).strip()
+    if s == "":
+        return None
+    # "3.0" vindo de planilha: descartar a parte decimal antes de extrair dígitos
+    if re.match(r'^\d+\.0+$', s):
+        s = s.split('.')[0]
+    s = re.sub(r'\D', '', s)
+    if s == "":
+        return None
+    return int(s)
+
+
+def parse_boolean(val):
+    """
+    Converte respostas do tipo sim/não para 1/0. Retorna None se não reconhecer.
+    """
+    if val is None:
+        return None
+    s = str(val).strip().lower()
+    if s in {"1", "true", "t", "sim", "s", "yes", "y"}:
+        return 1
+    if s in {"0", "false", "f", "nao", "não", "n", "no"}:
+        return 0
+    return None
+
+
+# ========== LEITURA E VALIDAÇÃO (executadas nos processos do pool) ==========
+
+def _normalizar_cabecalho(nome):
+    nome = str(nome or '').strip()
+    if REGEX_COLUNA_MES.match(nome):
+        return nome
+    return nome.lower().replace(' ', '_')
+
+
+def _ler_csv(conteudo):
+    """
+    Lê um CSV em bytes tentando os encodings usuais do Excel BR e detectando o separador.
+    """
+    texto = None
+    for encoding in ('utf-8-sig', 'utf-8', 'cp1252', 'latin1'):
+        try:
+            texto = conteudo.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+
+    primeira_linha = texto.split('\n', 1)[0]
+    separador = ';' if primeira_linha.count(';') >= primeira_linha.count(',') else ','
+    leitor = csv.reader(StringIO(texto), delimiter=separador)
+    linhas = [linha for linha in leitor if any(str(c).strip() for c in linha)]
+    if not linhas:
+        return [], []
+    return linhas[0], linhas[1:]
+
+
+def _ler_xlsx(conteudo):
+    """
+    Lê a primeira aba de uma planilha .xlsx.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Leitura de .xlsx requer o pacote openpyxl")
+
+    planilha = load_workbook(BytesIO(conteudo), read_only=True, data_only=True).active
+    linhas = [list(linha) for linha in planilha.iter_rows(values_only=True)
+              if any(c is not None and str(c).strip() for c in linha)]
+    if not linhas:
+        return [], []
+    return linhas[0], linhas[1:]
+
+
+def processar_arquivo(nome_arquivo, conteudo):
+    """
+    Lê e valida um arquivo de despesas. Executada dentro do pool de processos,
+    por isso recebe apenas bytes e devolve apenas tipos simples (picklable).
+
+    Aceita dois layouts:
+    - "longo": colunas numero_termo, rubrica, quantidade, categoria_despesa, valor, mes, aditivo
+    - "largo": colunas fixas + uma coluna por mês ("Mês 1", "Mês 2", ...)
+
+    Returns:
+        dict: {'arquivo': str, 'linhas': list[dict], 'erros': list[str]}
+    """
+    resultado = {'arquivo': nome_arquivo, 'linhas': [], 'erros': []}
+
+    try:
+        if nome_arquivo.lower().endswith(('.xlsx', '.xlsm')):
+            cabecalho, dados = _ler_xlsx(conteudo)
+        else:
+            cabecalho, dados = _ler_csv(conteudo)
+    except Exception as e:
+        resultado['erros'].append(f"{nome_arquivo}: falha ao ler arquivo ({e})")
+        return resultado
+
+    colunas = [_normalizar_cabecalho(c) for c in cabecalho]
+    if 'numero_termo' not in colunas or 'rubrica' not in colunas:
+        resultado['erros'].append(f"{nome_arquivo}: cabeçalho sem as colunas numero_termo/rubrica")
+        return resultado
+
+    formato_longo = 'mes' in colunas and 'valor' in colunas
+    colunas_mes = {}
+    if not formato_longo:
+        for posicao, coluna in enumerate(colunas):
+            encontrado = REGEX_COLUNA_MES.match(coluna)
+            if encontrado:
+                colunas_mes[posicao] = int(encontrado.group(1))
+        if not colunas_mes:
+            resultado['erros'].append(f"{nome_arquivo}: nenhuma coluna de valor/mês encontrada")
+            return resultado
+
+    for numero_linha, valores in enumerate(dados, start=2):  # linha 1 = cabeçalho
+        registro = {coluna: (valores[i] if i < len(valores) else None) for i, coluna in enumerate(colunas)}
+
+        numero_termo = str(registro.get('numero_termo') or '').strip()
+        rubrica = str(registro.get('rubrica') or '').strip()
+        if not numero_termo:
+            resultado['erros'].append(f"{nome_arquivo} linha {numero_linha}: numero_termo vazio")
+            continue
+        if not rubrica:
+            resultado['erros'].append(f"{nome_arquivo} linha {numero_linha}: rubrica vazia")
+            continue
+
+        quantidade = parse_int(registro.get('quantidade'))
+        base = {
+            'numero_termo': numero_termo,
+            'rubrica': rubrica,
+            'quantidade': quantidade if quantidade is not None else 1,
+            'categoria_despesa': str(registro.get('categoria_despesa') or '').strip(),
+            'aditivo': parse_int(registro.get('aditivo')) or 0,
+        }
+
+        if formato_longo:
+            pares = [(registro.get('mes'), registro.get('valor'))]
+        else:
+            pares = [(mes, valores[i] if i < len(valores) else None) for i, mes in colunas_mes.items()]
+
+        for mes_bruto, valor_bruto in pares:
+            if valor_bruto is None or str(valor_bruto).strip() in ('', '-'):
+                continue
+            mes = parse_int(mes_bruto)
+            valor = parse_number_br(valor_bruto)
+            if mes is None or mes < 1 or mes > MAX_MESES:
+                resultado['erros'].append(f"{nome_arquivo} linha {numero_linha}: mês inválido '{mes_bruto}'")
+                continue
+            if valor is None or valor < 0:
+                resultado['erros'].append(f"{nome_arquivo} linha {numero_linha}: valor inválido '{valor_bruto}'")
+                continue
+            resultado['linhas'].append(dict(base, mes=mes, valor=valor))
+
+    return resultado
+
+
+def fragmentar_por_termo(resultados):
+    """
+    Agrupa as linhas de todos os arquivos por numero_termo (um shard por termo).
+    Linhas do mesmo termo vindas de arquivos diferentes caem no mesmo shard.
+    """
+    shards = {}
+    for resultado in resultados:
+        for linha in resultado['linhas']:
+            shards.setdefault(linha['numero_termo'], []).append(linha)
+    return shards
+
+
+# ========== GRAVAÇÃO (uma transação por termo e por banco) ==========
+
+def gravar_termo(conn, numero_termo, linhas, usuario_id):
+    """
+    Substitui as despesas de um termo pelos dados importados, numa única transação.
+    Apenas os aditivos presentes no arquivo são substituídos.
+
+    Returns:
+        int: número de registros inseridos
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL app.current_user_id = %s", (str(usuario_id),))
+
+        cur.execute("SELECT 1 FROM Parcerias WHERE numero_termo = %s", (numero_termo,))
+        if cur.fetchone() is None:
+            raise ValueError(f"Termo {numero_termo} não cadastrado em Parcerias")
+
+        aditivos = sorted({linha['aditivo'] for linha in linhas})
+        cur.execute(EXCLUIR_ADITIVOS_TERMO, (numero_termo, aditivos))
+        execute_values(cur, """
+            INSERT INTO Parcerias_Despesas
+            (numero_termo, rubrica, quantidade, categoria_despesa, valor, mes, aditivo)
+            VALUES %s
+        """, [
+            (l['numero_termo'], l['rubrica'], l['quantidade'], l['categoria_despesa'],
+             l['valor'], l['mes'], l['aditivo'])
+            for l in linhas
+        ], page_size=1000)
+        conn.commit()
+        return len(linhas)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# ========== ORQUESTRAÇÃO (job em segundo plano) ==========
+
+@registrar_job('importar_despesas')
+def importar_arquivos(contexto, nomes_arquivos, usuario_auditoria, arquivos):
+    """
+    Executa o pipeline completo como job (ver jobs.py).
+
+    Args:
+        contexto: ContextoJob usado para reportar progresso
+        nomes_arquivos: nomes dos arquivos recebidos (persistidos nos parâmetros do job)
+        usuario_auditoria: usuário gravado na auditoria
+        arquivos: lista de (nome_arquivo, conteudo_bytes), repassada sem persistir
+
+    Returns:
+        dict: resumo por termo e erros de validação
+    """
+    # 1) Leitura e validação em paralelo
+    resultados = []
+    erros = []
+    contexto.progresso(0, total=len(arquivos), mensagem='Lendo e validando arquivos', forcar=True)
+    # 'spawn' em vez do fork padrão: o job roda numa thread de um worker com threads
+    # (pool de conexões, sonda do disjuntor, log) e, com gevent, um hub monkey-patched
+    with ProcessPoolExecutor(max_workers=IMPORTACAO_PROCESSOS,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        futuros = [pool.submit(processar_arquivo, nome, conteudo) for nome, conteudo in arquivos]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            erros.extend(resultado['erros'])
+            contexto.progresso(len(resultados))
+
+    # 2) Fragmentação por termo
+    shards = fragmentar_por_termo(resultados)
+    contexto.progresso(0, total=len(shards), mensagem='Gravando termos', forcar=True)
+
+    # 3) Gravação: uma transação por termo em cada banco
+    conexoes = {}
+    for banco in BANCOS:
+        try:
+            conexoes[banco] = conectar(banco)
+        except Exception as e:
+            logger.warning("Importação %s: banco %s indisponível: %s", contexto.job_id, banco.upper(), e)
+
+    termos = {}
+    termos_com_erro = 0
+    try:
+        for numero_termo in sorted(shards):
+            linhas = shards[numero_termo]
+            situacao = {'registros': len(linhas), 'erros': {}}
+            for banco in BANCOS:
+                conn = conexoes.get(banco)
+                if conn is None:
+                    situacao[banco] = False
+                    situacao['erros'][banco] = "Conexão não disponível"
+                    continue
+                try:
+                    gravar_termo(conn, numero_termo, linhas, usuario_auditoria)
+                    situacao[banco] = True
+                except Exception as e:
+                    situacao[banco] = False
+                    situacao['erros'][banco] = str(e)
+            termos[numero_termo] = situacao
+            if situacao['erros']:
+                termos_com_erro += 1
+            contexto.progresso(len(termos))
+    finally:
+        for conn in conexoes.values():
+            conn.close()
+
+    logger.info("Importação %s concluída: %d termos", contexto.job_id, len(shards))
+    return {
+        'arquivos': nomes_arquivos,
+        'linhas_validas': sum(len(r['linhas']) for r in resultados),
+        'erros_validacao': erros,
+        'termos_total': len(shards),
+        'termos_com_erro': termos_com_erro,
+        'termos': termos,
+    }
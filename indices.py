@@ -0,0 +1,229 @@
+"""
+Consultas quentes de Parcerias_Despesas e consultor de índices
+
+CONSULTAS_QUENTES registra as consultas mais executadas pela aplicação, com o
+SQL exatamente como as rotas o enviam. O consultor roda cada uma com
+EXPLAIN (ANALYZE, BUFFERS) dentro de uma transação desfeita no final (as
+consultas de escrita também são analisadas sem alterar nada) e aponta as que
+fazem Seq Scan, para que uma regressão de índice apareça antes da produção.
+
+Uso:
+    flask --app app indices-advisor                   # banco padrão (RAILWAY)
+    flask --app app indices-advisor --banco local
+    flask --app app indices-advisor --estrito         # desliga seq scan no planejador
+
+Em bases pequenas (desenvolvimento) o planejador prefere Seq Scan mesmo com o
+índice certo disponível; por isso o Seq Scan só é erro em tabelas com pelo menos
+LIMITE_LINHAS_SEQSCAN linhas estimadas. Com --estrito o planejador é forçado a
+usar índices: se ainda assim sobrar Seq Scan, não existe índice que atenda ao
+predicado. O comando termina com código 1 quando há consultas sinalizadas.
+
+O registro importa o SQL das constantes dos próprios módulos (nada de cópias
+literais): uma consulta nova ou renomeada precisa entrar aqui, mas uma
+alteração no texto de uma consulta já registrada chega sozinha ao consultor.
+"""
+
+import json
+
+import click
+
+from db import BANCOS, conectar
+from categorias import ATUALIZAR_LOTE, CONSULTA_RUBRICA_SUGERIDA, CONSULTA_TERMOS_DA_CATEGORIA
+from importacao import EXCLUIR_ADITIVOS_TERMO
+from routes.despesas import (CONSULTA_MATRIZ_JSON, CONSULTA_MATRIZ_ORDENADA, CONSULTA_MATRIZES_TERMO,
+                             EXCLUIR_DESPESAS_ADITIVO)
+from routes.orcamento import CONSULTA_ADITIVOS_TERMO
+
+# Abaixo disso um Seq Scan é considerado normal (tabela cabe em poucas páginas)
+LIMITE_LINHAS_SEQSCAN = 10000
+
+# Parâmetros de exemplo: um termo/aditivo e uma categoria existentes
+AMOSTRA_TERMO = """
+    SELECT numero_termo, COALESCE(aditivo, 0) FROM Parcerias_Despesas
+    WHERE numero_termo IS NOT NULL ORDER BY id LIMIT 1
+"""
+AMOSTRA_CATEGORIA = """
+    SELECT c.id, c.nome FROM categorias_despesa c
+    WHERE EXISTS (SELECT 1 FROM Parcerias_Despesas pd WHERE pd.categoria_id = c.id)
+    ORDER BY c.id LIMIT 1
+"""
+
+# nome: (origem, sql, função que monta os parâmetros a partir das amostras)
+CONSULTAS_QUENTES = {
+    'despesas_termo': (
+        'routes/despesas.py:get_despesas_termo',
+        CONSULTA_MATRIZ_JSON,
+        lambda a: (a['termo'], a['aditivo']),
+    ),
+    'despesas_termo_colunar': (
+        'routes/despesas.py:get_despesas_termo (formato colunar)',
+        CONSULTA_MATRIZ_ORDENADA,
+        lambda a: (a['termo'], a['aditivo']),
+    ),
+    'despesas_aditivos': (
+        'routes/despesas.py:get_despesas_aditivos',
+        CONSULTA_MATRIZES_TERMO,
+        lambda a: (a['termo'],),
+    ),
+    'excluir_despesas_termo': (
+        'routes/despesas.py:criar_despesa / confirmar_despesa',
+        EXCLUIR_DESPESAS_ADITIVO,
+        lambda a: (a['termo'], a['aditivo']),
+    ),
+    'importar_substituir_aditivos': (
+        'importacao.py:gravar_termo',
+        EXCLUIR_ADITIVOS_TERMO,
+        lambda a: (a['termo'], [a['aditivo']]),
+    ),
+    'aditivos_termo': (
+        'routes/orcamento.py:editar',
+        CONSULTA_ADITIVOS_TERMO,
+        lambda a: (a['termo'],),
+    ),
+    'rubrica_sugerida': (
+        'categorias.py:rubrica_sugerida',
+        CONSULTA_RUBRICA_SUGERIDA,
+        lambda a: (a['categoria'],),
+    ),
+    'termos_da_categoria': (
+        'categorias.py:termos_da_categoria',
+        CONSULTA_TERMOS_DA_CATEGORIA,
+        lambda a: (a['categoria'],),
+    ),
+    'renomear_lote': (
+        'categorias.py:mesclar_em_lotes',
+        ATUALIZAR_LOTE,
+        lambda a: {'id_antigo': a['categoria_id'], 'ultimo_id': 0, 'tamanho_lote': 500,
+                   'id_novo': a['categoria_id'], 'nome_novo': a['categoria'] + ' (renomeada)'},
+    ),
+}
+
+
+def _amostras(cur):
+    """
+    Busca valores reais para os parâmetros das consultas (ou valores fictícios em base vazia).
+    """
+    amostras = {'termo': '', 'aditivo': 0, 'categoria_id': 0, 'categoria': ''}
+    cur.execute(AMOSTRA_TERMO)
+    row = cur.fetchone()
+    if row:
+        amostras['termo'], amostras['aditivo'] = row
+    cur.execute(AMOSTRA_CATEGORIA)
+    row = cur.fetchone()
+    if row:
+        amostras['categoria_id'], amostras['categoria'] = row
+    return amostras
+
+
+def _percorrer_plano(no, encontrados):
+    """
+    Coleta os nós de Seq Scan do plano (em formato JSON) recursivamente.
+    """
+    if no.get('Node Type') == 'Seq Scan':
+        encontrados.append(no)
+    for filho in no.get('Plans', []):
+        _percorrer_plano(filho, encontrados)
+    return encontrados
+
+
+def _linhas_estimadas(cur, tabela):
+    cur.execute("SELECT reltuples FROM pg_class WHERE relname = %s", (tabela.lower(),))
+    row = cur.fetchone()
+    return max(int(row[0]), 0) if row else 0
+
+
+def analisar_consulta(conn, nome, estrito=False, amostras=None):
+    """
+    Roda EXPLAIN (ANALYZE, BUFFERS) numa consulta registrada e desfaz a transação.
+
+    Returns:
+        dict: nome, origem, tempo_ms, buffers (hit/read), seq_scans e sinalizada
+    """
+    origem, sql, montar_parametros = CONSULTAS_QUENTES[nome]
+    cur = conn.cursor()
+    try:
+        if amostras is None:
+            amostras = _amostras(cur)
+        # O trigger de auditoria exige o usuário mesmo para o DELETE que será desfeito
+        cur.execute("SET LOCAL app.current_user_id = '1'")  # 1 = sistema
+        if estrito:
+            cur.execute("SET LOCAL enable_seqscan = off")
+        cur.execute(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql,
+            montar_parametros(amostras)
+        )
+        resultado = cur.fetchone()[0]
+        if isinstance(resultado, str):
+            resultado = json.loads(resultado)
+        plano = resultado[0]['Plan']
+
+        seq_scans = []
+        for no in _percorrer_plano(plano, []):
+            tabela = no.get('Relation Name', '')
+            linhas = _linhas_estimadas(cur, tabela)
+            seq_scans.append({
+                'tabela': tabela,
+                'linhas_estimadas': linhas,
+                'filtro': no.get('Filter'),
+                'problema': estrito or linhas >= LIMITE_LINHAS_SEQSCAN,
+            })
+
+        return {
+            'nome': nome,
+            'origem': origem,
+            'tempo_ms': round(resultado[0].get('Execution Time', 0.0), 3),
+            'buffers_hit': plano.get('Shared Hit Blocks', 0),
+            'buffers_read': plano.get('Shared Read Blocks', 0),
+            'seq_scans': seq_scans,
+            'sinalizada': any(s['problema'] for s in seq_scans),
+        }
+    finally:
+        # EXPLAIN ANALYZE executa a consulta de verdade: nada é gravado
+        conn.rollback()
+        cur.close()
+
+
+def analisar_todas(conn, estrito=False):
+    """
+    Analisa todas as consultas quentes registradas, na ordem do registro.
+    """
+    with conn.cursor() as cur:
+        amostras = _amostras(cur)
+    conn.rollback()
+    return [analisar_consulta(conn, nome, estrito=estrito, amostras=amostras)
+            for nome in CONSULTAS_QUENTES]
+
+
+@click.command('indices-advisor')
+@click.option('--banco', type=click.Choice(sorted(BANCOS)), default='railway',
+              help='Banco analisado (padrão: railway)')
+@click.option('--estrito', is_flag=True,
+              help='Desliga seq scan no planejador: sinaliza consultas sem índice utilizável')
+@click.option('--json', 'como_json', is_flag=True, help='Saída em JSON')
+def comando_advisor(banco, estrito, como_json):
+    """
+    Roda EXPLAIN (ANALYZE, BUFFERS) nas consultas quentes e sinaliza Seq Scans.
+    """
+    conn = conectar(banco)
+    try:
+        relatorio = analisar_todas(conn, estrito=estrito)
+    finally:
+        conn.close()
+
+    if como_json:
+        click.echo(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    else:
+        for item in relatorio:
+            marca = '❌' if item['sinalizada'] else '✅'
+            click.echo(f"{marca} {item['nome']:<30} {item['tempo_ms']:>9.3f} ms  "
+                       f"buffers hit={item['buffers_hit']} read={item['buffers_read']}  ({item['origem']})")
+            for scan in item['seq_scans']:
+                nivel = 'Seq Scan' if scan['problema'] else 'Seq Scan (tabela pequena, ignorado)'
+                click.echo(f"      {nivel} em {scan['tabela']} (~{scan['linhas_estimadas']} linhas)"
+                           f"{' filtro: ' + scan['filtro'] if scan['filtro'] else ''}")
+
+    sinalizadas = [item['nome'] for item in relatorio if item['sinalizada']]
+    if sinalizadas:
+        click.echo(f"\n{len(sinalizadas)} consulta(s) com Seq Scan: {', '.join(sinalizadas)}")
+        raise SystemExit(1)
+    click.echo("\nNenhuma consulta quente com Seq Scan")
@@ -0,0 +1,191 @@
+"""
+Instrumentação de SQL por requisição
+
+As conexões abertas em db.py usam ConexaoInstrumentada: todo cursor criado
+nelas (get_cursor, get_cursor_local, get_cursor_railway e os cursores de
+execute_dual*) registra, para cada comando, o texto normalizado (literais
+trocados por ?), a duração, o número de linhas e o banco (local/railway).
+
+Ao final da requisição:
+ - o cabeçalho Server-Timing recebe o tempo de SQL por banco e o total, visível
+   na aba Network do navegador;
+ - comandos acima de SQL_LENTA_MS geram um aviso "SQL lenta" no log, com
+   o comando, a duração, as linhas e o banco como campos;
+ - requisições que repetem o mesmo comando normalizado SQL_REPETICOES_ALERTA
+   vezes ou mais (padrão N+1) geram um aviso "SQL repetida" com o resumo.
+
+Fora de requisições (jobs, migrações, scripts) os cursores funcionam
+normalmente e nada é registrado.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+
+import psycopg2.extensions
+from flask import g, has_request_context, request
+
+from config import INSTRUMENTACAO_SQL, SQL_LENTA_MS, SQL_REPETICOES_ALERTA
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo do SQL normalizado guardado/logado
+MAX_TEXTO_SQL = 500
+
+_REGEX_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_REGEX_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_REGEX_LISTA = re.compile(r"\?(?:\s*,\s*\?)+")
+_REGEX_TUPLAS = re.compile(r"(\([?,.\s]+\))(?:\s*,\s*\([?,.\s]+\))+")
+_REGEX_ESPACOS = re.compile(r"\s+")
+
+# Controle de transação não conta como repetição (execute_dual_with_audit usa por linha)
+_PREFIXOS_CONTROLE = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SET ')
+
+
+def normalizar_sql(sql):
+    """
+    Remove literais e espaços extras para agrupar comandos iguais com parâmetros diferentes.
+    Ex.: "WHERE id IN (1, 2, 3)" -> "WHERE id IN (?, ...)"
+    """
+    texto = _REGEX_TEXTO.sub('?', sql)
+    texto = _REGEX_NUMERO.sub('?', texto)
+    texto = _REGEX_LISTA.sub('?, ...', texto)
+    texto = _REGEX_TUPLAS.sub(r'\1, ...', texto)
+    texto = _REGEX_ESPACOS.sub(' ', texto).strip()
+    return texto[:MAX_TEXTO_SQL]
+
+
+def _texto_sql(cursor, query):
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    if isinstance(query, str):
+        return query
+    try:
+        return query.as_string(cursor)  # psycopg2.sql.Composed
+    except Exception:
+        return str(query)
+
+
+def _registrar(cursor, query, inicio):
+    if not INSTRUMENTACAO_SQL or not has_request_context():
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    consulta = {
+        'sql': normalizar_sql(_texto_sql(cursor, query)),
+        'ms': round(duracao_ms, 3),
+        'linhas': cursor.rowcount,
+        'banco': getattr(cursor.connection, 'banco', None) or 'desconhecido',
+    }
+    if 'consultas_sql' not in g:
+        g.consultas_sql = []
+    g.consultas_sql.append(consulta)
+
+    if duracao_ms >= SQL_LENTA_MS:
+        logger.warning("SQL lenta", extra={'endpoint': request.endpoint, **consulta})
+
+
+class _CursorInstrumentadoMixin:
+    """
+    Mede execute/executemany e registra o comando na requisição atual.
+    """
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _registrar(self, query, inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _registrar(self, query, inicio)
+
+
+_classes_instrumentadas = {}
+
+
+def _classe_instrumentada(fabrica):
+    """
+    Subclasse instrumentada da fábrica de cursor pedida (cursor, RealDictCursor, DictCursor...).
+    """
+    classe = _classes_instrumentadas.get(fabrica)
+    if classe is None:
+        classe = type(f"{fabrica.__name__}Instrumentado", (_CursorInstrumentadoMixin, fabrica), {})
+        _classes_instrumentadas[fabrica] = classe
+    return classe
+
+
+class ConexaoInstrumentada(psycopg2.extensions.connection):
+    """
+    Conexão cujos cursores são instrumentados, qualquer que seja o cursor_factory.
+    Uso: psycopg2.connect(..., connection_factory=ConexaoInstrumentada); conn.banco = 'local'
+    """
+
+    banco = None
+
+    def cursor(self, *args, **kwargs):
+        fabrica = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = _classe_instrumentada(fabrica)
+        return super().cursor(*args, **kwargs)
+
+
+def consultas_da_requisicao():
+    """
+    Lista de comandos registrados na requisição atual ([] fora de requisição).
+    """
+    if not has_request_context():
+        return []
+    return g.get('consultas_sql', [])
+
+
+def resumo_por_banco(consultas=None):
+    """
+    {banco: {'consultas': n, 'ms': total}} dos comandos da requisição atual.
+    """
+    resumo = {}
+    for consulta in consultas if consultas is not None else consultas_da_requisicao():
+        item = resumo.setdefault(consulta['banco'], {'consultas': 0, 'ms': 0.0})
+        item['consultas'] += 1
+        item['ms'] += consulta['ms']
+    return resumo
+
+
+def _iniciar_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _finalizar_requisicao(response):
+    consultas = consultas_da_requisicao()
+    inicio = g.get('inicio_requisicao')
+
+    metricas = []
+    for banco, item in sorted(resumo_por_banco(consultas).items()):
+        metricas.append(f'db-{banco};dur={item["ms"]:.1f};desc="{item["consultas"]} consultas"')
+    if inicio is not None:
+        metricas.append(f'total;dur={(time.perf_counter() - inicio) * 1000:.1f}')
+    if metricas:
+        response.headers.add('Server-Timing', ', '.join(metricas))
+
+    contagem = Counter(c['sql'] for c in consultas if not c['sql'].upper().startswith(_PREFIXOS_CONTROLE))
+    repetidas = [(sql, n) for sql, n in contagem.most_common(3) if n >= SQL_REPETICOES_ALERTA]
+    if repetidas:
+        logger.warning("SQL repetida", extra={
+            'endpoint': request.endpoint,
+            'total_consultas': len(consultas),
+            'repetidas': [{'sql': sql, 'vezes': n} for sql, n in repetidas],
+        })
+    return response
+
+
+def instalar(app):
+    """
+    Registra os ganchos de início/fim de requisição na aplicação.
+    """
+    if not INSTRUMENTACAO_SQL:
+        return
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
@@ -0,0 +1,351 @@
+"""
+Fila de jobs em segundo plano para operações demoradas
+
+Renomeações em massa de categorias, exportações completas e importações
+rodavam dentro da requisição do gunicorn, prendendo um worker síncrono até o
+fim (e podendo estourar o timeout). Aqui elas viram jobs:
+
+ - cada job é registrado na tabela `jobs` do banco padrão (status, progresso,
+   resultado), de modo que qualquer worker do gunicorn consegue responder
+   ao polling em /jobs/<id>;
+ - a execução acontece num pool de threads do próprio processo, com
+   concorrência limitada por JOBS_CONCORRENCIA;
+ - a rota que dispara o job responde 202 imediatamente com o id;
+ - enquanto o job está pendente ou executando, o processo atualiza a coluna
+   `batimento` periodicamente. Jobs de um processo que morreu (reinício,
+   deploy, reciclagem do worker) param de receber batimento e são marcados
+   como erro, pois a execução e os anexos em memória se perderam.
+
+Para criar um novo tipo de job basta decorar a função com @registrar_job:
+
+    @registrar_job('meu_tipo')
+    def meu_job(contexto, parametro_a, parametro_b):
+        contexto.progresso(1, total=10)
+        return {'ok': True}
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from config import DB_STATEMENT_TIMEOUT_MS, JOBS_BATIMENTO_SEGUNDOS, JOBS_BATIMENTOS_PERDIDOS, JOBS_CONCORRENCIA
+from db import conectar
+from log_estruturado import contexto_id
+
+CRIAR_TABELA_JOBS = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pendente',
+        progresso INTEGER NOT NULL DEFAULT 0,
+        total INTEGER,
+        mensagem TEXT,
+        parametros JSONB,
+        resultado JSONB,
+        erro TEXT,
+        arquivo BYTEA,
+        arquivo_nome TEXT,
+        arquivo_tipo TEXT,
+        usuario_id INTEGER,
+        criado_em TIMESTAMP NOT NULL DEFAULT now(),
+        iniciado_em TIMESTAMP,
+        finalizado_em TIMESTAMP
+    );
+    ALTER TABLE jobs ADD COLUMN IF NOT EXISTS batimento TIMESTAMP;
+    CREATE INDEX IF NOT EXISTS idx_jobs_usuario_criado ON jobs (usuario_id, criado_em DESC);
+"""
+
+# Jobs pendentes/executando cujo processo parou de dar sinal de vida
+EXPIRAR_JOBS_ORFAOS = """
+    UPDATE jobs
+    SET status = 'erro', finalizado_em = now(),
+        erro = 'Job interrompido: o processo que o executava foi encerrado (reinício ou deploy). '
+               'Dispare a operação novamente.'
+    WHERE status IN ('pendente', 'executando')
+      AND COALESCE(batimento, criado_em) < now() - make_interval(secs => %s)
+"""
+
+# Colunas devolvidas pela API (o blob do arquivo é baixado em rota separada)
+COLUNAS_PUBLICAS = """
+    id, tipo, status, progresso, total, mensagem, parametros, resultado, erro,
+    arquivo_nome, usuario_id, criado_em, iniciado_em, finalizado_em
+"""
+
+# Intervalo mínimo entre gravações de progresso no banco (segundos)
+INTERVALO_PROGRESSO = 0.5
+
+# Funções registradas por tipo de job: {tipo: funcao}
+TIPOS_JOB = {}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_tabela_verificada = False
+_lock = threading.Lock()
+
+# Jobs deste processo ainda pendentes ou em execução (recebem batimento)
+_jobs_ativos = set()
+_batimento = None
+
+
+def registrar_job(tipo):
+    """
+    Decorador que registra uma função como executora de um tipo de job.
+    A função recebe um ContextoJob seguido dos parâmetros do job.
+    """
+    def decorador(funcao):
+        TIPOS_JOB[tipo] = funcao
+        return funcao
+    return decorador
+
+
+def _conectar(statement_timeout_ms=0):
+    """
+    Conexão em autocommit com o banco padrão, aberta por db.conectar (connect_timeout e
+    disjuntor: com o Railway fora do ar falha na hora em vez de prender o worker).
+    """
+    conn = conectar('railway', statement_timeout_ms)
+    conn.autocommit = True
+    return conn
+
+
+def expirar_jobs_orfaos(cur, job_id=None):
+    """
+    Marca como erro os jobs pendentes/executando sem batimento recente (de todos ou só de job_id).
+    Retorna quantos foram expirados.
+    """
+    query = EXPIRAR_JOBS_ORFAOS
+    params = [JOBS_BATIMENTO_SEGUNDOS * JOBS_BATIMENTOS_PERDIDOS]
+    if job_id is not None:
+        query += " AND id = %s"
+        params.append(job_id)
+    cur.execute(query, params)
+    return cur.rowcount
+
+
+def garantir_tabela_jobs(conn=None):
+    """
+    Cria a tabela de jobs se ainda não existir e expira os jobs deixados por
+    processos encerrados (verificado uma vez por processo).
+    """
+    global _tabela_verificada
+    if _tabela_verificada:
+        return
+    fechar = conn is None
+    conn = conn or _conectar()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CRIAR_TABELA_JOBS)
+            expirados = expirar_jobs_orfaos(cur)
+        if expirados:
+            logger.warning("%s job(s) interrompidos por processo encerrado marcados como erro", expirados)
+        if not conn.autocommit:
+            conn.commit()
+        _tabela_verificada = True
+    finally:
+        if fechar:
+            conn.close()
+
+
+def _get_executor():
+    global _executor, _batimento
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOBS_CONCORRENCIA, thread_name_prefix='faf-job')
+        if _batimento is None or not _batimento.is_alive():
+            _batimento = threading.Thread(target=_bater, name='faf-job-batimento', daemon=True)
+            _batimento.start()
+        return _executor
+
+
+def _bater():
+    """
+    Thread do processo que renova o batimento dos jobs ativos deste processo.
+    """
+    while True:
+        time.sleep(JOBS_BATIMENTO_SEGUNDOS)
+        with _lock:
+            ativos = list(_jobs_ativos)
+        if not ativos:
+            continue
+        try:
+            conn = _conectar()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("UPDATE jobs SET batimento = now() WHERE id = ANY(%s)", (ativos,))
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning("Falha ao renovar o batimento dos jobs: %s", e)
+
+
+class ContextoJob:
+    """
+    Canal entre a função do job e a tabela `jobs`: registra progresso e arquivos gerados.
+    """
+
+    def __init__(self, job_id, usuario_id, conn):
+        self.job_id = job_id
+        self.usuario_id = usuario_id
+        self._conn = conn
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, atual, total=None, mensagem=None, forcar=False):
+        """
+        Atualiza o progresso do job. Gravações muito próximas são descartadas
+        para não sobrecarregar o banco remoto, exceto quando forcar=True.
+        """
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_gravacao < INTERVALO_PROGRESSO:
+            return
+        self._ultima_gravacao = agora
+        with self._conn.cursor() as cur:
+            cur.execute("""
+                UPDATE jobs
+                SET progresso = %s, total = COALESCE(%s, total), mensagem = COALESCE(%s, mensagem)
+                WHERE id = %s
+            """, (atual, total, mensagem, self.job_id))
+
+    def anexar_arquivo(self, nome, tipo, conteudo):
+        """
+        Guarda um arquivo gerado pelo job (ex.: CSV exportado) para download posterior.
+        """
+        with self._conn.cursor() as cur:
+            cur.execute("""
+                UPDATE jobs SET arquivo = %s, arquivo_nome = %s, arquivo_tipo = %s
+                WHERE id = %s
+            """, (psycopg2.Binary(conteudo), nome, tipo, self.job_id))
+
+
+def _executar(job_id, tipo, parametros, usuario_id, anexos):
+    """
+    Executa um job na thread do pool, registrando início, fim e resultado.
+    """
+    conn = None
+    contexto_id.set(job_id)  # correlaciona os logs do job
+    try:
+        conn = _conectar()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE jobs SET status = 'executando', iniciado_em = now() WHERE id = %s",
+                (job_id,)
+            )
+
+        contexto = ContextoJob(job_id, usuario_id, conn)
+        kwargs = dict(parametros or {})
+        kwargs.update(anexos or {})
+        resultado = TIPOS_JOB[tipo](contexto, **kwargs)
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE jobs
+                SET status = 'concluido', resultado = %s, finalizado_em = now(),
+                    progresso = GREATEST(progresso, COALESCE(total, progresso))
+                WHERE id = %s
+            """, (json.dumps(resultado, default=str) if resultado is not None else None, job_id))
+        logger.info("Job %s %s concluído", tipo, job_id)
+
+    except Exception as e:
+        logger.error("Job %s %s falhou: %s", tipo, job_id, e, exc_info=True)
+        try:
+            if conn is None or conn.closed:
+                conn = _conectar()
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE jobs SET status = 'erro', erro = %s, finalizado_em = now() WHERE id = %s",
+                    (str(e), job_id)
+                )
+        except Exception as e2:
+            logger.error("Não foi possível registrar a falha do job %s: %s", job_id, e2)
+    finally:
+        with _lock:
+            _jobs_ativos.discard(job_id)
+        if conn is not None:
+            conn.close()
+
+
+def enfileirar(tipo, parametros=None, usuario_id=None, anexos=None):
+    """
+    Registra um job na tabela e agenda sua execução em segundo plano.
+
+    Args:
+        tipo: tipo registrado com @registrar_job
+        parametros: dict JSON-serializável, gravado no job e repassado à função
+        usuario_id: usuário que disparou o job (listagem e permissão de acesso)
+        anexos: dict repassado à função sem ser persistido (ex.: bytes de arquivos enviados)
+
+    Returns:
+        str: id do job
+    """
+    if tipo not in TIPOS_JOB:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+
+    job_id = uuid.uuid4().hex
+    # Roda dentro da requisição: mesmo limite de tempo das consultas das rotas
+    conn = _conectar(DB_STATEMENT_TIMEOUT_MS)
+    try:
+        garantir_tabela_jobs(conn)
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO jobs (id, tipo, status, parametros, usuario_id, batimento)
+                VALUES (%s, %s, 'pendente', %s, %s, now())
+            """, (job_id, tipo, json.dumps(parametros or {}, default=str), usuario_id))
+    finally:
+        conn.close()
+
+    executor = _get_executor()
+    with _lock:
+        _jobs_ativos.add(job_id)
+    executor.submit(_executar, job_id, tipo, parametros, usuario_id, anexos)
+    return job_id
+
+
+def serializar_job(job):
+    """
+    Converte uma linha da tabela jobs em dict pronto para jsonify.
+    """
+    dados = dict(job)
+    for campo in ('criado_em', 'iniciado_em', 'finalizado_em'):
+        if dados.get(campo) is not None:
+            dados[campo] = dados[campo].isoformat()
+    dados['arquivo_url'] = f"/jobs/{dados['id']}/arquivo" if dados.get('arquivo_nome') else None
+    return dados
+
+
+def obter_job(cur, job_id):
+    """
+    Busca um job pelo id usando o cursor informado. Retorna None se não existir.
+    """
+    cur.execute(f"SELECT {COLUNAS_PUBLICAS} FROM jobs WHERE id = %s", (job_id,))
+    return cur.fetchone()
+
+
+def obter_arquivo_job(cur, job_id):
+    """
+    Retorna (nome, tipo, conteudo) do arquivo gerado pelo job, ou None.
+    """
+    cur.execute("SELECT arquivo_nome, arquivo_tipo, arquivo FROM jobs WHERE id = %s", (job_id,))
+    row = cur.fetchone()
+    if not row or row['arquivo'] is None:
+        return None
+    return row['arquivo_nome'], row['arquivo_tipo'], bytes(row['arquivo'])
+
+
+def listar_jobs(cur, usuario_id=None, limite=50):
+    """
+    Lista os jobs mais recentes (de um usuário, se informado).
+    """
+    query = f"SELECT {COLUNAS_PUBLICAS} FROM jobs"
+    params = []
+    if usuario_id is not None:
+        query += " WHERE usuario_id = %s"
+        params.append(usuario_id)
+    query += " ORDER BY criado_em DESC LIMIT %s"
+    params.append(limite)
+    cur.execute(query, params)
+    return cur.fetchall()
@@ -0,0 +1,161 @@
+"""
+Log estruturado da aplicação
+
+Substitui os print() de depuração por logging com nível configurável:
+
+ - LOG_NIVEL (DEBUG, INFO, WARNING...) decide o que é registrado; chamadas
+   abaixo do nível custam só uma comparação, porque a mensagem usa
+   formatação preguiçosa (logger.debug("Registro %s: %s", idx, registro))
+   e só é montada se o nível estiver ativo;
+ - a escrita no stdout acontece numa thread separada (QueueHandler +
+   QueueListener): a requisição só enfileira o registro;
+ - cada linha sai em JSON (LOG_FORMATO=json, padrão) ou texto legível
+   (LOG_FORMATO=texto), com o request_id da requisição (cabeçalho
+   X-Request-ID recebido ou gerado, devolvido na resposta) ou o id do job.
+
+Uso nos módulos:
+    import logging
+    logger = logging.getLogger(__name__)
+    logger.info("Categoria renomeada", extra={'linhas': 42})
+
+Campos passados em `extra` viram chaves do JSON.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+from config import LOG_FORMATO, LOG_NIVEL
+
+# Id de correlação fora de requisições (ex.: jobs em segundo plano)
+contexto_id = contextvars.ContextVar('contexto_id', default=None)
+
+# Atributos padrão de um LogRecord: o que sobrar veio de `extra`
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class _FiltroContexto(logging.Filter):
+    """
+    Anexa request_id, método e rota ao registro, na thread que fez a chamada.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.metodo = request.method
+            record.rota = request.path
+        else:
+            record.request_id = contexto_id.get()
+        return True
+
+
+class _QueueHandlerContexto(logging.handlers.QueueHandler):
+    """
+    Monta a mensagem e o traceback antes de enfileirar (os argumentos podem
+    mudar depois), mas deixa a serialização JSON para a thread do listener.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Uma linha JSON por registro: ts, nivel, logger, msg, request_id e campos extras.
+    """
+
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and valor is not None:
+                dados[chave] = valor
+        if record.exc_text:
+            dados['exc'] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """
+    Formato legível para desenvolvimento: hora, nível, logger, [request_id] mensagem.
+    """
+
+    def format(self, record):
+        linha = f"{datetime.fromtimestamp(record.created):%H:%M:%S} {record.levelname:<7} {record.name}"
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            linha += f" [{request_id[:8]}]"
+        linha += f" {record.getMessage()}"
+        extras = {k: v for k, v in vars(record).items()
+                  if k not in _ATRIBUTOS_PADRAO and k not in ('request_id', 'metodo', 'rota') and v is not None}
+        if extras:
+            linha += f" {json.dumps(extras, ensure_ascii=False, default=str)}"
+        if record.exc_text:
+            linha += f"\n{record.exc_text}"
+        return linha
+
+
+def configurar_logging():
+    """
+    Liga o logger raiz a uma fila consumida por uma thread que escreve no stdout.
+    Idempotente: chamadas seguintes não duplicam handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    fila = queue.SimpleQueue()
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatadorTexto() if LOG_FORMATO == 'texto' else FormatadorJSON())
+
+    handler = _QueueHandlerContexto(fila)
+    handler.addFilter(_FiltroContexto())
+
+    raiz = logging.getLogger()
+    raiz.setLevel(LOG_NIVEL)
+    raiz.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(fila, saida, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _atribuir_request_id():
+    # Aceita o id de um proxy/balanceador, limitado para não poluir os logs
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+
+
+def _devolver_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def instalar(app):
+    """
+    Configura o logging e registra a geração do request_id em cada requisição.
+    """
+    configurar_logging()
+    app.before_request(_atribuir_request_id)
+    app.after_request(_devolver_request_id)
@@ -0,0 +1,174 @@
+"""
+Métricas da aplicação no formato Prometheus (expostas em /metrics)
+
+Com gunicorn cada worker é um processo separado; para que /metrics some os
+valores de todos eles, o prometheus_client roda em modo multiprocesso quando
+a variável PROMETHEUS_MULTIPROC_DIR aponta para um diretório gravável (o
+gunicorn.conf.py da raiz já a define e limpa os arquivos de workers mortos).
+Sem a variável (python app.py) as métricas ficam só no processo atual.
+
+Métricas:
+ - faf_requisicoes_total / faf_requisicao_segundos: por blueprint e endpoint
+ - faf_sql_segundos / faf_sql_consultas_total: tempo de SQL por requisição,
+   separado por banco (local/railway), a partir de instrumentacao.py
+ - faf_escrita_dual_total / faf_escrita_dual_falhas_total: resultado das
+   escritas duais (ok, parcial, falha) e banco que falhou
+ - faf_cache_consultas_total: acertos e falhas por cache (razão de acerto =
+   hit / (hit + miss))
+ - faf_exportacao_bytes: tamanho dos arquivos exportados, por tipo
+ - faf_leituras_total / faf_banco_latencia_sonda_segundos: banco escolhido
+   para as leituras e latência medida pela sonda (roteamento_leitura.py)
+ - faf_disjuntor_estado: circuito de cada banco (0 fechado, 1 meio-aberto,
+   2 aberto; o maior valor entre os workers), ver disjuntor.py
+"""
+
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+
+from instrumentacao import resumo_por_banco
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_BYTES = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+
+REQUISICOES = Counter(
+    'faf_requisicoes_total', 'Requisições HTTP atendidas',
+    ['blueprint', 'endpoint', 'metodo', 'status']
+)
+LATENCIA_REQUISICAO = Histogram(
+    'faf_requisicao_segundos', 'Latência das requisições HTTP',
+    ['blueprint', 'endpoint'], buckets=BUCKETS_SEGUNDOS
+)
+TEMPO_SQL = Histogram(
+    'faf_sql_segundos', 'Tempo total de SQL por requisição, por banco',
+    ['banco'], buckets=BUCKETS_SEGUNDOS
+)
+CONSULTAS_SQL = Counter(
+    'faf_sql_consultas_total', 'Comandos SQL executados em requisições, por banco',
+    ['banco']
+)
+ESCRITAS_DUAIS = Counter(
+    'faf_escrita_dual_total', 'Escritas duais por resultado (ok, parcial, falha)',
+    ['resultado']
+)
+FALHAS_ESCRITA_DUAL = Counter(
+    'faf_escrita_dual_falhas_total', 'Falhas de escrita dual por banco',
+    ['banco']
+)
+CONSULTAS_CACHE = Counter(
+    'faf_cache_consultas_total', 'Consultas a caches internos (hit/miss)',
+    ['cache', 'resultado']
+)
+BYTES_EXPORTACAO = Histogram(
+    'faf_exportacao_bytes', 'Tamanho dos arquivos exportados',
+    ['tipo'], buckets=BUCKETS_BYTES
+)
+
+LEITURAS_POR_BANCO = Counter(
+    'faf_leituras_total', 'Cursores de leitura entregues, por banco escolhido',
+    ['banco']
+)
+LATENCIA_SONDA = Gauge(
+    'faf_banco_latencia_sonda_segundos', 'Latência média do SELECT 1 da sonda de leitura',
+    ['banco'], multiprocess_mode='mostrecent'
+)
+ESTADO_DISJUNTOR = Gauge(
+    'faf_disjuntor_estado', 'Estado do circuito do banco (0 fechado, 1 meio-aberto, 2 aberto)',
+    ['banco'], multiprocess_mode='max'
+)
+VALOR_ESTADO_DISJUNTOR = {'fechado': 0, 'meio_aberto': 1, 'aberto': 2}
+
+
+def registrar_escrita_dual(resultado):
+    """
+    Contabiliza o dict devolvido por execute_dual / execute_dual_with_audit.
+    """
+    bancos_ok = [banco for banco in ('local', 'railway') if resultado.get(banco)]
+    if len(bancos_ok) == 2:
+        ESCRITAS_DUAIS.labels('ok').inc()
+    elif bancos_ok:
+        ESCRITAS_DUAIS.labels('parcial').inc()
+    else:
+        ESCRITAS_DUAIS.labels('falha').inc()
+    for banco in ('local', 'railway'):
+        if not resultado.get(banco):
+            FALHAS_ESCRITA_DUAL.labels(banco).inc()
+
+
+def registrar_cache(nome, acerto):
+    """
+    Contabiliza uma consulta ao cache `nome` (acerto=True para hit).
+    """
+    CONSULTAS_CACHE.labels(nome, 'hit' if acerto else 'miss').inc()
+
+
+def registrar_leitura(banco):
+    """
+    Contabiliza um cursor de leitura entregue pelo banco escolhido no roteamento.
+    """
+    LEITURAS_POR_BANCO.labels(banco).inc()
+
+
+def registrar_sonda(banco, latencia_ms):
+    """
+    Atualiza a latência medida pela sonda de leitura.
+    """
+    LATENCIA_SONDA.labels(banco).set(latencia_ms / 1000)
+
+
+def registrar_disjuntor(banco, estado):
+    """
+    Atualiza o estado do circuito do banco.
+    """
+    ESTADO_DISJUNTOR.labels(banco).set(VALOR_ESTADO_DISJUNTOR[estado])
+
+
+def registrar_exportacao(tipo, tamanho_bytes):
+    """
+    Contabiliza um arquivo exportado (CSV, PDF...) e seu tamanho.
+    """
+    BYTES_EXPORTACAO.labels(tipo).observe(tamanho_bytes)
+
+
+def gerar_metricas():
+    """
+    Texto no formato de exposição do Prometheus, somando todos os workers quando em multiprocesso.
+    Retorna (conteudo, content_type).
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def _iniciar_requisicao():
+    g.inicio_metricas = time.perf_counter()
+
+
+def _finalizar_requisicao(response):
+    inicio = g.pop('inicio_metricas', None)
+    if inicio is None or request.endpoint == 'metricas.metrics':
+        return response
+
+    blueprint = request.blueprint or 'app'
+    endpoint = request.endpoint or 'sem_rota'
+    REQUISICOES.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    LATENCIA_REQUISICAO.labels(blueprint, endpoint).observe(time.perf_counter() - inicio)
+
+    for banco, item in resumo_por_banco().items():
+        TEMPO_SQL.labels(banco).observe(item['ms'] / 1000)
+        CONSULTAS_SQL.labels(banco).inc(item['consultas'])
+    return response
+
+
+def instalar(app):
+    """
+    Registra os ganchos que medem cada requisição.
+    """
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
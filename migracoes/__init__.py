@@ -0,0 +1,241 @@
+"""
+Migrações de esquema aplicadas aos bancos LOCAL e RAILWAY
+
+Cada migração é um módulo mNNN_descricao.py neste pacote com uma função
+`aplicar(conn, ao_progresso=None)`. O número NNN é a versão. As versões
+aplicadas ficam registradas na tabela schema_migracoes de cada banco,
+junto com a duração de cada uma.
+
+O executor aplica as versões pendentes nos dois bancos juntos: a versão N
+precisa terminar em LOCAL e em RAILWAY antes de a N+1 começar. Se um banco
+falha, nada mais é aplicado, para que os dois não fiquem em versões
+diferentes.
+
+Uso:
+    python -m migracoes            # aplica as pendentes nos dois bancos
+    python -m migracoes status     # versões aplicadas e pendentes por banco
+    python -m migracoes --ate 2    # aplica só até a versão 2
+
+As migrações usam os utilitários abaixo para não travar as tabelas de produção:
+ - executar_ddl: DDL transacional com lock_timeout curto e novas tentativas;
+ - criar_indice_concorrente: CREATE INDEX CONCURRENTLY, fora de transação e
+   refazendo índices deixados inválidos por uma tentativa anterior;
+ - backfill_em_lotes: UPDATE por faixas de id, com commit e progresso a cada lote.
+"""
+
+import importlib
+import pkgutil
+import re
+import time
+
+import psycopg2
+
+from db import BANCOS, conectar
+
+CRIAR_TABELA_MIGRACOES = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        aplicada_em TIMESTAMP NOT NULL DEFAULT now(),
+        duracao_ms INTEGER NOT NULL
+    )
+"""
+
+REGEX_MODULO = re.compile(r'^m(\d{3})_\w+$')
+
+# Espera máxima por locks em DDL: melhor falhar e tentar de novo do que
+# enfileirar todas as consultas da aplicação atrás do ALTER TABLE
+LOCK_TIMEOUT_DDL = '5s'
+TENTATIVAS_DDL = 5
+
+# Tamanho padrão dos lotes de backfill (linhas por faixa de id)
+LOTE_BACKFILL = 5000
+
+
+# ========== UTILITÁRIOS PARA AS MIGRAÇÕES ==========
+
+def executar_ddl(conn, sql, params=None, lock_timeout=LOCK_TIMEOUT_DDL):
+    """
+    Executa DDL numa transação com lock_timeout curto.
+    Se o lock não for obtido a tempo, desfaz e tenta de novo com espera crescente.
+    """
+    for tentativa in range(1, TENTATIVAS_DDL + 1):
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+            cur.execute(sql, params)
+            conn.commit()
+            return
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if tentativa == TENTATIVAS_DDL:
+                raise
+            time.sleep(tentativa)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def _nome_indice(sql):
+    encontrado = re.search(r'IF\s+NOT\s+EXISTS\s+(\w+)', sql, re.IGNORECASE)
+    return encontrado.group(1) if encontrado else None
+
+
+def criar_indice_concorrente(conn, sql):
+    """
+    Executa um CREATE INDEX CONCURRENTLY (ou DROP INDEX CONCURRENTLY), que não
+    bloqueia escritas mas não pode rodar dentro de transação.
+
+    Um CREATE INDEX CONCURRENTLY interrompido deixa o índice marcado como
+    inválido, e o IF NOT EXISTS da próxima execução o manteria assim; nesse
+    caso o índice é removido e criado de novo.
+    """
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            nome = _nome_indice(sql)
+            if nome:
+                cur.execute("""
+                    SELECT 1 FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = %s AND NOT i.indisvalid
+                """, (nome.lower(),))
+                if cur.fetchone():
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}")
+            cur.execute(sql)
+    finally:
+        conn.autocommit = False
+
+
+def backfill_em_lotes(conn, sql, tabela='Parcerias_Despesas', lote=LOTE_BACKFILL,
+                      usuario_id=1, ao_progresso=None):
+    """
+    Executa um UPDATE de preenchimento em faixas de id, com commit a cada lote,
+    para que nenhuma transação segure locks de linha da tabela inteira.
+
+    Args:
+        sql: UPDATE com dois parâmetros, o início e o fim da faixa de id (inclusive)
+        tabela: tabela percorrida (precisa de chave primária id)
+        lote: tamanho de cada faixa de id
+        usuario_id: usuário gravado pelo trigger de auditoria (1 = sistema)
+        ao_progresso: callback chamado com uma mensagem de progresso
+
+    Returns:
+        int: total de linhas atualizadas
+    """
+    cur = conn.cursor()
+    cur.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {tabela}")
+    menor_id, maior_id = cur.fetchone()
+    conn.commit()
+
+    total_ids = maior_id - menor_id + 1
+    atualizadas = 0
+    for inicio in range(menor_id, maior_id + 1, lote):
+        fim = inicio + lote - 1
+        cur.execute("SET LOCAL app.current_user_id = %s", (str(usuario_id),))
+        cur.execute(sql, (inicio, fim))
+        atualizadas += cur.rowcount
+        conn.commit()
+        if ao_progresso:
+            feito = min(fim, maior_id) - menor_id + 1
+            ao_progresso(f"backfill {tabela}: {feito}/{total_ids} ids, {atualizadas} linhas")
+    cur.close()
+    return atualizadas
+
+
+# ========== EXECUTOR ==========
+
+def listar_migracoes():
+    """
+    Migrações disponíveis no pacote, em ordem de versão: [(versao, nome, modulo)].
+    """
+    migracoes = []
+    for info in pkgutil.iter_modules(__path__):
+        encontrado = REGEX_MODULO.match(info.name)
+        if encontrado:
+            modulo = importlib.import_module(f"{__name__}.{info.name}")
+            migracoes.append((int(encontrado.group(1)), info.name, modulo))
+    return sorted(migracoes, key=lambda m: m[0])
+
+
+def versoes_aplicadas(conn):
+    """
+    {versao: (nome, aplicada_em, duracao_ms)} das migrações já registradas no banco.
+    """
+    with conn.cursor() as cur:
+        cur.execute(CRIAR_TABELA_MIGRACOES)
+        cur.execute("SELECT versao, nome, aplicada_em, duracao_ms FROM schema_migracoes")
+        aplicadas = {row[0]: row[1:] for row in cur.fetchall()}
+    conn.commit()
+    return aplicadas
+
+
+def status(bancos=None):
+    """
+    Situação de cada banco: versões aplicadas (com duração) e pendentes.
+    """
+    disponiveis = listar_migracoes()
+    situacao = {}
+    for banco in bancos or BANCOS:
+        conn = conectar(banco)
+        try:
+            aplicadas = versoes_aplicadas(conn)
+        finally:
+            conn.close()
+        situacao[banco] = {
+            'aplicadas': aplicadas,
+            'pendentes': [versao for versao, _, _ in disponiveis if versao not in aplicadas],
+        }
+    return situacao
+
+
+def migrar(bancos=None, ate=None, ao_progresso=print):
+    """
+    Aplica as migrações pendentes, versão por versão, em todos os bancos.
+
+    Returns:
+        list: [(versao, nome, {banco: duracao_ms})] das migrações aplicadas
+    """
+    bancos = list(bancos or BANCOS)
+    conexoes = {banco: conectar(banco) for banco in bancos}
+    executadas = []
+    try:
+        aplicadas = {banco: versoes_aplicadas(conn) for banco, conn in conexoes.items()}
+
+        for versao, nome, modulo in listar_migracoes():
+            if ate is not None and versao > ate:
+                break
+            pendentes = [banco for banco in bancos if versao not in aplicadas[banco]]
+            if not pendentes:
+                continue
+
+            duracoes = {}
+            for banco in pendentes:
+                conn = conexoes[banco]
+                ao_progresso(f"📍 {nome} em {banco.upper()}...")
+                inicio = time.perf_counter()
+                try:
+                    modulo.aplicar(conn, ao_progresso=lambda msg: ao_progresso(f"   {msg}"))
+                except Exception:
+                    conn.rollback()
+                    ao_progresso(f"❌ {nome} falhou em {banco.upper()}; nenhuma versão posterior será aplicada")
+                    raise
+                duracao_ms = int((time.perf_counter() - inicio) * 1000)
+
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO schema_migracoes (versao, nome, duracao_ms)
+                        VALUES (%s, %s, %s)
+                    """, (versao, nome, duracao_ms))
+                conn.commit()
+                duracoes[banco] = duracao_ms
+                ao_progresso(f"✅ {nome} em {banco.upper()} ({duracao_ms} ms)")
+
+            executadas.append((versao, nome, duracoes))
+    finally:
+        for conn in conexoes.values():
+            conn.close()
+    return executadas
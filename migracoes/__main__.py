@@ -0,0 +1,44 @@
+"""
+Linha de comando do executor de migrações (ver migracoes/__init__.py)
+
+    python -m migracoes [aplicar|status] [--ate VERSAO] [--banco local|railway]
+"""
+
+import argparse
+import sys
+
+from db import BANCOS
+from migracoes import listar_migracoes, migrar, status
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m migracoes')
+    parser.add_argument('acao', nargs='?', choices=['aplicar', 'status'], default='aplicar')
+    parser.add_argument('--ate', type=int, help='Aplica somente até esta versão')
+    parser.add_argument('--banco', choices=sorted(BANCOS), action='append',
+                        help='Restringe a um banco (padrão: todos)')
+    args = parser.parse_args()
+
+    if args.acao == 'status':
+        nomes = {versao: nome for versao, nome, _ in listar_migracoes()}
+        for banco, situacao in status(args.banco).items():
+            print(f"\n📍 {banco.upper()}")
+            for versao, (nome, aplicada_em, duracao_ms) in sorted(situacao['aplicadas'].items()):
+                print(f"   ✅ {versao:03d} {nome} ({aplicada_em:%d/%m/%Y %H:%M}, {duracao_ms} ms)")
+            for versao in situacao['pendentes']:
+                print(f"   ⏳ {versao:03d} {nomes[versao]} (pendente)")
+        return 0
+
+    try:
+        executadas = migrar(args.banco, ate=args.ate)
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        return 1
+
+    if not executadas:
+        print("Nenhuma migração pendente")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
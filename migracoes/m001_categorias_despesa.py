@@ -0,0 +1,86 @@
+"""
+Migração 001: dimensão categorias_despesa
+
+Cria a tabela categorias_despesa (id inteiro + nome único) e a coluna
+Parcerias_Despesas.categoria_id, com chave estrangeira para a dimensão.
+A partir daqui as listagens, estatísticas e renomeações usam o id inteiro;
+a coluna texto categoria_despesa continua sendo gravada e um trigger preenche
+categoria_id a partir dela, de modo que o código de escrita existente não
+precisa mudar. Como o trigger recria categorias pelo texto, a coluna texto é
+mantida igual ao nome da dimensão: renomeações e mesclagens
+(categorias.renomear_categoria) reescrevem o texto das despesas afetadas.
+
+Aplicada pelo executor: python -m migracoes
+"""
+
+from migracoes import backfill_em_lotes, criar_indice_concorrente, executar_ddl
+
+ESTRUTURA_SQL = """
+CREATE TABLE IF NOT EXISTS categorias_despesa (
+    id SERIAL PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+
+ALTER TABLE Parcerias_Despesas
+    ADD COLUMN IF NOT EXISTS categoria_id INTEGER REFERENCES categorias_despesa(id);
+
+-- Resolve categoria_id a partir do texto gravado pela aplicação
+CREATE OR REPLACE FUNCTION categorias_despesa_resolver_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.categoria_despesa IS NULL OR btrim(NEW.categoria_despesa) = '' THEN
+        NEW.categoria_id := NULL;
+    ELSE
+        INSERT INTO categorias_despesa (nome)
+        VALUES (NEW.categoria_despesa)
+        ON CONFLICT (nome) DO NOTHING;
+
+        SELECT id INTO NEW.categoria_id
+        FROM categorias_despesa
+        WHERE nome = NEW.categoria_despesa;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- O nome começa com "c" de propósito: triggers BEFORE disparam em ordem
+-- alfabética e categoria_id precisa estar preenchido antes da auditoria.
+DROP TRIGGER IF EXISTS categorias_despesa_resolver_id ON Parcerias_Despesas;
+CREATE TRIGGER categorias_despesa_resolver_id
+    BEFORE INSERT OR UPDATE OF categoria_despesa
+    ON Parcerias_Despesas
+    FOR EACH ROW
+    EXECUTE FUNCTION categorias_despesa_resolver_id();
+"""
+
+POPULAR_DIMENSAO_SQL = """
+INSERT INTO categorias_despesa (nome)
+SELECT DISTINCT categoria_despesa
+FROM Parcerias_Despesas
+WHERE categoria_despesa IS NOT NULL AND btrim(categoria_despesa) <> ''
+ON CONFLICT (nome) DO NOTHING
+"""
+
+BACKFILL_SQL = """
+UPDATE Parcerias_Despesas pd
+SET categoria_id = c.id
+FROM categorias_despesa c
+WHERE pd.id BETWEEN %s AND %s
+  AND pd.categoria_id IS NULL
+  AND c.nome = pd.categoria_despesa
+"""
+
+INDICE_SQL = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pd_categoria_id_id
+ON Parcerias_Despesas (categoria_id, id)
+"""
+
+
+def aplicar(conn, ao_progresso=None):
+    """
+    Cria a dimensão, preenche categoria_id em lotes por faixa de id e indexa.
+    """
+    executar_ddl(conn, ESTRUTURA_SQL)
+    executar_ddl(conn, POPULAR_DIMENSAO_SQL)
+    backfill_em_lotes(conn, BACKFILL_SQL, ao_progresso=ao_progresso)
+    criar_indice_concorrente(conn, INDICE_SQL)
@@ -0,0 +1,52 @@
+"""
+Migração 002: índices de expressão/cobertura para Parcerias_Despesas
+
+Cada índice corresponde a um predicado das consultas quentes registradas em
+indices.py (verifique com `flask --app app indices-advisor`):
+
+ - idx_pd_termo_aditivo_id: `numero_termo = %s AND COALESCE(aditivo, 0) = %s
+   ORDER BY id` (carregar/salvar/excluir despesas de um termo e aditivo).
+   O índice é sobre a própria expressão COALESCE(aditivo, 0), que um índice
+   simples em aditivo não atende, e inclui as colunas lidas pela tela de
+   edição para permitir index-only scan. Substitui idx_pd_numero_termo, que
+   passa a ser prefixo redundante.
+ - idx_pd_categoria_rubrica: `categoria_id = %s` agrupando por rubrica
+   (rubrica sugerida e rubrica mais comum do dicionário).
+ - idx_pd_categoria_termo: `categoria_id = %s` agrupando por numero_termo
+   (termos por categoria e contagem de termos no dicionário).
+
+Todos são criados com CONCURRENTLY, sem bloquear escritas na tabela.
+
+Aplicada pelo executor: python -m migracoes
+"""
+
+from migracoes import criar_indice_concorrente, executar_ddl
+
+INDICES_SQL = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pd_termo_aditivo_id
+    ON Parcerias_Despesas (numero_termo, (COALESCE(aditivo, 0)), id)
+    INCLUDE (rubrica, quantidade, categoria_id, categoria_despesa, mes, valor)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pd_categoria_rubrica
+    ON Parcerias_Despesas (categoria_id, rubrica)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pd_categoria_termo
+    ON Parcerias_Despesas (categoria_id, numero_termo)
+    INCLUDE (valor)
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_pd_numero_termo",
+]
+
+
+def aplicar(conn, ao_progresso=None):
+    """
+    Cria os índices um a um e atualiza as estatísticas do planejador.
+    """
+    for i, sql in enumerate(INDICES_SQL, start=1):
+        criar_indice_concorrente(conn, sql)
+        if ao_progresso:
+            ao_progresso(f"índices: {i}/{len(INDICES_SQL)}")
+    executar_ddl(conn, "ANALYZE Parcerias_Despesas")
@@ -0,0 +1,67 @@
+"""
+Migração 003: regras de termo e coordenação em c_legislacao
+
+Adiciona a c_legislacao as colunas usadas pelo motor de portarias
+(portarias.py):
+
+ - regra_termo: tipos de termo a que a legislação se aplica (TCV, TFM,
+   TCL...), procurados no número do termo. Vazio = qualquer tipo;
+ - regra_coordenacao: coordenações específicas (FUMCAD, FMID) atendidas pela
+   legislação. Vazio = legislação geral.
+
+As regras que estavam fixas em main.portaria_automatica são gravadas nas
+legislações correspondentes (inseridas, se não existirem). Legislações que
+já tinham regras preenchidas não são alteradas.
+
+Aplicada pelo executor: python -m migracoes
+"""
+
+from migracoes import executar_ddl
+
+ESTRUTURA_SQL = """
+ALTER TABLE c_legislacao
+    ADD COLUMN IF NOT EXISTS regra_termo TEXT[] NOT NULL DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS regra_coordenacao TEXT[] NOT NULL DEFAULT '{}'
+"""
+
+# (lei, inicio, termino, regra_termo, regra_coordenacao)
+REGRAS_INICIAIS = [
+    ('Decreto nº 6.170', '2007-07-25', '2008-08-11', ['TCV'], []),
+    ('Portaria nº 006/2008/SF-SEMPLA', '2008-08-12', '2012-03-21', ['TCV'], []),
+    ('Portaria nº 072/SMPP/2012', '2012-03-22', '2014-05-21', ['TCV'], ['FUMCAD']),
+    ('Portaria nº 009/SMDHC/2014', '2014-05-22', '2017-09-30', ['TCV'], ['FUMCAD']),
+    ('Portaria nº 121/SMDHC/2019', '2017-10-01', '2023-02-28', ['TFM', 'TCL'], []),
+    ('Portaria nº 140/SMDHC/2019', '2017-10-01', '2023-12-31', ['TFM', 'TCL'], ['FUMCAD', 'FMID']),
+    ('Portaria nº 021/SMDHC/2023', '2023-03-01', '2030-12-31', ['TFM', 'TCL'], []),
+    ('Portaria nº 090/SMDHC/2023', '2024-01-01', '2030-12-31', ['TFM', 'TCL'], ['FUMCAD', 'FMID']),
+]
+
+# c_legislacao não tem restrição única em lei (sem ON CONFLICT): atualiza a
+# legislação existente ainda sem regras e insere a que não existir
+ATUALIZAR_REGRA_SQL = """
+    UPDATE c_legislacao
+    SET regra_termo = %s, regra_coordenacao = %s
+    WHERE lei = %s AND regra_termo = '{}' AND regra_coordenacao = '{}'
+"""
+
+INSERIR_REGRA_SQL = """
+    INSERT INTO c_legislacao (lei, inicio, termino, regra_termo, regra_coordenacao)
+    SELECT %s, %s, %s, %s, %s
+    WHERE NOT EXISTS (SELECT 1 FROM c_legislacao WHERE lei = %s)
+"""
+
+
+def aplicar(conn, ao_progresso=None):
+    """
+    Cria as colunas e grava as regras iniciais.
+    """
+    executar_ddl(conn, ESTRUTURA_SQL)
+
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL app.current_user_id = '1'")
+        for lei, inicio, termino, regra_termo, regra_coordenacao in REGRAS_INICIAIS:
+            cur.execute(ATUALIZAR_REGRA_SQL, (regra_termo, regra_coordenacao, lei))
+            cur.execute(INSERIR_REGRA_SQL, (lei, inicio, termino, regra_termo, regra_coordenacao, lei))
+    conn.commit()
+    if ao_progresso:
+        ao_progresso(f"regras: {len(REGRAS_INICIAIS)} legislações")
@@ -0,0 +1,142 @@
+"""
+OSCs cadastradas em Parcerias: busca do autocomplete (nome -> CNPJ)
+
+A busca ignora maiúsculas, acentos e pontuação: "assoc sao" encontra
+"Associação São Paulo". Cada palavra digitada precisa começar alguma
+palavra do nome da OSC.
+
+O índice é uma lista ordenada de (palavra normalizada, posição da OSC).
+As OSCs com uma palavra começando por um prefixo formam uma faixa contígua
+dessa lista, encontrada por busca binária; com várias palavras digitadas,
+as faixas são intersectadas. Aparecem primeiro as OSCs cujo nome começa
+pelo texto digitado, depois as demais, em ordem alfabética.
+
+O índice é montado no primeiro uso em cada processo, de novo depois de
+OSCS_RECARGA_S segundos, e na hora quando uma parceria é gravada neste
+worker (invalidar()).
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+from config import OSCS_RECARGA_S
+from metricas import registrar_cache
+
+CONSULTA_OSCS = """
+    SELECT DISTINCT osc, cnpj
+    FROM Parcerias
+    WHERE osc IS NOT NULL AND osc != ''
+    ORDER BY osc
+"""
+
+# Maior caractere possível: prefixo + FIM delimita o fim da faixa do prefixo
+FIM = '\uffff'
+
+_PALAVRA = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    """
+    Minúsculas, sem acentos: "Associação São" -> "associacao sao"
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def palavras(texto):
+    return _PALAVRA.findall(normalizar(texto))
+
+
+def carregar_oscs(cur):
+    """
+    {osc: cnpj} de todas as OSCs de Parcerias, em ordem de nome.
+    """
+    cur.execute(CONSULTA_OSCS)
+    return {row['osc']: row['cnpj'] or '' for row in cur.fetchall() if row['osc']}
+
+
+class IndiceOscs:
+    """
+    Índice ordenado das palavras dos nomes das OSCs.
+    """
+
+    def __init__(self, oscs):
+        self.nomes = list(oscs)
+        self.cnpjs = [oscs[nome] for nome in self.nomes]
+        self._normalizados = [' '.join(palavras(nome)) for nome in self.nomes]
+        entradas = sorted(
+            (palavra, posicao)
+            for posicao, normalizado in enumerate(self._normalizados)
+            for palavra in set(normalizado.split())
+        )
+        self._palavras = [palavra for palavra, _ in entradas]
+        self._posicoes = [posicao for _, posicao in entradas]
+
+    def _com_prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self._palavras, prefixo)
+        fim = bisect.bisect_left(self._palavras, prefixo + FIM, inicio)
+        return set(self._posicoes[inicio:fim])
+
+    def buscar(self, texto, limite=10):
+        """
+        Até `limite` OSCs para o texto digitado: [{'osc', 'cnpj'}].
+        """
+        termos = palavras(texto)
+        if not termos:
+            return []
+
+        candidatas = None
+        # Palavras mais longas primeiro: faixas menores, interseção mais barata
+        for termo in sorted(set(termos), key=len, reverse=True):
+            encontradas = self._com_prefixo(termo)
+            candidatas = encontradas if candidatas is None else candidatas & encontradas
+            if not candidatas:
+                return []
+
+        consulta = ' '.join(termos)
+        melhores = heapq.nsmallest(
+            limite, candidatas,
+            key=lambda posicao: (not self._normalizados[posicao].startswith(consulta), posicao)
+        )
+        return [{'osc': self.nomes[posicao], 'cnpj': self.cnpjs[posicao]} for posicao in melhores]
+
+
+_indice = None
+_montado_em = 0.0
+_trava = threading.Lock()
+
+
+def obter_indice(abrir_cursor):
+    """
+    Índice deste processo; montado de novo se ausente ou mais velho que OSCS_RECARGA_S.
+    `abrir_cursor` (ex.: get_cursor_leitura) só é chamado quando for preciso consultar o banco.
+    """
+    global _indice, _montado_em
+    with _trava:
+        indice = _indice
+        valido = indice is not None and time.monotonic() - _montado_em < OSCS_RECARGA_S
+    registrar_cache('oscs', valido)
+    if valido:
+        return indice
+
+    cur = abrir_cursor()
+    try:
+        indice = IndiceOscs(carregar_oscs(cur))
+    finally:
+        cur.close()
+    with _trava:
+        _indice, _montado_em = indice, time.monotonic()
+    return indice
+
+
+def invalidar():
+    """
+    Descarta o índice deste processo (ex.: parceria gravada com uma OSC nova).
+    """
+    global _indice
+    with _trava:
+        _indice = None
@@ -0,0 +1,193 @@
+"""
+Perfilamento sob demanda de requisições individuais
+
+Quando uma página está lenta em produção, um Agente Público pode pedir que
+aquela requisição rode sob o cProfile, com o cabeçalho `X-Perfilar: 1` ou o
+parâmetro `?_perfilar=1` em qualquer rota (o gancho é instalado no
+create_app, então vale para todos os blueprints). Para os demais usuários o
+pedido é ignorado.
+
+Cada perfil gera dois arquivos em PERFIS_DIR:
+ - <id>.prof: estatísticas no formato pstats (abrir com snakeviz,
+   `python -m pstats` ou pstats.Stats);
+ - <id>.json: resumo com tempo total, tempo de SQL (por banco, medido pela
+   instrumentação de cursores), tempo de Python (total - SQL) e as funções
+   com maior tempo acumulado.
+
+A resposta perfilada traz os cabeçalhos X-Perfil-Id e X-Perfil-Url; os
+perfis ficam listados em /perfis/. Só os PERFIS_MAX mais recentes são mantidos.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request, session
+
+from config import PERFILAMENTO_HABILITADO, PERFIS_DIR, PERFIS_MAX
+from instrumentacao import consultas_da_requisicao, resumo_por_banco
+
+logger = logging.getLogger(__name__)
+
+# Funções listadas no resumo, por tempo acumulado
+TOP_FUNCOES = 25
+
+
+def _pedido_de_perfil():
+    return (request.headers.get('X-Perfilar') == '1' or request.args.get('_perfilar') == '1') \
+        and session.get("tipo_usuario") == "Agente Público"
+
+
+def _iniciar_perfil():
+    if not _pedido_de_perfil():
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # A partir do Python 3.12 só um profiler pode estar ativo por vez no processo
+        logger.warning("Perfilamento ignorado: outra requisição já está sendo perfilada")
+        return
+    g.perfil_inicio = time.perf_counter()
+    g.perfil = perfil
+
+
+def _principais_funcoes(estatisticas):
+    """
+    As TOP_FUNCOES funções com maior tempo acumulado, em ms.
+    """
+    funcoes = []
+    for (arquivo, linha, nome), (_, chamadas, tempo_proprio, tempo_acumulado, _) in estatisticas.stats.items():
+        funcoes.append({
+            'funcao': f"{os.path.basename(arquivo)}:{linha}({nome})",
+            'chamadas': chamadas,
+            'proprio_ms': round(tempo_proprio * 1000, 3),
+            'acumulado_ms': round(tempo_acumulado * 1000, 3),
+        })
+    funcoes.sort(key=lambda f: f['acumulado_ms'], reverse=True)
+    return funcoes[:TOP_FUNCOES]
+
+
+def _remover_antigos():
+    perfis = sorted(
+        (nome for nome in os.listdir(PERFIS_DIR) if nome.endswith('.json')),
+        key=lambda nome: os.path.getmtime(os.path.join(PERFIS_DIR, nome))
+    )
+    for nome in perfis[:-PERFIS_MAX]:
+        for extensao in ('.json', '.prof'):
+            caminho = os.path.join(PERFIS_DIR, nome[:-5] + extensao)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+def _finalizar_perfil(response):
+    perfil = g.pop('perfil', None)
+    if perfil is None:
+        return response
+    perfil.disable()
+    total_ms = (time.perf_counter() - g.pop('perfil_inicio')) * 1000
+
+    estatisticas = pstats.Stats(perfil, stream=io.StringIO())
+    consultas = consultas_da_requisicao()
+    sql_por_banco = resumo_por_banco(consultas)
+    sql_ms = sum(item['ms'] for item in sql_por_banco.values())
+
+    perfil_id = uuid.uuid4().hex
+    resumo = {
+        'id': perfil_id,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        'usuario': session.get('email'),
+        'metodo': request.method,
+        'rota': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'total_ms': round(total_ms, 3),
+        'sql_ms': round(sql_ms, 3),
+        'python_ms': round(max(total_ms - sql_ms, 0), 3),
+        'sql_por_banco': sql_por_banco,
+        'consultas': len(consultas),
+        'funcoes': _principais_funcoes(estatisticas),
+    }
+
+    try:
+        os.makedirs(PERFIS_DIR, exist_ok=True)
+        estatisticas.dump_stats(os.path.join(PERFIS_DIR, f"{perfil_id}.prof"))
+        with open(os.path.join(PERFIS_DIR, f"{perfil_id}.json"), 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False)
+        _remover_antigos()
+    except OSError as e:
+        logger.error("Não foi possível gravar o perfil %s: %s", perfil_id, e)
+        return response
+
+    logger.info("Perfil gravado", extra={'perfil_id': perfil_id, 'total_ms': resumo['total_ms'],
+                                         'sql_ms': resumo['sql_ms'], 'python_ms': resumo['python_ms']})
+    response.headers['X-Perfil-Id'] = perfil_id
+    response.headers['X-Perfil-Url'] = f"/perfis/{perfil_id}"
+    response.headers.add('Server-Timing', f'python;dur={resumo["python_ms"]:.1f}')
+    return response
+
+
+def _descartar_perfil(erro=None):
+    # Se a requisição terminou com exceção antes do after_request
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        perfil.disable()
+
+
+def listar_perfis():
+    """
+    Resumos dos perfis gravados, do mais recente para o mais antigo (sem a lista de funções).
+    """
+    if not os.path.isdir(PERFIS_DIR):
+        return []
+    resumos = []
+    for nome in os.listdir(PERFIS_DIR):
+        if nome.endswith('.json'):
+            resumo = obter_resumo(nome[:-5])
+            if resumo:
+                resumo.pop('funcoes', None)
+                resumos.append(resumo)
+    return sorted(resumos, key=lambda r: r['criado_em'], reverse=True)
+
+
+def _caminho(perfil_id, extensao):
+    # O id é sempre hexadecimal (uuid4); qualquer outra coisa é recusada
+    if not perfil_id or any(c not in '0123456789abcdef' for c in perfil_id):
+        return None
+    return os.path.join(PERFIS_DIR, f"{perfil_id}{extensao}")
+
+
+def obter_resumo(perfil_id):
+    """
+    Resumo JSON do perfil, ou None se não existir.
+    """
+    caminho = _caminho(perfil_id, '.json')
+    if not caminho or not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def caminho_pstats(perfil_id):
+    """
+    Caminho do arquivo .prof do perfil, ou None se não existir.
+    """
+    caminho = _caminho(perfil_id, '.prof')
+    return caminho if caminho and os.path.exists(caminho) else None
+
+
+def instalar(app):
+    """
+    Registra os ganchos de perfilamento (chamar antes dos demais ganchos da aplicação).
+    """
+    if not PERFILAMENTO_HABILITADO:
+        return
+    app.before_request(_iniciar_perfil)
+    app.after_request(_finalizar_perfil)
+    app.teardown_request(_descartar_perfil)
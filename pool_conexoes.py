@@ -0,0 +1,188 @@
+"""
+Pool de conexões por banco, usado pelas conexões de requisição de db.py
+
+Sem pool, cada requisição abria (e fechava) uma conexão nova com cada banco:
+contra o Railway isso custa o handshake TCP + TLS + autenticação a cada
+página. O pool mantém até DB_POOL_MAXIMO conexões por banco em cada worker e
+as reaproveita entre requisições.
+
+O limite também protege o PostgreSQL quando o gunicorn roda com workers
+gevent (GUNICORN_WORKER_CLASS=gevent, ver gunicorn.conf.py): com centenas de
+requisições concorrentes por worker, as que passam do limite esperam uma
+conexão livre (até DB_POOL_ESPERA segundos) em vez de abrir uma cada. Os
+primitivos de threading usados aqui viram primitivos cooperativos com o
+monkey patching do gevent, então a espera não bloqueia o worker.
+
+Ao devolver uma conexão, transações abertas são desfeitas; conexões
+fechadas ou quebradas são descartadas. O pool é recriado após um fork (cada
+worker tem o seu).
+
+O servidor (ou o proxy do Railway) derruba sessões TCP ociosas sem que
+`conn.closed` mude. Por isso, ao sair do pool, uma conexão ociosa há mais de
+DB_POOL_OCIOSA_MAX_S segundos é fechada. Uma ociosa há mais de
+DB_POOL_VERIFICAR_APOS_S passa antes por um SELECT 1, e se ele falhar é
+descartada e outra é usada. Conexões que já estavam mortas não contam como
+falha do banco no disjuntor: a primeira consulta da requisição não recebe
+uma conexão morta.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolEsgotado(psycopg2.OperationalError):
+    """
+    Nenhuma conexão liberada dentro do tempo de espera.
+    """
+
+
+class PoolConexoes:
+    """
+    Pool LIFO limitado: no máximo `maximo` conexões (ociosas + em uso) para um banco.
+    `abrir` é a função que cria uma conexão nova (sem argumentos).
+    """
+
+    def __init__(self, banco, abrir, maximo, espera, ociosa_max=300, verificar_apos=5):
+        self.banco = banco
+        self.maximo = maximo
+        self.espera = espera
+        self.ociosa_max = ociosa_max
+        self.verificar_apos = verificar_apos
+        self._abrir = abrir
+        self._vagas = threading.BoundedSemaphore(maximo)
+        self._trava = threading.Lock()
+        self._ociosas = []  # (conexão, instante em que voltou ao pool)
+        self._em_uso = 0
+
+    def obter(self):
+        """
+        Conexão ociosa (a mais recente) ou nova; espera uma vaga se o pool estiver cheio.
+        """
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(timeout=self.espera):
+            raise PoolEsgotado(f"Pool {self.banco.upper()} esgotado: {self.maximo} conexões em uso "
+                               f"por mais de {self.espera}s (ajuste DB_POOL_MAXIMO)")
+        espera_ms = (time.perf_counter() - inicio) * 1000
+        if espera_ms > 100:
+            logger.warning("Espera por conexão do pool", extra={'banco': self.banco, 'espera_ms': round(espera_ms, 1)})
+
+        try:
+            conn = None
+            while conn is None:
+                with self._trava:
+                    if not self._ociosas:
+                        break
+                    candidata, devolvida_em = self._ociosas.pop()
+                conn = self._aproveitavel(candidata, time.monotonic() - devolvida_em)
+            if conn is None:
+                conn = self._abrir()
+        except Exception:
+            self._vagas.release()
+            raise
+
+        with self._trava:
+            self._em_uso += 1
+        return conn
+
+    def _aproveitavel(self, conn, ociosa_s):
+        """
+        A conexão, se ainda servir; senão a fecha e devolve None.
+        """
+        if conn.closed:
+            return None
+        if ociosa_s > self.ociosa_max:
+            conn.close()
+            return None
+        if ociosa_s > self.verificar_apos:
+            try:
+                # Cursor sem instrumentação: o teste não entra no SQL da requisição
+                cur = psycopg2.extensions.connection.cursor(conn)
+                cur.execute("SELECT 1")
+                cur.close()
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.info("Conexão ociosa morta descartada do pool %s: %s", self.banco, e)
+                conn.close()
+                return None
+        return conn
+
+    def devolver(self, conn):
+        """
+        Devolve a conexão ao pool (ou a descarta se estiver quebrada) e libera a vaga.
+        """
+        try:
+            if not conn.closed:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    conn.close()
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+        except psycopg2.Error as e:
+            logger.warning("Conexão descartada ao voltar para o pool %s: %s", self.banco, e)
+            conn.close()
+        finally:
+            with self._trava:
+                self._em_uso -= 1
+                if not conn.closed:
+                    self._ociosas.append((conn, time.monotonic()))
+            self._vagas.release()
+
+    def fechar(self):
+        """
+        Fecha as conexões ociosas (as em uso são fechadas ao voltar).
+        """
+        with self._trava:
+            ociosas, self._ociosas = self._ociosas, []
+        for conn, _ in ociosas:
+            conn.close()
+
+    def estado(self):
+        with self._trava:
+            return {'em_uso': self._em_uso, 'ociosas': len(self._ociosas), 'maximo': self.maximo}
+
+
+_pools = {}
+_pid_pools = None
+_trava_pools = threading.Lock()
+
+
+def obter_pool(banco, abrir, maximo, espera, ociosa_max=300, verificar_apos=5):
+    """
+    Pool do banco neste processo, criado no primeiro uso (e de novo após um fork).
+    """
+    global _pid_pools
+    with _trava_pools:
+        if _pid_pools != os.getpid():
+            # Conexões herdadas do processo pai não podem ser usadas no filho
+            _pools.clear()
+            _pid_pools = os.getpid()
+        pool = _pools.get(banco)
+        if pool is None:
+            pool = _pools[banco] = PoolConexoes(banco, abrir, maximo, espera, ociosa_max, verificar_apos)
+        return pool
+
+
+def fechar_ociosas(banco):
+    """
+    Fecha as conexões ociosas do pool do banco neste processo (ex.: o banco caiu e elas morreram junto).
+    """
+    with _trava_pools:
+        pool = _pools.get(banco) if _pid_pools == os.getpid() else None
+    if pool is not None:
+        pool.fechar()
+
+
+def estado_pools():
+    """
+    {banco: {'em_uso', 'ociosas', 'maximo'}} dos pools deste processo.
+    """
+    with _trava_pools:
+        pools = dict(_pools) if _pid_pools == os.getpid() else {}
+    return {banco: pool.estado() for banco, pool in pools.items()}
@@ -0,0 +1,357 @@
+"""
+Motor de resolução de portarias: qual legislação rege um termo de parceria
+
+As regras vêm da tabela c_legislacao (período de vigência + regra_termo e
+regra_coordenacao, ver migração 003), não mais de uma lista fixa no código.
+Uma legislação se aplica a um termo quando:
+
+ - a data de início do termo está no período da legislação (término vazio =
+   ainda vigente);
+ - os tipos que aparecem no número do termo (TCV, TFM, TCL...) estão todos em
+   regra_termo, ou a legislação não restringe o tipo, ou o número não traz
+   tipo conhecido;
+ - as coordenações do número do termo (FUMCAD, FMID) estão todas em
+   regra_coordenacao. Termos sem coordenação só caem nas legislações
+   específicas quando não há nenhuma legislação geral (regra_coordenacao
+   vazia) vigente na data.
+
+Empates ficam com a legislação de início mais antigo (e menor id).
+
+O índice divide a linha do tempo nos pontos em que alguma legislação começa
+ou termina; cada faixa guarda as legislações vigentes nela. Uma consulta é
+uma busca binária pela faixa (O(log n)) e a resposta de cada combinação
+(faixa, tipos, coordenações) fica memorizada.
+
+O índice é carregado no primeiro uso em cada processo, recarregado quando
+gerenciar_portarias grava (no worker que gravou) e, nos demais workers,
+depois de PORTARIAS_RECARGA_S segundos.
+
+Há transição quando a legislação aplicável na data final do termo é outra
+(ex.: termo FUMCAD iniciado sob a Portaria 140/2019 que termina na vigência
+da 090/2023).
+
+Backfill dos termos já cadastrados (portaria/transição vazios), num passe
+só sobre Parcerias e gravado em lotes nos dois bancos:
+
+    flask --app app portarias-backfill                 # relatório (dry-run)
+    flask --app app portarias-backfill --aplicar       # grava
+"""
+
+import bisect
+import csv
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import date, timedelta
+
+import click
+from psycopg2.extras import execute_values
+
+from config import PORTARIAS_RECARGA_S
+from db import BANCOS, conectar
+from metricas import registrar_cache
+
+CONSULTA_REGRAS = """
+    SELECT id, lei, inicio, termino, regra_termo, regra_coordenacao
+    FROM c_legislacao
+    WHERE inicio IS NOT NULL
+    ORDER BY inicio, id
+"""
+
+CONSULTA_TERMOS = """
+    SELECT numero_termo, inicio, final, portaria, transicao
+    FROM Parcerias
+    ORDER BY numero_termo
+"""
+
+# Grava um lote de (numero_termo, portaria, transicao); só toca as linhas que mudam
+GRAVAR_LOTE = """
+    UPDATE Parcerias p
+    SET portaria = v.portaria, transicao = v.transicao
+    FROM (VALUES %s) AS v (numero_termo, portaria, transicao)
+    WHERE p.numero_termo = v.numero_termo
+      AND (p.portaria IS DISTINCT FROM v.portaria OR p.transicao IS DISTINCT FROM v.transicao)
+"""
+
+LOTE_BACKFILL = 500
+
+Regra = namedtuple('Regra', 'lei inicio termino termos coordenacoes')
+
+
+def _data(valor):
+    """
+    Aceita date ou texto 'AAAA-MM-DD' (com ou sem hora). Levanta ValueError se inválido.
+    """
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor).strip()[:10])
+
+
+class IndicePortarias:
+    """
+    Índice de intervalos das legislações de c_legislacao.
+    """
+
+    def __init__(self, regras):
+        self.regras = sorted(regras, key=lambda r: r.inicio)
+        self.tipos_termo = frozenset().union(*(r.termos for r in self.regras))
+        self.coordenacoes = frozenset().union(*(r.coordenacoes for r in self.regras))
+
+        pontos = {r.inicio for r in self.regras}
+        pontos.update(r.termino + timedelta(days=1) for r in self.regras if r.termino)
+        self._limites = sorted(pontos)
+        self._faixas = [
+            [r for r in self.regras if r.inicio <= ponto and (r.termino is None or r.termino >= ponto)]
+            for ponto in self._limites
+        ]
+        self._respostas = [{} for _ in self._limites]
+
+    def chave(self, numero_termo):
+        """
+        (tipos, coordenações) conhecidos que aparecem no número do termo.
+        """
+        numero = (numero_termo or '').upper()
+        return (frozenset(t for t in self.tipos_termo if t in numero),
+                frozenset(c for c in self.coordenacoes if c in numero))
+
+    def resolver(self, data_inicio, numero_termo):
+        """
+        Lei aplicável ao termo iniciado em `data_inicio`, ou None.
+        """
+        faixa = bisect.bisect_right(self._limites, _data(data_inicio)) - 1
+        if faixa < 0:
+            return None
+        chave = self.chave(numero_termo)
+        respostas = self._respostas[faixa]
+        if chave not in respostas:
+            respostas[chave] = _escolher(self._faixas[faixa], *chave)
+        return respostas[chave]
+
+    def transicao(self, data_inicio, data_final, numero_termo):
+        """
+        True se o termo começa sob uma legislação e termina sob outra.
+        """
+        inicial = self.resolver(data_inicio, numero_termo)
+        final = self.resolver(data_final, numero_termo)
+        return inicial is not None and final is not None and inicial != final
+
+
+def _escolher(vigentes, tipos, coordenacoes):
+    # Mesma escolha da antiga regra fixa (conferida por testes/check_portarias.py)
+    ha_geral = any(not r.coordenacoes for r in vigentes)
+    for r in vigentes:
+        if tipos and r.termos and not tipos <= r.termos:
+            continue
+        if coordenacoes:
+            if not coordenacoes <= r.coordenacoes:
+                continue
+        elif r.coordenacoes and ha_geral:
+            continue
+        return r.lei
+    return None
+
+
+def carregar(conn):
+    """
+    Monta o índice a partir de c_legislacao.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(CONSULTA_REGRAS)
+        regras = [
+            Regra(lei, inicio, termino, frozenset(t.upper() for t in termos or ()),
+                  frozenset(c.upper() for c in coordenacoes or ()))
+            for _, lei, inicio, termino, termos, coordenacoes in cur.fetchall()
+        ]
+    finally:
+        cur.close()
+    return IndicePortarias(regras)
+
+
+_indice = None
+_carregado_em = 0.0
+_trava = threading.Lock()
+
+
+def recarregar(conn):
+    """
+    Recarrega o índice deste processo (chamada após gravar em c_legislacao).
+    """
+    global _indice, _carregado_em
+    indice = carregar(conn)
+    with _trava:
+        _indice, _carregado_em = indice, time.monotonic()
+    return indice
+
+
+def obter_indice(conn):
+    """
+    Índice deste processo, recarregado se ausente ou mais velho que PORTARIAS_RECARGA_S.
+    """
+    with _trava:
+        indice = _indice
+        valido = indice is not None and time.monotonic() - _carregado_em < PORTARIAS_RECARGA_S
+    registrar_cache('portarias', valido)
+    return indice if valido else recarregar(conn)
+
+
+def resolver_portaria(conn, data_inicio, numero_termo):
+    """
+    Lei aplicável a um termo (ou None). Levanta ValueError se a data for inválida.
+    """
+    return obter_indice(conn).resolver(data_inicio, numero_termo)
+
+
+def resolver_lote(conn, termos):
+    """
+    Resolve vários termos de uma vez: termos é uma sequência de (numero_termo, data_inicio).
+    Retorna {numero_termo: lei ou None}; termos sem data ou com data inválida ficam com None.
+    """
+    indice = obter_indice(conn)
+    resultado = {}
+    for numero_termo, data_inicio in termos:
+        try:
+            resultado[numero_termo] = indice.resolver(data_inicio, numero_termo) if data_inicio else None
+        except ValueError:
+            resultado[numero_termo] = None
+    return resultado
+
+
+def atribuir_portarias(conn, indice=None):
+    """
+    Portaria e transição calculadas para cada termo de Parcerias, ao lado das gravadas.
+    Retorna [{'numero_termo', 'inicio', 'final', 'portaria_atual', 'portaria',
+              'transicao_atual', 'transicao'}]; termos sem início ficam sem portaria.
+    """
+    indice = indice or obter_indice(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute(CONSULTA_TERMOS)
+        termos = cur.fetchall()
+    finally:
+        cur.close()
+    return [
+        {
+            'numero_termo': numero_termo,
+            'inicio': inicio,
+            'final': final,
+            'portaria_atual': portaria,
+            'portaria': indice.resolver(inicio, numero_termo) if inicio else None,
+            'transicao_atual': transicao,
+            'transicao': int(indice.transicao(inicio, final, numero_termo)) if inicio and final else None,
+        }
+        for numero_termo, inicio, final, portaria, transicao in termos
+    ]
+
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+
+def planejar_backfill(conn, indice, sobrescrever=False):
+    """
+    Mudanças a gravar em Parcerias: [{'numero_termo', 'portaria_atual', 'portaria',
+    'transicao_atual', 'transicao'}] com os valores finais de cada termo alterado.
+    Sem `sobrescrever`, só preenche o que está vazio e mantém o que foi escolhido no formulário.
+    """
+    mudancas = []
+    for item in atribuir_portarias(conn, indice):
+        portaria, transicao = item['portaria_atual'], item['transicao_atual']
+        if item['portaria'] is not None and (sobrescrever or _vazio(portaria)):
+            portaria = item['portaria']
+        if item['transicao'] is not None and (sobrescrever or transicao is None):
+            transicao = item['transicao']
+        if portaria != item['portaria_atual'] or transicao != item['transicao_atual']:
+            mudancas.append({
+                'numero_termo': item['numero_termo'],
+                'portaria_atual': item['portaria_atual'],
+                'portaria': portaria,
+                'transicao_atual': item['transicao_atual'],
+                'transicao': transicao,
+            })
+    return mudancas
+
+
+def aplicar_backfill(conn, mudancas, lote=LOTE_BACKFILL, usuario_id=1, ao_progresso=None):
+    """
+    Grava as mudanças em lotes (um UPDATE ... FROM VALUES e um commit por lote).
+    Retorna o total de linhas alteradas.
+    """
+    alteradas = 0
+    cur = conn.cursor()
+    try:
+        for inicio in range(0, len(mudancas), lote):
+            valores = [(m['numero_termo'], m['portaria'], m['transicao']) for m in mudancas[inicio:inicio + lote]]
+            cur.execute("SET LOCAL app.current_user_id = %s", (str(usuario_id),))
+            execute_values(cur, GRAVAR_LOTE, valores, template="(%s, %s, %s::integer)", page_size=lote)
+            alteradas += cur.rowcount
+            conn.commit()
+            if ao_progresso:
+                ao_progresso(f"{min(inicio + lote, len(mudancas))}/{len(mudancas)} termos")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return alteradas
+
+
+def _gravar_relatorio(caminho, mudancas_por_banco):
+    with open(caminho, 'w', newline='', encoding='utf-8-sig') as arquivo:
+        escritor = csv.writer(arquivo, delimiter=';')
+        escritor.writerow(['banco', 'numero_termo', 'portaria_atual', 'portaria', 'transicao_atual', 'transicao'])
+        for banco, mudancas in mudancas_por_banco.items():
+            for m in mudancas:
+                escritor.writerow([banco, m['numero_termo'], m['portaria_atual'] or '', m['portaria'] or '',
+                                   '' if m['transicao_atual'] is None else m['transicao_atual'],
+                                   '' if m['transicao'] is None else m['transicao']])
+
+
+@click.command('portarias-backfill')
+@click.option('--aplicar', is_flag=True, help='Grava as mudanças (sem a opção, só mostra o relatório)')
+@click.option('--sobrescrever', is_flag=True,
+              help='Também corrige portaria/transição já preenchidas que divergem das regras')
+@click.option('--banco', type=click.Choice(sorted(BANCOS)), multiple=True,
+              help='Restringe a um banco (padrão: todos)')
+@click.option('--lote', type=int, default=LOTE_BACKFILL, show_default=True, help='Termos por UPDATE')
+@click.option('--relatorio', type=click.Path(dir_okay=False), help='Grava as mudanças em CSV')
+def comando_backfill(aplicar, sobrescrever, banco, lote, relatorio):
+    """
+    Preenche portaria e transição de todos os termos de Parcerias pelas regras de c_legislacao.
+    """
+    bancos = list(banco or BANCOS)
+    conexoes = {b: conectar(b) for b in bancos}
+    try:
+        # As mesmas regras para os dois bancos: as do RAILWAY, onde gerenciar_portarias grava
+        indice = carregar(conexoes.get('railway') or conexoes[bancos[0]])
+        mudancas_por_banco = {}
+        for b, conn in conexoes.items():
+            inicio = time.perf_counter()
+            mudancas = mudancas_por_banco[b] = planejar_backfill(conn, indice, sobrescrever)
+            conn.rollback()
+            portarias = Counter(m['portaria'] for m in mudancas if m['portaria'] != m['portaria_atual'])
+            transicoes = Counter(m['transicao'] for m in mudancas if m['transicao'] != m['transicao_atual'])
+            click.echo(f"📋 {b.upper()}: {len(mudancas)} termos a alterar "
+                       f"(calculado em {(time.perf_counter() - inicio) * 1000:.0f} ms)")
+            for lei, total in portarias.most_common():
+                click.echo(f"      portaria -> {lei}: {total}")
+            for valor, total in sorted(transicoes.items()):
+                click.echo(f"      transição -> {'Sim' if valor else 'Não'}: {total}")
+            for m in mudancas[:5]:
+                click.echo(f"      ex.: {m['numero_termo']}: {m['portaria_atual']!r} -> {m['portaria']!r}, "
+                           f"transição {m['transicao_atual']!r} -> {m['transicao']!r}")
+
+        if relatorio:
+            _gravar_relatorio(relatorio, mudancas_por_banco)
+            click.echo(f"💾 Relatório gravado em {relatorio}")
+
+        if not aplicar:
+            click.echo("\nNada foi gravado (dry-run). Use --aplicar para gravar.")
+            return
+        for b, conn in conexoes.items():
+            alteradas = aplicar_backfill(conn, mudancas_por_banco[b], lote=lote,
+                                         ao_progresso=lambda msg, b=b: click.echo(f"   {b.upper()}: {msg}"))
+            click.echo(f"✅ {b.upper()}: {alteradas} termos atualizados")
+    finally:
+        for conn in conexoes.values():
+            conn.close()
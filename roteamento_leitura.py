@@ -0,0 +1,184 @@
+"""
+Roteamento de leituras entre os bancos LOCAL e RAILWAY
+
+Toda escrita já vai para os dois bancos (execute_dual*), então as consultas
+somente leitura podem ser atendidas por qualquer um deles. As rotas de
+leitura usam get_cursor_leitura() (db.py), que pergunta a este módulo em
+que ordem tentar os bancos:
+
+ - uma sonda em segundo plano (uma thread por processo, iniciada no primeiro
+   uso) executa SELECT 1 em cada banco a cada LEITURA_SONDA_INTERVALO
+   segundos e mantém a latência média (móvel exponencial) e a saúde de cada um;
+ - os bancos saudáveis vêm primeiro, do mais rápido para o mais lento;
+   os que falharam na última sonda (ou ao conectar numa requisição) vão
+   para o fim da lista, como último recurso;
+ - bancos com o circuito aberto (ver disjuntor.py) também vão para o fim;
+ - leia-o-que-escreveu: depois de uma escrita dual, a sessão fica presa
+   por LEITURA_FIXACAO_S segundos aos bancos em que a escrita foi gravada.
+   Se o LOCAL falhou ao salvar um orçamento, o analista não volta a ler a
+   versão antiga no LOCAL logo em seguida.
+
+Com LEITURA_ROTEADA=False as leituras ficam sempre no RAILWAY, como antes.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+from flask import g, has_request_context, session
+
+from config import (LEITURA_FIXACAO_S, LEITURA_ROTEADA, LEITURA_SONDA_INTERVALO,
+                    LEITURA_SONDA_TIMEOUT)
+from disjuntor import obter_disjuntor
+from metricas import registrar_sonda
+
+logger = logging.getLogger(__name__)
+
+# Banco usado quando não há medição (e único banco sem roteamento)
+BANCO_PADRAO = 'railway'
+
+# Peso da medição mais recente na latência média
+ALFA_LATENCIA = 0.3
+
+_estado = {}
+_trava = threading.Lock()
+_pid_sonda = None
+
+
+def _medir(banco, config, conexoes):
+    """
+    Executa SELECT 1 na conexão de sonda do banco (reabrindo se preciso). Retorna a latência em ms.
+    """
+    conn = conexoes.get(banco)
+    if conn is None or conn.closed:
+        conn = conexoes[banco] = psycopg2.connect(
+            **config, connect_timeout=max(1, round(LEITURA_SONDA_TIMEOUT)),
+            options=f"-c statement_timeout={int(LEITURA_SONDA_TIMEOUT * 1000)}"
+        )
+        conn.autocommit = True
+    inicio = time.perf_counter()
+    cur = conn.cursor()
+    cur.execute("SELECT 1")
+    cur.fetchone()
+    cur.close()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _registrar_sonda(banco, latencia_ms=None, erro=None):
+    with _trava:
+        item = _estado.setdefault(banco, {'saudavel': False, 'latencia_ms': None, 'erro': None, 'sondado_em': None})
+        item['sondado_em'] = time.time()
+        if erro is None:
+            anterior = item['latencia_ms']
+            item['latencia_ms'] = latencia_ms if anterior is None else \
+                ALFA_LATENCIA * latencia_ms + (1 - ALFA_LATENCIA) * anterior
+            item['saudavel'] = True
+            item['erro'] = None
+            registrar_sonda(banco, item['latencia_ms'])
+        else:
+            if item['saudavel']:
+                logger.warning("Banco fora do roteamento de leitura", extra={'banco': banco, 'erro': erro})
+            item['saudavel'] = False
+            item['erro'] = erro
+
+
+def _sondar_continuamente():
+    from db import BANCOS  # db importa este módulo
+
+    conexoes = {}
+    while True:
+        for banco, config in BANCOS.items():
+            try:
+                _registrar_sonda(banco, latencia_ms=_medir(banco, config, conexoes))
+            except psycopg2.Error as e:
+                _registrar_sonda(banco, erro=str(e).strip())
+                conn = conexoes.pop(banco, None)
+                if conn is not None:
+                    conn.close()
+        time.sleep(LEITURA_SONDA_INTERVALO)
+
+
+def _garantir_sonda():
+    """
+    Inicia a thread de sonda neste processo (de novo após um fork: cada worker tem a sua).
+    """
+    global _pid_sonda
+    if _pid_sonda == os.getpid():
+        return
+    with _trava:
+        if _pid_sonda == os.getpid():
+            return
+        _pid_sonda = os.getpid()
+        _estado.clear()
+    threading.Thread(target=_sondar_continuamente, name='sonda-leitura', daemon=True).start()
+
+
+def marcar_falha(banco, erro):
+    """
+    Tira o banco do roteamento até a próxima sonda bem-sucedida (ex.: falha ao conectar numa requisição).
+    """
+    _registrar_sonda(banco, erro=erro)
+
+
+def registrar_escrita(resultado):
+    """
+    Prende a sessão aos bancos que receberam todas as escritas duais desta requisição.
+    Chamada por db.py com o dict devolvido por execute_dual / execute_dual_with_audit.
+    """
+    if not has_request_context():
+        return
+    gravados = {banco for banco in ('local', 'railway') if resultado.get(banco)}
+    anteriores = g.get('bancos_escritos')
+    g.bancos_escritos = gravados if anteriores is None else anteriores & gravados
+    if g.bancos_escritos:
+        session['leitura_fixa'] = {'bancos': sorted(g.bancos_escritos), 'ate': time.time() + LEITURA_FIXACAO_S}
+    else:
+        session.pop('leitura_fixa', None)
+
+
+def _bancos_fixados():
+    fixacao = session.get('leitura_fixa') if has_request_context() else None
+    if not fixacao:
+        return None
+    if fixacao['ate'] < time.time():
+        session.pop('leitura_fixa', None)
+        return None
+    return fixacao['bancos']
+
+
+def bancos_para_leitura(bancos):
+    """
+    Ordem em que os bancos devem ser tentados para uma leitura:
+    saudáveis por latência, depois os demais (último recurso).
+    """
+    if not LEITURA_ROTEADA:
+        return [BANCO_PADRAO]
+    _garantir_sonda()
+
+    fixados = _bancos_fixados()
+    candidatos = [banco for banco in bancos if not fixados or banco in fixados]
+    with _trava:
+        estado = {banco: dict(_estado.get(banco, {})) for banco in candidatos}
+
+    def chave(banco):
+        item = estado[banco]
+        if obter_disjuntor(banco).aberto():
+            return (2, 0, 0)
+        if not item:
+            # Ainda sem medição: fica atrás dos medidos, com o padrão na frente
+            return (1, 0 if banco == BANCO_PADRAO else 1, 0)
+        if not item['saudavel']:
+            return (2, 0, 0)
+        return (0, 0, item['latencia_ms'])
+
+    return sorted(candidatos, key=chave)
+
+
+def estado_bancos():
+    """
+    {banco: {'saudavel', 'latencia_ms', 'erro', 'sondado_em'}} segundo a sonda deste processo.
+    """
+    with _trava:
+        return {banco: dict(item) for banco, item in _estado.items()}
@@ -2,14 +2,24 @@
 Blueprint de despesas e APIs relacionadas a orçamento
 """
 
-from flask import Blueprint, request, jsonify, session
+import logging
+import traceback
+
+from flask import Blueprint, Response, request, jsonify, session
 from datetime import datetime
+from itertools import groupby
 import psycopg2
-from db import get_db, get_cursor, execute_dual, execute_dual_with_audit, get_cursor_local, get_cursor_railway
+from db import get_db, get_cursor, get_cursor_leitura, execute_dual, execute_dual_with_audit, get_cursor_local, get_cursor_railway
+from categorias import listar_categorias, rubrica_sugerida
 from utils import login_required
 
 despesas_bp = Blueprint('despesas', __name__, url_prefix='/api')
 
+# Substituição das despesas de um aditivo: apaga as atuais antes de inserir as novas
+EXCLUIR_DESPESAS_ADITIVO = "DELETE FROM Parcerias_Despesas WHERE numero_termo = %s AND COALESCE(aditivo, 0) = %s"
+
+logger = logging.getLogger(__name__)
+
 
 @despesas_bp.route('/test-save', methods=['GET'])
 def test_save():
@@ -17,9 +27,7 @@ def test_save():
     Endpoint de teste para verificar se salvamento funciona
     Acesse: http://127.0.0.1:8080/api/test-save
     """
-    print("\n" + "="*80)
-    print("🧪 [TEST-SAVE] Endpoint de teste chamado!")
-    print("="*80)
+    logger.info("[TEST-SAVE] Endpoint de teste chamado")
     
     try:
         result = execute_dual(
@@ -36,9 +44,7 @@ def test_save():
             }
         }, 200
     except Exception as e:
-        print(f"❌ [TEST-SAVE] Erro: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[TEST-SAVE] Erro: %s", e)
         return {
             "error": str(e),
             "traceback": traceback.format_exc()
@@ -55,8 +61,8 @@ def get_termo_info(numero_termo):
         if 'user_id' not in session:
             return jsonify({'error': 'Unauthorized'}), 401
             
-        print(f"DEBUG: Buscando termo: {numero_termo}")
-        cur = get_cursor()
+        logger.debug("Buscando termo: %s", numero_termo)
+        cur = get_cursor_leitura()
         cur.execute("""
             SELECT numero_termo, inicio, final, total_previsto, meses
             FROM Parcerias 
@@ -65,10 +71,10 @@ def get_termo_info(numero_termo):
         termo = cur.fetchone()
         cur.close()
         
-        print(f"DEBUG: Termo encontrado: {termo}")
+        logger.debug("Termo encontrado: %s", termo)
         
         if not termo:
-            print(f"DEBUG: Termo {numero_termo} não encontrado")
+            logger.debug("Termo %s não encontrado", numero_termo)
             return jsonify({"error": "Termo não encontrado"}), 404
         
         # Usar a coluna meses quando disponível, caso contrário tentar calcular pelas datas
@@ -88,9 +94,9 @@ def get_termo_info(numero_termo):
                     final = datetime.strptime(termo["final"], "%Y-%m-%d")
                     # Calcular diferença em meses
                     meses = (final.year - inicio.year) * 12 + (final.month - inicio.month) + 1
-                    print(f"DEBUG: Calculado {meses} meses entre {termo['inicio']} e {termo['final']}")
+                    logger.debug("Calculado %s meses entre %s e %s", meses, termo['inicio'], termo['final'])
             except (ValueError, TypeError) as e:
-                print(f"Erro ao calcular meses: {e}")
+                logger.warning("Erro ao calcular meses: %s", e)
         
         resultado = {
             "numero_termo": termo["numero_termo"],
@@ -100,13 +106,11 @@ def get_termo_info(numero_termo):
             "meses": max(1, meses)  # pelo menos 1 mês
         }
         
-        print(f"DEBUG: Retornando: {resultado}")
+        logger.debug("Retornando: %s", resultado)
         return jsonify(resultado)
         
     except Exception as e:
-        print(f"Erro no endpoint get_termo_info: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro no endpoint get_termo_info: %s", e)
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
 
 
@@ -117,22 +121,15 @@ def criar_despesa():
     Endpoint para inserir múltiplas despesas de um termo.
     Espera JSON com: numero_termo, despesas (array com rubrica, quantidade, categoria_despesa, valores_por_mes), aditivo
     """
-    print("\n" + "="*80)
-    print("🚀 [CRIAR_DESPESA] Requisição POST recebida em /api/despesa")
-    print("="*80)
-    
     try:
-        print("📥 [CRIAR_DESPESA] Tentando fazer request.get_json()...")
         data = request.get_json()
         
         if data is None:
-            print("❌ [CRIAR_DESPESA] request.get_json() retornou None!")
+            logger.warning("[CRIAR_DESPESA] request.get_json() retornou None")
             return {"error": "Nenhum dado JSON recebido"}, 400
             
-        print(f"📦 [CRIAR_DESPESA] JSON recebido com sucesso")
-        print(f"   - Termo: {data.get('numero_termo')}")
-        print(f"   - Aditivo: {data.get('aditivo')}")
-        print(f"   - Total de despesas: {len(data.get('despesas', []))}")
+        logger.debug("[CRIAR_DESPESA] Termo: %s | Aditivo: %s | Total de despesas: %d",
+                     data.get('numero_termo'), data.get('aditivo'), len(data.get('despesas', [])))
         
         numero_termo = data.get('numero_termo')
         despesas = data.get('despesas', [])
@@ -193,7 +190,7 @@ def criar_despesa():
                         'aditivo': aditivo
                     })
                 except (ValueError, TypeError) as e:
-                    print(f"[ERRO] Falha ao converter valor '{valor_str}' para float: {e}")
+                    logger.warning("Falha ao converter valor '%s' para float: %s", valor_str, e)
                     continue
         
         # Verificar se total bate com previsto (permitir diferença de até R$ 0.01)
@@ -211,13 +208,12 @@ def criar_despesa():
         try:
             # Obter ID do usuário logado
             usuario_id = session.get('usuario_id', 1)
-            print(f"[DEBUG] Usuario ID para auditoria: {usuario_id}")
+            logger.debug("Usuario ID para auditoria: %s", usuario_id)
             
             # Deletar despesas antigas do aditivo em ambos os bancos COM AUDITORIA
-            print(f"[DEBUG] Deletando despesas antigas: termo={numero_termo}, aditivo={aditivo}")
-            delete_query = "DELETE FROM Parcerias_Despesas WHERE numero_termo = %s AND COALESCE(aditivo, 0) = %s"
-            delete_result = execute_dual_with_audit(delete_query, (numero_termo, aditivo), usuario_id)
-            print(f"[DEBUG] Resultado DELETE: {delete_result}")
+            logger.debug("Deletando despesas antigas: termo=%s, aditivo=%s", numero_termo, aditivo)
+            delete_result = execute_dual_with_audit(EXCLUIR_DESPESAS_ADITIVO, (numero_termo, aditivo), usuario_id)
+            logger.debug("Resultado DELETE: %s", delete_result)
             
             # Inserir novas despesas em ambos os bancos
             insert_query = """
@@ -226,14 +222,16 @@ def criar_despesa():
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
             
-            print(f"[DEBUG] Inserindo {len(registros_para_inserir)} registros...")
+            logger.debug("Inserindo %d registros...", len(registros_para_inserir))
             insert_count_local = 0
             insert_count_railway = 0
             insert_errors = []
             
+            depurar = logger.isEnabledFor(logging.DEBUG)
             for idx, registro in enumerate(registros_para_inserir):
                 try:
-                    print(f"[DEBUG] Registro {idx+1}: {registro}")
+                    if depurar:
+                        logger.debug("Registro %d: %s", idx + 1, registro)
                     result = execute_dual_with_audit(insert_query, (
                         registro['numero_termo'],
                         registro['rubrica'], 
@@ -253,7 +251,7 @@ def criar_despesa():
                         insert_errors.append(f"Registro {idx+1}: {result['errors']}")
                         
                 except Exception as insert_error:
-                    print(f"[ERRO] Falha ao inserir registro {idx+1}: {insert_error}")
+                    logger.error("Falha ao inserir registro %d: %s", idx + 1, insert_error)
                     insert_errors.append(f"Registro {idx+1}: {str(insert_error)}")
             
             # Construir mensagem de status
@@ -271,8 +269,8 @@ def criar_despesa():
             else:
                 status_msg = f"⚠️ Salvo apenas no banco {bancos_salvos[0]} ({len(bancos_salvos)}/2 bancos)"
             
-            print(f"[INFO] {status_msg}")
-            print(f"[INFO] LOCAL: {insert_count_local}/{total_registros} | RAILWAY: {insert_count_railway}/{total_registros}")
+            logger.info("%s | LOCAL: %d/%d | RAILWAY: %d/%d", status_msg,
+                        insert_count_local, total_registros, insert_count_railway, total_registros)
             
             return {
                 "message": status_msg,
@@ -287,27 +285,130 @@ def criar_despesa():
                 "errors": insert_errors if insert_errors else None
             }, 201
         except Exception as e:
-            print(f"[ERRO] Erro ao inserir despesas: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Erro ao inserir despesas: %s", e)
             return {"error": f"Erro ao inserir despesas: {str(e)}"}, 500
         
     except Exception as e:
-        print(f"\n❌❌❌ [CRIAR_DESPESA] EXCEÇÃO GLOBAL CAPTURADA:")
-        print(f"Tipo: {type(e).__name__}")
-        print(f"Mensagem: {str(e)}")
-        import traceback
-        print("Traceback completo:")
-        traceback.print_exc()
+        logger.exception("[CRIAR_DESPESA] Exceção global capturada (%s): %s", type(e).__name__, e)
         return jsonify({"error": f"Erro inesperado: {str(e)}", "type": type(e).__name__}), 500
 
 
+# Formato colunar da matriz de despesas, pedido com Accept: TIPO_MATRIZ_COLUNAR ou ?formato=colunar:
+#   {"meses": [1, 2, ...], "campos": ["rubrica", "categoria_despesa", "quantidade"],
+#    "linhas": [[rubrica, categoria, quantidade], ...],
+#    "valores": [linha 0 mês 1, linha 0 mês 2, ..., linha 1 mês 1, ...]}   (null = mês sem valor)
+TIPO_MATRIZ_COLUNAR = 'application/vnd.faf.matriz+json'
+
+# Células das matrizes de um termo (todos os aditivos): uma linha da matriz por
+# rubrica/categoria/quantidade (quantidade vazia conta como 1), na ordem da primeira
+# despesa gravada da linha
+_CELULAS_TERMO = """
+        SELECT pd.id, COALESCE(pd.aditivo, 0) AS aditivo, pd.rubrica, pd.mes, pd.valor,
+               COALESCE(NULLIF(pd.quantidade, 0), 1) AS quantidade,
+               COALESCE(c.nome, pd.categoria_despesa) AS categoria_despesa
+        FROM Parcerias_Despesas pd
+        LEFT JOIN categorias_despesa c ON c.id = pd.categoria_id
+        WHERE pd.numero_termo = %s AND pd.mes IS NOT NULL
+"""
+
+# Células de um único aditivo
+_CELULAS_MATRIZ = _CELULAS_TERMO + "          AND COALESCE(pd.aditivo, 0) = %s\n"
+
+# Meses e valores já agrupados por linha (em mês repetido vale a despesa gravada por último)
+CONSULTA_MATRIZ_ORDENADA = f"""
+    SELECT rubrica, categoria_despesa, quantidade,
+           array_agg(mes ORDER BY mes, id) AS meses,
+           array_agg(valor::float8 ORDER BY mes, id) AS valores
+    FROM ({_CELULAS_MATRIZ}) d
+    GROUP BY rubrica, categoria_despesa, quantidade
+    ORDER BY MIN(id)
+"""
+
+# As matrizes de todos os aditivos do termo numa consulta, em ordem de aditivo
+CONSULTA_MATRIZES_TERMO = f"""
+    SELECT aditivo, rubrica, categoria_despesa, quantidade,
+           array_agg(mes ORDER BY mes, id) AS meses,
+           array_agg(valor::float8 ORDER BY mes, id) AS valores
+    FROM ({_CELULAS_TERMO}) d
+    GROUP BY aditivo, rubrica, categoria_despesa, quantidade
+    ORDER BY aditivo, MIN(id)
+"""
+
+# Resposta {"despesas": [...]} do formato padrão montada inteira no banco: o pivô dos meses
+# (jsonb_object_agg) e a lista de linhas chegam prontos, como texto JSON
+CONSULTA_MATRIZ_JSON = f"""
+    SELECT json_build_object('despesas', COALESCE(json_agg(linha ORDER BY primeira), '[]'))::text AS corpo
+    FROM (
+        SELECT MIN(id) AS primeira,
+               json_build_object(
+                   'rubrica', rubrica,
+                   'quantidade', quantidade,
+                   'categoria_despesa', categoria_despesa,
+                   'valores_por_mes', jsonb_object_agg(mes, valor::float8 ORDER BY id)
+               ) AS linha
+        FROM ({_CELULAS_MATRIZ}) d
+        GROUP BY rubrica, categoria_despesa, quantidade
+    ) linhas
+"""
+
+
+def _montar_matriz_colunar(grupos):
+    """
+    Formato colunar a partir das linhas agrupadas (rubrica, categoria_despesa, quantidade,
+    meses, valores) de uma matriz
+    """
+    valores_linhas = [dict(zip(row['meses'], row['valores'])) for row in grupos]
+    meses = sorted({mes for valores in valores_linhas for mes in valores})
+    return {
+        'meses': meses,
+        'campos': ['rubrica', 'categoria_despesa', 'quantidade'],
+        'linhas': [[row['rubrica'], row['categoria_despesa'], row['quantidade']] for row in grupos],
+        'valores': [valores.get(mes) for valores in valores_linhas for mes in meses],
+    }
+
+
+def matriz_colunar(cur, numero_termo, aditivo):
+    """
+    Matriz de despesas de um termo/aditivo no formato colunar (uma única consulta ordenada)
+    """
+    cur.execute(CONSULTA_MATRIZ_ORDENADA, (numero_termo, aditivo))
+    return _montar_matriz_colunar(cur.fetchall())
+
+
+def matrizes_do_termo(cur, numero_termo):
+    """
+    Matrizes colunares de todos os aditivos de um termo, com o total de cada uma,
+    numa única consulta: [{'aditivo': N, 'total': ..., 'meses': ..., ...}, ...]
+    """
+    cur.execute(CONSULTA_MATRIZES_TERMO, (numero_termo,))
+    
+    matrizes = []
+    for aditivo, grupos in groupby(cur.fetchall(), key=lambda row: row['aditivo']):
+        matriz = _montar_matriz_colunar(list(grupos))
+        total = sum(valor for valor in matriz['valores'] if valor is not None)
+        matrizes.append({'aditivo': aditivo, 'total': round(total, 2), **matriz})
+    return matrizes
+
+
+def _pede_formato_colunar():
+    """
+    True se o cliente pediu o formato colunar (?formato=colunar ou Accept com TIPO_MATRIZ_COLUNAR
+    citado explicitamente e com qualidade não menor que a de application/json)
+    """
+    if request.args.get('formato') == 'colunar':
+        return True
+    aceitos = request.accept_mimetypes
+    citado = any(tipo == TIPO_MATRIZ_COLUNAR for tipo, _ in aceitos)
+    return citado and aceitos.quality(TIPO_MATRIZ_COLUNAR) >= aceitos.quality('application/json')
+
+
 @despesas_bp.route('/despesas/<path:numero_termo>', methods=['GET'])
 @login_required
 def get_despesas_termo(numero_termo):
     """
     Retorna todas as despesas de um termo específico agrupadas por rubrica/categoria
     Aceita parâmetro opcional ?aditivo=N para filtrar por aditivo específico
+    Com Accept: application/vnd.faf.matriz+json (ou ?formato=colunar) responde no formato colunar
     """
     try:
         # Obter aditivo da query string (padrão: 0 = Base)
@@ -317,36 +418,49 @@ def get_despesas_termo(numero_termo):
         except ValueError:
             aditivo_int = 0
         
-        cur = get_cursor()
-        cur.execute("""
-            SELECT rubrica, quantidade, categoria_despesa, mes, valor, aditivo
-            FROM Parcerias_Despesas 
-            WHERE numero_termo = %s AND COALESCE(aditivo, 0) = %s
-            ORDER BY id
-        """, (numero_termo, aditivo_int))
-        despesas_raw = cur.fetchall()
-        cur.close()
+        if _pede_formato_colunar():
+            cur = get_cursor_leitura()
+            matriz = matriz_colunar(cur, numero_termo, aditivo_int)
+            cur.close()
+            
+            resposta = jsonify(matriz)
+            resposta.content_type = TIPO_MATRIZ_COLUNAR
+            resposta.vary.add('Accept')
+            return resposta
         
-        if not despesas_raw:
-            return {"despesas": []}, 200
+        # Agrupamento por rubrica/categoria/quantidade e pivô dos meses feitos no PostgreSQL
+        cur = get_cursor_leitura()
+        cur.execute(CONSULTA_MATRIZ_JSON, (numero_termo, aditivo_int))
+        corpo = cur.fetchone()['corpo']
+        cur.close()
         
-        # Agrupar por rubrica + categoria para formar as linhas da tabela
-        despesas_agrupadas = {}
-        for row in despesas_raw:
-            key = f"{row['rubrica']}|{row['categoria_despesa']}|{row['quantidade'] or 1}"
-            if key not in despesas_agrupadas:
-                despesas_agrupadas[key] = {
-                    'rubrica': row['rubrica'],
-                    'quantidade': row['quantidade'] or 1,
-                    'categoria_despesa': row['categoria_despesa'],
-                    'valores_por_mes': {}
-                }
-            despesas_agrupadas[key]['valores_por_mes'][str(row['mes'])] = float(row['valor'])
+        # Anuncia o formato colunar alternativo
+        resposta = Response(corpo, mimetype='application/json')
+        resposta.vary.add('Accept')
+        resposta.headers['Link'] = (
+            f'<{request.base_url}?aditivo={aditivo_int}&formato=colunar>; '
+            f'rel="alternate"; type="{TIPO_MATRIZ_COLUNAR}"'
+        )
+        return resposta
         
-        # Converter para lista
-        despesas = list(despesas_agrupadas.values())
+    except Exception as e:
+        return {"error": f"Erro ao carregar despesas: {str(e)}"}, 500
+
+
+@despesas_bp.route('/despesas-aditivos/<path:numero_termo>', methods=['GET'])
+@login_required
+def get_despesas_aditivos(numero_termo):
+    """
+    Retorna as matrizes de despesas de todos os aditivos de um termo (formato colunar),
+    com o total de cada aditivo, para o editor trocar de aditivo e comparar aditivos
+    sem novas requisições
+    """
+    try:
+        cur = get_cursor_leitura()
+        aditivos = matrizes_do_termo(cur, numero_termo)
+        cur.close()
         
-        return {"despesas": despesas}, 200
+        return jsonify({"numero_termo": numero_termo, "aditivos": aditivos})
         
     except Exception as e:
         return {"error": f"Erro ao carregar despesas: {str(e)}"}, 500
@@ -373,9 +487,8 @@ def confirmar_despesa():
         usuario_id = session.get('usuario_id', 1)
 
         # Antes de inserir, deletar registros existentes do mesmo aditivo para substituir COM AUDITORIA
-        delete_query = "DELETE FROM Parcerias_Despesas WHERE numero_termo = %s AND COALESCE(aditivo, 0) = %s"
-        delete_result = execute_dual_with_audit(delete_query, (numero_termo, aditivo), usuario_id)
-        print(f"[DEBUG] Resultado DELETE em confirmar_despesa: {delete_result}")
+        delete_result = execute_dual_with_audit(EXCLUIR_DESPESAS_ADITIVO, (numero_termo, aditivo), usuario_id)
+        logger.debug("Resultado DELETE em confirmar_despesa: %s", delete_result)
 
         # Inserir despesas em ambos os bancos
         insert_query = """
@@ -440,14 +553,8 @@ def get_categorias():
     Retorna lista de categorias de despesa únicas do banco de dados
     """
     try:
-        cur = get_cursor()
-        cur.execute("""
-            SELECT DISTINCT categoria_despesa
-            FROM Parcerias_Despesas
-            WHERE categoria_despesa IS NOT NULL AND categoria_despesa != ''
-            ORDER BY categoria_despesa
-        """)
-        categorias = [row['categoria_despesa'] for row in cur.fetchall()]
+        cur = get_cursor_leitura()
+        categorias = listar_categorias(cur)
         cur.close()
         return {"categorias": categorias}, 200
     except Exception as e:
@@ -461,22 +568,10 @@ def get_rubrica_sugerida(categoria):
     Retorna a rubrica mais comum para uma categoria de despesa específica
     """
     try:
-        cur = get_cursor()
+        cur = get_cursor_leitura()
         # Buscar a rubrica mais frequente para esta categoria
-        cur.execute("""
-            SELECT rubrica, COUNT(*) as freq
-            FROM Parcerias_Despesas
-            WHERE categoria_despesa = %s AND rubrica IS NOT NULL AND rubrica != ''
-            GROUP BY rubrica
-            ORDER BY freq DESC
-            LIMIT 1
-        """, (categoria,))
-        resultado = cur.fetchone()
+        rubrica = rubrica_sugerida(cur, categoria)
         cur.close()
-        
-        if resultado:
-            return {"rubrica": resultado['rubrica']}, 200
-        else:
-            return {"rubrica": None}, 200
+        return {"rubrica": rubrica}, 200
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}, 500
@@ -0,0 +1,45 @@
+"""
+Blueprint de importação em lote de planilhas de despesas
+"""
+
+from flask import Blueprint, request, jsonify, session
+from jobs import enfileirar
+from utils import login_required
+import importacao  # registra o job 'importar_despesas'
+
+importacao_bp = Blueprint('importacao', __name__, url_prefix='/importacao')
+
+EXTENSOES_ACEITAS = ('.csv', '.txt', '.xlsx', '.xlsm')
+
+
+@importacao_bp.route("/api/despesas", methods=["POST"])
+@login_required
+def importar_despesas():
+    """
+    Recebe várias planilhas (campo multipart 'arquivos') e agenda a importação como job.
+    Retorna 202 com o id do job; o progresso é consultado em /jobs/<id>.
+    """
+    arquivos = request.files.getlist('arquivos')
+    if not arquivos:
+        return jsonify({"error": "Nenhum arquivo enviado (campo 'arquivos')"}), 400
+
+    recebidos = []
+    for arquivo in arquivos:
+        nome = arquivo.filename or 'sem_nome.csv'
+        if not nome.lower().endswith(EXTENSOES_ACEITAS):
+            return jsonify({"error": f"Formato não suportado: {nome}"}), 400
+        recebidos.append((nome, arquivo.read()))
+
+    nomes = [nome for nome, _ in recebidos]
+    job_id = enfileirar(
+        'importar_despesas',
+        parametros={'nomes_arquivos': nomes, 'usuario_auditoria': session.get('usuario_id', 1)},
+        usuario_id=session.get('user_id'),
+        anexos={'arquivos': recebidos}
+    )
+
+    return jsonify({
+        "job_id": job_id,
+        "arquivos": nomes,
+        "status_url": f"/jobs/{job_id}"
+    }), 202
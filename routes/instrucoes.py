@@ -2,6 +2,8 @@
 Blueprint de instruções (CRUD de instruções)
 """
 
+import logging
+
 from flask import Blueprint, render_template, request, jsonify
 import psycopg2
 from db import get_db, get_cursor
@@ -9,6 +11,8 @@ from utils import login_required
 
 instrucoes_bp = Blueprint('instrucoes', __name__, url_prefix='/instrucoes')
 
+logger = logging.getLogger(__name__)
+
 
 @instrucoes_bp.route("/", methods=["GET"])
 @login_required
@@ -62,15 +66,13 @@ def criar():
     """
     try:
         dados = request.get_json()
-        print("Dados recebidos:", dados)  # Debug
+        logger.debug("Dados recebidos: %s", dados)
         
         titulo = dados.get('titulo')
         categoria = dados.get('categoria')
         texto = dados.get('texto')
         
-        print(f"Titulo: {titulo}")  # Debug
-        print(f"Categoria: {categoria}")  # Debug
-        print(f"Texto: {texto}")  # Debug
+        logger.debug("Titulo: %s | Categoria: %s | Texto: %s", titulo, categoria, texto)
         
         if not titulo or not texto:
             return {"error": "Título e texto são obrigatórios"}, 400
@@ -84,15 +86,15 @@ def criar():
             )
             db.commit()
         except psycopg2.Error as e:
-            print(f"Erro SQL: {e}")  # Debug
+            logger.error("Erro SQL: %s", e)
             cur.close()
             raise
         
         cur.close()
         return {"message": "Instrução salva com sucesso"}, 201
     except psycopg2.Error as e:
-        print(f"Erro PostgreSQL: {e}")  # Debug
+        logger.error("Erro PostgreSQL: %s", e)
         return {"error": f"Erro ao salvar no banco de dados: {str(e)}"}, 500
     except Exception as e:
-        print(f"Erro inesperado: {e}")  # Debug
+        logger.exception("Erro inesperado: %s", e)
         return {"error": f"Erro inesperado: {str(e)}"}, 500
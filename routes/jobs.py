@@ -0,0 +1,75 @@
+"""
+Blueprint de acompanhamento dos jobs em segundo plano
+"""
+
+from flask import Blueprint, jsonify, session, Response
+from db import get_db, get_cursor
+from jobs import garantir_tabela_jobs, expirar_jobs_orfaos, obter_job, obter_arquivo_job, listar_jobs, serializar_job
+from utils import login_required
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+def _pode_ver(job):
+    """
+    Agentes públicos veem todos os jobs; demais usuários apenas os próprios.
+    """
+    return session.get("tipo_usuario") == "Agente Público" or job['usuario_id'] == session.get("user_id")
+
+
+@jobs_bp.route("/", methods=["GET"])
+@login_required
+def listar():
+    """
+    Lista os jobs mais recentes do usuário logado
+    """
+    garantir_tabela_jobs(get_db())
+    cur = get_cursor()
+    jobs = listar_jobs(cur, usuario_id=session.get("user_id"))
+    cur.close()
+    return jsonify({"jobs": [serializar_job(job) for job in jobs]}), 200
+
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+@login_required
+def detalhar(job_id):
+    """
+    Retorna status e progresso de um job (usado para polling pelo front-end)
+    """
+    garantir_tabela_jobs(get_db())
+    cur = get_cursor()
+    # Job de um processo encerrado não terminaria nunca: o polling recebe o erro
+    if expirar_jobs_orfaos(cur, job_id):
+        get_db().commit()
+    job = obter_job(cur, job_id)
+    cur.close()
+
+    if not job or not _pode_ver(job):
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(serializar_job(job)), 200
+
+
+@jobs_bp.route("/<job_id>/arquivo", methods=["GET"])
+@login_required
+def baixar_arquivo(job_id):
+    """
+    Download do arquivo gerado por um job concluído (ex.: exportação CSV)
+    """
+    garantir_tabela_jobs(get_db())
+    cur = get_cursor()
+    job = obter_job(cur, job_id)
+    if not job or not _pode_ver(job):
+        cur.close()
+        return jsonify({"error": "Job não encontrado"}), 404
+
+    arquivo = obter_arquivo_job(cur, job_id)
+    cur.close()
+    if arquivo is None:
+        return jsonify({"error": "Job ainda não gerou arquivo"}), 404
+
+    nome, tipo, conteudo = arquivo
+    return Response(
+        conteudo,
+        mimetype=tipo,
+        headers={'Content-Disposition': f'attachment; filename={nome}'}
+    )
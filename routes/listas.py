@@ -2,12 +2,16 @@
 Blueprint de gerenciamento de listas/tabelas categóricas
 """
 
+import logging
+
 from flask import Blueprint, render_template, request, jsonify
 from db import get_cursor, execute_dual
 from utils import login_required
 
 listas_bp = Blueprint('listas', __name__, url_prefix='/listas')
 
+logger = logging.getLogger(__name__)
+
 
 # Configuração das tabelas gerenciáveis
 TABELAS_CONFIG = {
@@ -49,13 +53,10 @@ def index():
     Página principal de gerenciamento de listas
     """
     try:
-        print("[DEBUG] Acessando rota /listas")
-        print(f"[DEBUG] Tabelas config: {list(TABELAS_CONFIG.keys())}")
+        logger.debug("Tabelas config: %s", list(TABELAS_CONFIG))
         return render_template('listas.html', tabelas=TABELAS_CONFIG)
     except Exception as e:
-        print(f"[ERRO] Erro ao renderizar listas.html: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro ao renderizar listas.html: %s", e)
         return f"Erro: {str(e)}", 500
 
 
@@ -5,6 +5,8 @@ Blueprint principal (tela inicial, dashboard)
 from flask import Blueprint, render_template, session, request, redirect, url_for, flash, jsonify
 from db import get_cursor, get_db
 from utils import login_required
+import formulario_parceria
+from portarias import atribuir_portarias, recarregar, resolver_lote, resolver_portaria
 
 main_bp = Blueprint('main', __name__)
 
@@ -37,6 +39,8 @@ def gerenciar_portarias():
             lei = request.form.get('lei')
             inicio = request.form.get('inicio') or None
             termino = request.form.get('termino') or None
+            regra_termo = _lista_regra(request.form.get('regra_termo'))
+            regra_coordenacao = _lista_regra(request.form.get('regra_coordenacao'))
             
             # Verificar se já existe
             cur.execute("SELECT lei FROM c_legislacao WHERE lei = %s", (lei,))
@@ -46,19 +50,22 @@ def gerenciar_portarias():
                 # Atualizar
                 cur.execute("""
                     UPDATE c_legislacao 
-                    SET inicio = %s, termino = %s
+                    SET inicio = %s, termino = %s, regra_termo = %s, regra_coordenacao = %s
                     WHERE lei = %s
-                """, (inicio, termino, lei))
+                """, (inicio, termino, regra_termo, regra_coordenacao, lei))
                 flash(f"Legislação '{lei}' atualizada com sucesso!", "success")
             else:
                 # Inserir
                 cur.execute("""
-                    INSERT INTO c_legislacao (lei, inicio, termino)
-                    VALUES (%s, %s, %s)
-                """, (lei, inicio, termino))
+                    INSERT INTO c_legislacao (lei, inicio, termino, regra_termo, regra_coordenacao)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (lei, inicio, termino, regra_termo, regra_coordenacao))
                 flash(f"Legislação '{lei}' criada com sucesso!", "success")
             
             conn.commit()
+            # O motor de portarias passa a usar a regra nova neste worker
+            recarregar(conn)
+            formulario_parceria.invalidar()
             return redirect(url_for('main.gerenciar_portarias'))
             
         except Exception as e:
@@ -67,7 +74,7 @@ def gerenciar_portarias():
     
     # GET - Buscar todas as legislações
     cur.execute("""
-        SELECT lei, inicio, termino
+        SELECT lei, inicio, termino, regra_termo, regra_coordenacao
         FROM c_legislacao 
         ORDER BY inicio DESC NULLS LAST, lei
     """)
@@ -77,11 +84,19 @@ def gerenciar_portarias():
     return render_template("portarias_analise.html", legislacoes=legislacoes)
 
 
+def _lista_regra(texto):
+    """
+    "tfm, TCL" -> ['TFM', 'TCL']
+    """
+    return [item.strip().upper() for item in (texto or '').split(',') if item.strip()]
+
+
 @main_bp.route("/api/portaria-automatica", methods=["POST"])
 @login_required
 def portaria_automatica():
     """
     API para determinar automaticamente a portaria baseada na data de início e tipo de termo
+    (regras de c_legislacao, ver portarias.py)
     """
     try:
         data = request.get_json()
@@ -91,106 +106,10 @@ def portaria_automatica():
         if not data_inicio:
             return jsonify({"portaria": None, "transicao": False})
         
-        # Extrair informações do termo
-        numero_termo_upper = numero_termo.upper()
-        tem_tfm_tcl = 'TFM' in numero_termo_upper or 'TCL' in numero_termo_upper
-        tem_fumcad = 'FUMCAD' in numero_termo_upper
-        tem_fmid = 'FMID' in numero_termo_upper
-        tem_tcv = 'TCV' in numero_termo_upper
-        
-        # Regras hardcoded baseadas na tabela fornecida
-        regras = [
-            {
-                'lei': 'Decreto nº 6.170',
-                'inicio': '2007-07-25',
-                'termino': '2008-08-11',
-                'regra_termo': ['TCV'],
-                'regra_coordenacao': []
-            },
-            {
-                'lei': 'Portaria nº 006/2008/SF-SEMPLA',
-                'inicio': '2008-08-12',
-                'termino': '2012-03-21',
-                'regra_termo': ['TCV'],
-                'regra_coordenacao': []
-            },
-            {
-                'lei': 'Portaria nº 072/SMPP/2012',
-                'inicio': '2012-03-22',
-                'termino': '2014-05-21',
-                'regra_termo': ['TCV'],
-                'regra_coordenacao': ['FUMCAD']
-            },
-            {
-                'lei': 'Portaria nº 009/SMDHC/2014',
-                'inicio': '2014-05-22',
-                'termino': '2017-09-30',
-                'regra_termo': ['TCV'],
-                'regra_coordenacao': ['FUMCAD']
-            },
-            {
-                'lei': 'Portaria nº 121/SMDHC/2019',
-                'inicio': '2017-10-01',
-                'termino': '2023-02-28',
-                'regra_termo': ['TFM', 'TCL'],
-                'regra_coordenacao': []
-            },
-            {
-                'lei': 'Portaria nº 140/SMDHC/2019',
-                'inicio': '2017-10-01',
-                'termino': '2023-12-31',
-                'regra_termo': ['TFM', 'TCL'],
-                'regra_coordenacao': ['FUMCAD', 'FMID']
-            },
-            {
-                'lei': 'Portaria nº 021/SMDHC/2023',
-                'inicio': '2023-03-01',
-                'termino': '2030-12-31',
-                'regra_termo': ['TFM', 'TCL'],
-                'regra_coordenacao': []
-            },
-            {
-                'lei': 'Portaria nº 090/SMDHC/2023',
-                'inicio': '2024-01-01',
-                'termino': '2030-12-31',
-                'regra_termo': ['TFM', 'TCL'],
-                'regra_coordenacao': ['FUMCAD', 'FMID']
-            }
-        ]
-        
-        portaria_selecionada = None
-        
-        for regra in regras:
-            # Verificar se a data de início está no período da legislação
-            if data_inicio < regra['inicio'] or data_inicio > regra['termino']:
-                continue
-            
-            # Verificar regra de termo
-            if tem_tfm_tcl and not any(t in regra['regra_termo'] for t in ['TFM', 'TCL']):
-                continue
-            if tem_tcv and 'TCV' not in regra['regra_termo']:
-                continue
-            
-            # Verificar regra de coordenação
-            if tem_fumcad or tem_fmid:
-                if tem_fumcad and 'FUMCAD' not in regra['regra_coordenacao']:
-                    continue
-                if tem_fmid and 'FMID' not in regra['regra_coordenacao']:
-                    continue
-            else:
-                # Se não tem FUMCAD nem FMID, preferir legislação sem essas coordenações
-                if regra['regra_coordenacao']:
-                    # Verificar se há outra opção sem coordenação
-                    outras_opcoes = [
-                        r for r in regras 
-                        if data_inicio >= r['inicio'] and data_inicio <= r['termino']
-                        and not r['regra_coordenacao']
-                    ]
-                    if outras_opcoes:
-                        continue
-            
-            portaria_selecionada = regra['lei']
-            break
+        try:
+            portaria_selecionada = resolver_portaria(get_db(), data_inicio, numero_termo)
+        except ValueError:
+            return jsonify({"error": f"Data de início inválida: {data_inicio}"}), 400
         
         return jsonify({
             "portaria": portaria_selecionada,
@@ -199,3 +118,35 @@ def portaria_automatica():
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@main_bp.route("/api/portaria-automatica/lote", methods=["POST"])
+@login_required
+def portaria_automatica_lote():
+    """
+    Portarias de vários termos numa chamada.
+    Corpo: {"termos": [{"numero_termo": ..., "data_inicio": ...}, ...]}
+    Sem "termos", calcula para todos os termos de Parcerias e devolve também a portaria gravada.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        termos = data.get('termos')
+        
+        if termos is None:
+            atribuicoes = atribuir_portarias(get_db())
+            for item in atribuicoes:
+                for campo in ('inicio', 'final'):
+                    item[campo] = item[campo].isoformat() if item[campo] else None
+            return jsonify({
+                "total": len(atribuicoes),
+                "divergentes": sum(1 for item in atribuicoes if item['portaria'] != item['portaria_atual']),
+                "termos": atribuicoes
+            })
+        
+        portarias = resolver_lote(get_db(), [
+            (termo.get('numero_termo', ''), termo.get('data_inicio')) for termo in termos
+        ])
+        return jsonify({"portarias": portarias})
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
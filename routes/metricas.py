@@ -0,0 +1,35 @@
+"""
+Blueprint do endpoint de métricas (Prometheus)
+"""
+
+import hmac
+
+from flask import Blueprint, Response, request, session
+from config import METRICAS_TOKEN
+from metricas import gerar_metricas
+
+metricas_bp = Blueprint('metricas', __name__)
+
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1')
+
+
+def _autorizado():
+    """
+    Com METRICAS_TOKEN definido, exige Authorization: Bearer <token>.
+    Sem token, só usuários logados ou requisições da própria máquina (localhost).
+    """
+    if METRICAS_TOKEN:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICAS_TOKEN}')
+    return 'user_id' in session or request.remote_addr in ENDERECOS_LOCAIS
+
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Métricas de todos os workers no formato de exposição do Prometheus.
+    Expõe endpoints, volume, latência e falhas de escrita dual: acesso restrito (ver _autorizado).
+    """
+    if not _autorizado():
+        return Response('Não autorizado', status=401)
+    conteudo, content_type = gerar_metricas()
+    return Response(conteudo, mimetype=None, content_type=content_type)
@@ -3,41 +3,46 @@ Blueprint de orçamento (listagem e edição)
 """
 
 from flask import Blueprint, render_template, request, Response, jsonify, session
-from db import get_cursor, execute_dual, execute_dual_with_audit
-from utils import login_required
+from psycopg2.extras import RealDictCursor
+from db import get_cursor, get_cursor_leitura, execute_dual, execute_dual_with_audit, conectar
+from jobs import registrar_job, enfileirar
+from metricas import registrar_exportacao
+import categorias as categorias_despesa  # registra o job 'renomear_categoria'
+from utils import login_required, parametros_janela
 import csv
 from io import StringIO
 from datetime import datetime
 
+# Linhas do CSV por bloco enviado nas exportações em streaming
+LINHAS_POR_BLOCO_CSV = 500
+
 orcamento_bp = Blueprint('orcamento', __name__, url_prefix='/orcamento')
 
 
-@orcamento_bp.route("/", methods=["GET"])
-@login_required
-def listar():
+# Aditivos com despesas de um termo (seletor do editor)
+CONSULTA_ADITIVOS_TERMO = """
+    SELECT DISTINCT COALESCE(aditivo, 0) as aditivo
+    FROM Parcerias_Despesas
+    WHERE numero_termo = %s
+    ORDER BY aditivo
+"""
+
+# Situação do preenchimento: total preenchido x total previsto (tolerância de R$ 0,01)
+CONDICOES_STATUS = {
+    'correto': "total_preenchido > 0 AND ABS(total_preenchido - COALESCE(total_previsto, 0)) < 0.01",
+    'nao_feito': "total_preenchido = 0",
+    'incorreto': "total_preenchido > 0 AND ABS(total_preenchido - COALESCE(total_previsto, 0)) >= 0.01",
+}
+
+# Colunas aceitas na ordenação da listagem virtual (?ordem=)
+COLUNAS_ORDENACAO = ('numero_termo', 'tipo_termo', 'sei_celeb', 'total_previsto', 'total_preenchido', 'meses')
+
+
+def _consulta_listagem(filtro_termo):
     """
-    Listagem de parcerias/termos com estatísticas de preenchimento
+    Query (e parâmetros) das parcerias com total preenchido, com o filtro de termo aplicado
     """
-    # Obter parâmetro de paginação (padrão: 100)
-    limite = request.args.get('limite', '100')
-    if limite == 'todas':
-        limite_sql = None
-    else:
-        try:
-            limite_sql = int(limite)
-        except ValueError:
-            limite_sql = 100
-    
-    # Obter filtro de termo
-    filtro_termo = request.args.get('filtro_termo', '').strip()
-    
-    # Obter filtro de status (correto, nao_feito, incorreto)
-    filtro_status = request.args.get('status', '').strip()
-    
-    cur = get_cursor()
-    
-    # Base da query com filtros
-    query_base = """
+    query = """
         SELECT 
             p.numero_termo,
             p.tipo_termo,
@@ -54,86 +59,95 @@ def listar():
     
     # Adicionar filtro de termo se fornecido
     if filtro_termo:
-        query_base += " AND p.numero_termo ILIKE %s"
+        query += " AND p.numero_termo ILIKE %s"
         params.append(f"%{filtro_termo}%")
     
-    query_base += """
+    query += """
         GROUP BY p.numero_termo, p.tipo_termo, p.meses, p.sei_celeb, p.total_previsto
     """
+    return query, params
+
+
+def _estatisticas_listagem(cur, filtro_termo):
+    """
+    Quantidade e percentual de termos feitos corretamente, não feitos e feitos incorretamente
+    (sobre TODAS as parcerias do filtro de termo, sem limite nem filtro de status)
+    """
+    query, params = _consulta_listagem(filtro_termo)
+    cur.execute(f"""
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE total_preenchido = 0) AS nao_feito,
+            COUNT(*) FILTER (WHERE total_preenchido <> 0
+                             AND ABS(total_preenchido - COALESCE(total_previsto, 0)) < 0.01) AS feito_corretamente,
+            COUNT(*) FILTER (WHERE total_preenchido <> 0
+                             AND ABS(total_preenchido - COALESCE(total_previsto, 0)) >= 0.01) AS feito_incorretamente
+        FROM ({query}) t
+    """, params)
+    contagem = cur.fetchone()
+    total_parcerias = contagem['total']
     
-    # PRIMEIRO: Calcular estatísticas sobre TODAS as parcerias (sem LIMIT)
-    query_estatisticas = query_base  # Query sem LIMIT para estatísticas corretas
-    cur.execute(query_estatisticas, params)
-    todas_parcerias = cur.fetchall()
-    
-    total_parcerias = len(todas_parcerias)
-    nao_feito = 0
-    feito_corretamente = 0
-    feito_incorretamente = 0
-    
-    for parceria in todas_parcerias:
-        total_previsto = float(parceria["total_previsto"] or 0)
-        total_preenchido = float(parceria["total_preenchido"] or 0)
-        
-        if total_preenchido == 0:
-            nao_feito += 1
-        elif abs(total_preenchido - total_previsto) < 0.01:  # tolerância para igualdade
-            feito_corretamente += 1
-        else:
-            feito_incorretamente += 1
-    
-    # Calcular percentuais baseados no total REAL
-    estatisticas = {
-        'feito_corretamente': {
-            'quantidade': feito_corretamente,
-            'percentual': (feito_corretamente / total_parcerias * 100) if total_parcerias > 0 else 0
-        },
-        'nao_feito': {
-            'quantidade': nao_feito,
-            'percentual': (nao_feito / total_parcerias * 100) if total_parcerias > 0 else 0
-        },
-        'feito_incorretamente': {
-            'quantidade': feito_incorretamente,
-            'percentual': (feito_incorretamente / total_parcerias * 100) if total_parcerias > 0 else 0
+    return {
+        chave: {
+            'quantidade': contagem[chave],
+            'percentual': (contagem[chave] / total_parcerias * 100) if total_parcerias > 0 else 0
         }
+        for chave in ('feito_corretamente', 'nao_feito', 'feito_incorretamente')
     }
+
+
+def _consulta_exibicao(filtro_termo, filtro_status):
+    """
+    Query (e parâmetros) das linhas exibidas: filtros de termo e de status, sem ordenação
+    """
+    query, params = _consulta_listagem(filtro_termo)
+    query = f"SELECT * FROM ({query}) t"
+    if filtro_status in CONDICOES_STATUS:
+        query += f" WHERE {CONDICOES_STATUS[filtro_status]}"
+    return query, params
+
+
+def _ordenacao(ordem='numero_termo', decrescente=False):
+    if ordem not in COLUNAS_ORDENACAO:
+        ordem = 'numero_termo'
+    return f" ORDER BY {ordem} {'DESC' if decrescente else 'ASC'} NULLS LAST, numero_termo"
+
+
+@orcamento_bp.route("/", methods=["GET"])
+@login_required
+def listar():
+    """
+    Listagem de parcerias/termos com estatísticas de preenchimento
     
-    # SEGUNDO: Query para exibição com filtro de status (se aplicável)
-    # Aplicar filtro de status nas parcerias já calculadas em memória
-    if filtro_status:
-        parcerias_filtradas = []
-        for parceria in todas_parcerias:
-            total_previsto = float(parceria["total_previsto"] or 0)
-            total_preenchido = float(parceria["total_preenchido"] or 0)
-            
-            incluir = False
-            if filtro_status == 'correto':
-                # Feito corretamente: totais iguais (tolerância 0.01)
-                incluir = total_preenchido > 0 and abs(total_preenchido - total_previsto) < 0.01
-            elif filtro_status == 'nao_feito':
-                # Não feito: total preenchido = 0
-                incluir = total_preenchido == 0
-            elif filtro_status == 'incorreto':
-                # Feito incorretamente: total preenchido > 0 mas diferente do previsto
-                incluir = total_preenchido > 0 and abs(total_preenchido - total_previsto) >= 0.01
-            
-            if incluir:
-                parcerias_filtradas.append(parceria)
-        
-        # Aplicar limite nas parcerias filtradas
-        if limite_sql is not None:
-            parcerias = parcerias_filtradas[:limite_sql]
-        else:
-            parcerias = parcerias_filtradas
+    Com limite=todas a tabela é virtual: a página vem sem linhas e o navegador
+    busca em /orcamento/api/listagem só as janelas visíveis na rolagem.
+    """
+    # Obter parâmetro de paginação (padrão: 100)
+    limite = request.args.get('limite', '100')
+    if limite == 'todas':
+        limite_sql = None
     else:
-        # Sem filtro de status: usar query com limite normal
-        query_exibicao = query_base + " ORDER BY p.numero_termo"
-        
-        # Adicionar LIMIT apenas para exibição se não for "todas"
-        if limite_sql is not None:
-            query_exibicao += f" LIMIT {limite_sql}"
-        
-        cur.execute(query_exibicao, params)
+        try:
+            limite_sql = int(limite)
+        except ValueError:
+            limite_sql = 100
+    
+    # Obter filtro de termo
+    filtro_termo = request.args.get('filtro_termo', '').strip()
+    
+    # Obter filtro de status (correto, nao_feito, incorreto)
+    filtro_status = request.args.get('status', '').strip()
+    
+    cur = get_cursor_leitura()
+    
+    # Estatísticas sobre TODAS as parcerias (sem LIMIT nem filtro de status)
+    estatisticas = _estatisticas_listagem(cur, filtro_termo)
+    
+    if limite_sql is None:
+        parcerias = []
+    else:
+        query_exibicao, params = _consulta_exibicao(filtro_termo, filtro_status)
+        cur.execute(query_exibicao + _ordenacao() + " LIMIT %s", params + [limite_sql])
         parcerias = cur.fetchall()
     
     cur.close()
@@ -142,17 +156,54 @@ def listar():
                          parcerias=parcerias, 
                          estatisticas=estatisticas,
                          limite=limite,
+                         tabela_virtual=limite_sql is None,
                          filtro_termo=filtro_termo,
                          filtro_status=filtro_status)
 
 
+@orcamento_bp.route("/api/listagem", methods=["GET"])
+@login_required
+def api_listagem():
+    """
+    Janela de linhas da listagem (tabela virtual de limite=todas)
+    
+    Parâmetros: filtro_termo, status, ordem, direcao (asc/desc), inicio, quantidade.
+    Resposta: {"total": n, "inicio": i, "linhas": [[numero_termo, tipo_termo, sei_celeb,
+    total_previsto, total_preenchido, meses], ...]}
+    """
+    filtro_termo = request.args.get('filtro_termo', '').strip()
+    filtro_status = request.args.get('status', '').strip()
+    inicio, quantidade = parametros_janela(request.args)
+    query, params = _consulta_exibicao(filtro_termo, filtro_status)
+    ordenacao = _ordenacao(request.args.get('ordem', 'numero_termo'), request.args.get('direcao') == 'desc')
+    
+    cur = get_cursor_leitura()
+    cur.execute(f"SELECT COUNT(*) AS total FROM ({query}) c", params)
+    total = cur.fetchone()['total']
+    cur.execute(query + ordenacao + " LIMIT %s OFFSET %s", params + [quantidade, inicio])
+    linhas = [
+        [
+            row['numero_termo'],
+            row['tipo_termo'],
+            row['sei_celeb'],
+            float(row['total_previsto'] or 0),
+            float(row['total_preenchido'] or 0),
+            row['meses'],
+        ]
+        for row in cur.fetchall()
+    ]
+    cur.close()
+    
+    return jsonify({'total': total, 'inicio': inicio, 'linhas': linhas})
+
+
 @orcamento_bp.route('/editar/<path:numero_termo>')
 @login_required
 def editar(numero_termo):
     """
     Editor de orçamento para um termo específico
     """
-    cur = get_cursor()
+    cur = get_cursor_leitura()
     
     # Buscar total_previsto e sei_celeb para exibir no subtítulo
     cur.execute("SELECT total_previsto, sei_celeb FROM Parcerias WHERE numero_termo = %s", (numero_termo,))
@@ -170,12 +221,7 @@ def editar(numero_termo):
     formatted_total = 'R$ ' + f"{total_previsto_val:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
     
     # Buscar aditivos disponíveis para este termo
-    cur.execute("""
-        SELECT DISTINCT COALESCE(aditivo, 0) as aditivo
-        FROM Parcerias_Despesas
-        WHERE numero_termo = %s
-        ORDER BY aditivo
-    """, (numero_termo,))
+    cur.execute(CONSULTA_ADITIVOS_TERMO, (numero_termo,))
     aditivos_rows = cur.fetchall()
     aditivos = [row['aditivo'] for row in aditivos_rows] if aditivos_rows else [0]
     
@@ -205,51 +251,14 @@ def dicionario_despesas():
     por_pagina = 200
     offset = (pagina - 1) * por_pagina
     
-    cur = get_cursor()
+    cur = get_cursor_leitura()
     
     # PRIMEIRO: Contar total de categorias para calcular número de páginas
-    cur.execute("""
-        SELECT COUNT(DISTINCT categoria_despesa) as total
-        FROM Parcerias_Despesas
-        WHERE categoria_despesa IS NOT NULL AND categoria_despesa != ''
-    """)
-    total_categorias = cur.fetchone()['total']
+    total_categorias = categorias_despesa.contar_categorias_em_uso(cur)
     total_paginas = (total_categorias + por_pagina - 1) // por_pagina  # Ceil division
     
     # SEGUNDO: Buscar categorias da página atual com LIMIT e OFFSET
-    cur.execute("""
-        WITH categoria_stats AS (
-            SELECT 
-                categoria_despesa,
-                COUNT(*) as total_ocorrencias,
-                COUNT(DISTINCT numero_termo) as total_termos
-            FROM Parcerias_Despesas
-            WHERE categoria_despesa IS NOT NULL AND categoria_despesa != ''
-            GROUP BY categoria_despesa
-        ),
-        rubrica_mais_comum AS (
-            SELECT DISTINCT ON (categoria_despesa)
-                categoria_despesa,
-                rubrica,
-                COUNT(*) as freq_rubrica
-            FROM Parcerias_Despesas
-            WHERE categoria_despesa IS NOT NULL AND categoria_despesa != ''
-                AND rubrica IS NOT NULL AND rubrica != ''
-            GROUP BY categoria_despesa, rubrica
-            ORDER BY categoria_despesa, freq_rubrica DESC
-        )
-        SELECT 
-            cs.categoria_despesa,
-            cs.total_ocorrencias,
-            cs.total_termos,
-            COALESCE(rmc.rubrica, '') as rubrica_comum
-        FROM categoria_stats cs
-        LEFT JOIN rubrica_mais_comum rmc ON cs.categoria_despesa = rmc.categoria_despesa
-        ORDER BY cs.categoria_despesa
-        LIMIT %s OFFSET %s
-    """, (por_pagina, offset))
-    
-    categorias = cur.fetchall()
+    categorias = categorias_despesa.estatisticas_categorias(cur, limite=por_pagina, offset=offset)
     cur.close()
     
     return render_template('orcamento_3_dict.html', 
@@ -263,11 +272,10 @@ def dicionario_despesas():
 @login_required
 def atualizar_categoria():
     """
-    Atualiza em massa uma categoria de despesa no banco de dados
+    Agenda a atualização em massa de uma categoria de despesa.
+    A renomeação roda em lotes (ver categorias.py) como job em segundo plano.
+    Retorna 202 com o id do job; progresso e resultado são consultados em /jobs/<id>.
     """
-    from flask import request, jsonify
-    from db import execute_dual
-    
     try:
         data = request.get_json()
         categoria_antiga = data.get('categoria_antiga')
@@ -279,38 +287,18 @@ def atualizar_categoria():
         if not categoria_nova or categoria_nova.strip() == '':
             return jsonify({"error": "Categoria nova não pode estar vazia"}), 400
         
-        # Obter ID do usuário para auditoria
-        usuario_id = session.get('usuario_id', 1)
-        
-        # Atualizar todas as ocorrências da categoria antiga para a nova em ambos os bancos COM AUDITORIA
-        query = """
-            UPDATE Parcerias_Despesas
-            SET categoria_despesa = %s
-            WHERE categoria_despesa = %s
-        """
+        job_id = enfileirar('renomear_categoria', parametros={
+            'categoria_antiga': categoria_antiga,
+            'categoria_nova': categoria_nova.strip(),
+            'usuario_auditoria': session.get('usuario_id', 1)  # ID do usuário para auditoria
+        }, usuario_id=session.get('user_id'))
         
-        result = execute_dual_with_audit(query, (categoria_nova.strip(), categoria_antiga), usuario_id)
-        
-        if result['success']:
-            bancos = []
-            if result['local']:
-                bancos.append("LOCAL")
-            if result['railway']:
-                bancos.append("RAILWAY")
-            
-            message = f"Categoria atualizada em: {', '.join(bancos)}" if len(bancos) < 2 else "Categoria atualizada em ambos os bancos"
-            
-            return jsonify({
-                "message": message,
-                "categoria_antiga": categoria_antiga,
-                "categoria_nova": categoria_nova.strip(),
-                "databases": {"local": result['local'], "railway": result['railway']}
-            }), 200
-        else:
-            return jsonify({
-                "error": "Falha ao atualizar categoria em ambos os bancos",
-                "errors": result.get('errors', {})
-            }), 500
+        return jsonify({
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}",
+            "categoria_antiga": categoria_antiga,
+            "categoria_nova": categoria_nova.strip()
+        }), 202
         
     except Exception as e:
         return jsonify({"error": f"Erro: {str(e)}"}), 500
@@ -325,55 +313,14 @@ def buscar_categorias():
     Retorna categorias filtradas com estatísticas
     """
     from flask import request, jsonify
-    from db import get_db
     import psycopg2.extras
     
     try:
         termo_busca = request.args.get('q', '').strip()
         
-        db = get_db()
-        cur = db.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        # Query base com estatísticas
-        query = """
-            WITH categorias_stats AS (
-                SELECT 
-                    categoria_despesa,
-                    COUNT(*) as total_ocorrencias,
-                    COUNT(DISTINCT numero_termo) as total_termos
-                FROM Parcerias_Despesas
-                WHERE categoria_despesa IS NOT NULL
-                GROUP BY categoria_despesa
-            ),
-            rubrica_comum AS (
-                SELECT DISTINCT ON (pd.categoria_despesa)
-                    pd.categoria_despesa,
-                    pd.rubrica,
-                    COUNT(*) OVER (PARTITION BY pd.categoria_despesa, pd.rubrica) as freq
-                FROM Parcerias_Despesas pd
-                WHERE pd.categoria_despesa IS NOT NULL AND pd.rubrica IS NOT NULL
-                ORDER BY pd.categoria_despesa, freq DESC, pd.rubrica
-            )
-            SELECT 
-                cs.categoria_despesa,
-                cs.total_ocorrencias,
-                cs.total_termos,
-                rc.rubrica as rubrica_comum
-            FROM categorias_stats cs
-            LEFT JOIN rubrica_comum rc ON cs.categoria_despesa = rc.categoria_despesa
-        """
-        
-        params = []
+        cur = get_cursor_leitura(psycopg2.extras.DictCursor)
         
-        # Adicionar filtro de busca se fornecido
-        if termo_busca:
-            query += " WHERE LOWER(cs.categoria_despesa) LIKE LOWER(%s)"
-            params.append(f'%{termo_busca}%')
-        
-        query += " ORDER BY cs.categoria_despesa LIMIT 200"
-        
-        cur.execute(query, params)
-        categorias = cur.fetchall()
+        categorias = categorias_despesa.estatisticas_categorias(cur, termo_busca=termo_busca, limite=200)
         cur.close()
         
         # Converter para lista de dicionários
@@ -383,7 +330,7 @@ def buscar_categorias():
                 'categoria_despesa': cat['categoria_despesa'],
                 'total_ocorrencias': cat['total_ocorrencias'],
                 'total_termos': cat['total_termos'],
-                'rubrica_comum': cat['rubrica_comum']
+                'rubrica_comum': cat['rubrica_comum'] or None
             })
         
         return jsonify({
@@ -408,21 +355,10 @@ def termos_por_categoria(categoria):
     from flask import jsonify
     
     try:
-        cur = get_cursor()
+        cur = get_cursor_leitura()
         
         # Buscar termos distintos que usam essa categoria
-        cur.execute("""
-            SELECT DISTINCT 
-                numero_termo,
-                COUNT(*) as total_despesas,
-                SUM(valor) as valor_total
-            FROM Parcerias_Despesas
-            WHERE categoria_despesa = %s
-            GROUP BY numero_termo
-            ORDER BY numero_termo
-        """, (categoria,))
-        
-        termos = cur.fetchall()
+        termos = categorias_despesa.termos_da_categoria(cur, categoria)
         cur.close()
         
         # Converter para lista de dicionários
@@ -444,6 +380,97 @@ def termos_por_categoria(categoria):
         return jsonify({"error": f"Erro ao buscar termos: {str(e)}"}), 500
 
 
+def buscar_orcamento_csv(cur):
+    """
+    Executa a consulta da exportação CSV e devolve as linhas
+    """
+    # Query para buscar TODAS as parcerias (sem limite)
+    query = """
+        SELECT 
+            p.numero_termo,
+            p.tipo_termo,
+            p.sei_celeb,
+            p.total_previsto,
+            COALESCE(SUM(pd.valor), 0) as total_preenchido,
+            p.meses
+        FROM Parcerias p
+        LEFT JOIN Parcerias_Despesas pd ON p.numero_termo = pd.numero_termo
+        WHERE p.tipo_termo NOT IN ('Convênio de Cooperação', 'Convênio', 'Convênio - Passivo', 'Acordo de Cooperação')
+        GROUP BY p.numero_termo, p.tipo_termo, p.sei_celeb, p.total_previsto, p.meses
+        ORDER BY p.numero_termo
+    """
+    
+    cur.execute(query)
+    return cur.fetchall()
+
+
+def iterar_csv_orcamento(parcerias):
+    """
+    Gera o CSV em blocos de texto, para a resposta ser enviada (e comprimida) enquanto é escrita
+    """
+    # O CSV é escrito em memória e entregue a cada LINHAS_POR_BLOCO_CSV linhas
+    output = StringIO()
+    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+    
+    # Cabeçalho do CSV
+    writer.writerow([
+        'Número do Termo',
+        'Tipo de Contrato',
+        'SEI Celebração',
+        'Total Previsto',
+        'Total Preenchido',
+        'Meses'
+    ])
+    
+    # Escrever dados
+    for i, parceria in enumerate(parcerias, 1):
+        total_previsto = float(parceria['total_previsto'] or 0)
+        total_preenchido = float(parceria['total_preenchido'] or 0)
+        
+        writer.writerow([
+            parceria['numero_termo'],
+            parceria['tipo_termo'] or '-',
+            parceria['sei_celeb'] or '-',
+            f"R$ {total_previsto:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
+            f"R$ {total_preenchido:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
+            parceria['meses'] if parceria['meses'] is not None else '-'
+        ])
+        
+        if i % LINHAS_POR_BLOCO_CSV == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    
+    yield output.getvalue()
+
+
+def gerar_csv_orcamento(cur):
+    """
+    Gera o conteúdo CSV completo (usado pelo job de exportação)
+    """
+    return ''.join(iterar_csv_orcamento(buscar_orcamento_csv(cur)))
+
+
+@registrar_job('exportar_csv_orcamento')
+def job_exportar_csv(contexto):
+    """
+    Job que gera o CSV de orçamento fora da requisição e o anexa ao job para download
+    """
+    conn = conectar('railway')
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        conteudo = gerar_csv_orcamento(cur)
+        cur.close()
+    finally:
+        conn.close()
+    
+    filename = f"orcamento_parcerias_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    dados = conteudo.encode('utf-8')
+    registrar_exportacao('csv_orcamento', len(dados))
+    contexto.anexar_arquivo(filename, 'text/csv; charset=utf-8', dados)
+    return {'arquivo': filename}
+
+
 @orcamento_bp.route("/exportar-csv", methods=["GET"])
 @login_required
 def exportar_csv():
@@ -451,63 +478,24 @@ def exportar_csv():
     Exporta TODAS as parcerias para CSV com suas informações de orçamento
     """
     try:
-        cur = get_cursor()
-        
-        # Query para buscar TODAS as parcerias (sem limite)
-        query = """
-            SELECT 
-                p.numero_termo,
-                p.tipo_termo,
-                p.sei_celeb,
-                p.total_previsto,
-                COALESCE(SUM(pd.valor), 0) as total_preenchido,
-                p.meses
-            FROM Parcerias p
-            LEFT JOIN Parcerias_Despesas pd ON p.numero_termo = pd.numero_termo
-            WHERE p.tipo_termo NOT IN ('Convênio de Cooperação', 'Convênio', 'Convênio - Passivo', 'Acordo de Cooperação')
-            GROUP BY p.numero_termo, p.tipo_termo, p.sei_celeb, p.total_previsto, p.meses
-            ORDER BY p.numero_termo
-        """
-        
-        cur.execute(query)
-        parcerias = cur.fetchall()
+        cur = get_cursor_leitura()
+        parcerias = buscar_orcamento_csv(cur)
         cur.close()
         
-        # Criar arquivo CSV em memória
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-        
-        # Cabeçalho do CSV
-        writer.writerow([
-            'Número do Termo',
-            'Tipo de Contrato',
-            'SEI Celebração',
-            'Total Previsto',
-            'Total Preenchido',
-            'Meses'
-        ])
-        
-        # Escrever dados
-        for parceria in parcerias:
-            total_previsto = float(parceria['total_previsto'] or 0)
-            total_preenchido = float(parceria['total_preenchido'] or 0)
-            
-            writer.writerow([
-                parceria['numero_termo'],
-                parceria['tipo_termo'] or '-',
-                parceria['sei_celeb'] or '-',
-                f"R$ {total_previsto:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                f"R$ {total_preenchido:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                parceria['meses'] if parceria['meses'] is not None else '-'
-            ])
+        def conteudo():
+            tamanho = 0
+            for bloco in iterar_csv_orcamento(parcerias):
+                dados = bloco.encode('utf-8')
+                tamanho += len(dados)
+                yield dados
+            registrar_exportacao('csv_orcamento', tamanho)
         
         # Preparar resposta
-        output.seek(0)
         data_atual = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'orcamento_parcerias_{data_atual}.csv'
         
         return Response(
-            output.getvalue(),
+            conteudo(),
             mimetype='text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename={filename}',
@@ -517,5 +505,16 @@ def exportar_csv():
         
     except Exception as e:
         return f"Erro ao exportar CSV: {str(e)}", 500
+
+
+@orcamento_bp.route("/exportar-csv", methods=["POST"])
+@login_required
+def exportar_csv_job():
+    """
+    Agenda a exportação CSV como job em segundo plano (202 + id do job)
+    """
+    try:
+        job_id = enfileirar('exportar_csv_orcamento', usuario_id=session.get('user_id'))
+        return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
     except Exception as e:
-        return jsonify({"error": f"Erro: {str(e)}"}), 500
+        return jsonify({"error": f"Erro ao agendar exportação: {str(e)}"}), 500
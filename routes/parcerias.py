@@ -2,9 +2,14 @@
 Blueprint de parcerias (listagem e formulário)
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response
-from db import get_cursor, get_db, execute_dual
-from utils import login_required
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, session
+from psycopg2.extras import RealDictCursor
+from db import get_cursor, get_cursor_leitura, get_db, execute_dual, conectar
+import formulario_parceria
+import oscs
+from jobs import registrar_job, enfileirar
+from metricas import registrar_exportacao
+from utils import login_required, parametros_janela
 import csv
 from io import StringIO, BytesIO
 from datetime import datetime
@@ -16,39 +21,30 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+# Linhas do CSV por bloco enviado nas exportações em streaming
+LINHAS_POR_BLOCO_CSV = 500
+
 parcerias_bp = Blueprint('parcerias', __name__, url_prefix='/parcerias')
 
 
-@parcerias_bp.route("/", methods=["GET"])
-@login_required
-def listar():
+def _filtros_listagem():
     """
-    Listagem de todas as parcerias/termos com filtros e busca
+    Filtros e buscas da listagem, lidos da query string
+    """
+    return {
+        'filtro_termo': request.args.get('filtro_termo', '').strip(),
+        'filtro_osc': request.args.get('filtro_osc', '').strip(),
+        'filtro_projeto': request.args.get('filtro_projeto', '').strip(),
+        'filtro_tipo_termo': request.args.get('filtro_tipo_termo', '').strip(),
+        'busca_sei_celeb': request.args.get('busca_sei_celeb', '').strip(),
+        'busca_sei_pc': request.args.get('busca_sei_pc', '').strip(),
+    }
+
+
+def _consulta_listagem(filtros):
+    """
+    Query (e parâmetros) da listagem com os filtros aplicados, sem ordenação
     """
-    # Obter parâmetros de filtro e busca
-    filtro_termo = request.args.get('filtro_termo', '').strip()
-    filtro_osc = request.args.get('filtro_osc', '').strip()
-    filtro_projeto = request.args.get('filtro_projeto', '').strip()
-    filtro_tipo_termo = request.args.get('filtro_tipo_termo', '').strip()
-    busca_sei_celeb = request.args.get('busca_sei_celeb', '').strip()
-    busca_sei_pc = request.args.get('busca_sei_pc', '').strip()
-    
-    # Obter parâmetro de paginação (padrão: 100)
-    limite = request.args.get('limite', '100')
-    if limite == 'todas':
-        limite_sql = None
-    else:
-        try:
-            limite_sql = int(limite)
-        except ValueError:
-            limite_sql = 100
-    
-    cur = get_cursor()
-    
-    # Buscar tipos de contrato para o dropdown de filtro
-    cur.execute("SELECT informacao FROM c_tipo_contrato ORDER BY informacao")
-    tipos_contrato = [row['informacao'] for row in cur.fetchall()]
-    
     # Construir query dinamicamente com filtros
     query = """
         SELECT 
@@ -70,50 +66,115 @@ def listar():
     params = []
     
     # Adicionar filtros se fornecidos
-    if filtro_termo:
+    if filtros['filtro_termo']:
         query += " AND numero_termo ILIKE %s"
-        params.append(f"%{filtro_termo}%")
+        params.append(f"%{filtros['filtro_termo']}%")
     
-    if filtro_osc:
+    if filtros['filtro_osc']:
         query += " AND osc ILIKE %s"
-        params.append(f"%{filtro_osc}%")
+        params.append(f"%{filtros['filtro_osc']}%")
     
-    if filtro_projeto:
+    if filtros['filtro_projeto']:
         query += " AND projeto ILIKE %s"
-        params.append(f"%{filtro_projeto}%")
+        params.append(f"%{filtros['filtro_projeto']}%")
     
-    if filtro_tipo_termo:
+    if filtros['filtro_tipo_termo']:
         query += " AND tipo_termo ILIKE %s"
-        params.append(f"%{filtro_tipo_termo}%")
+        params.append(f"%{filtros['filtro_tipo_termo']}%")
     
-    if busca_sei_celeb:
+    if filtros['busca_sei_celeb']:
         query += " AND sei_celeb ILIKE %s"
-        params.append(f"%{busca_sei_celeb}%")
+        params.append(f"%{filtros['busca_sei_celeb']}%")
     
-    if busca_sei_pc:
+    if filtros['busca_sei_pc']:
         query += " AND sei_pc ILIKE %s"
-        params.append(f"%{busca_sei_pc}%")
+        params.append(f"%{filtros['busca_sei_pc']}%")
     
-    query += " ORDER BY numero_termo"
+    return query, params
+
+
+@parcerias_bp.route("/", methods=["GET"])
+@login_required
+def listar():
+    """
+    Listagem de todas as parcerias/termos com filtros e busca
     
-    # Adicionar LIMIT se não for "todas"
-    if limite_sql is not None:
-        query += f" LIMIT {limite_sql}"
+    Com limite=todas a tabela é virtual: a página vem sem linhas e o navegador
+    busca em /parcerias/api/listagem só as janelas visíveis na rolagem.
+    """
+    # Obter parâmetros de filtro e busca
+    filtros = _filtros_listagem()
     
-    cur.execute(query, params)
-    parcerias = cur.fetchall()
+    # Obter parâmetro de paginação (padrão: 100)
+    limite = request.args.get('limite', '100')
+    if limite == 'todas':
+        limite_sql = None
+    else:
+        try:
+            limite_sql = int(limite)
+        except ValueError:
+            limite_sql = 100
+    
+    cur = get_cursor_leitura()
+    
+    # Buscar tipos de contrato para o dropdown de filtro
+    cur.execute("SELECT informacao FROM c_tipo_contrato ORDER BY informacao")
+    tipos_contrato = [row['informacao'] for row in cur.fetchall()]
+    
+    if limite_sql is None:
+        parcerias = []
+    else:
+        query, params = _consulta_listagem(filtros)
+        cur.execute(query + " ORDER BY numero_termo LIMIT %s", params + [limite_sql])
+        parcerias = cur.fetchall()
     cur.close()
     
     return render_template("parcerias.html", 
                          parcerias=parcerias,
                          tipos_contrato=tipos_contrato,
-                         filtro_termo=filtro_termo,
-                         filtro_osc=filtro_osc,
-                         filtro_projeto=filtro_projeto,
-                         filtro_tipo_termo=filtro_tipo_termo,
-                         busca_sei_celeb=busca_sei_celeb,
-                         busca_sei_pc=busca_sei_pc,
-                         limite=limite)
+                         tabela_virtual=limite_sql is None,
+                         limite=limite,
+                         **filtros)
+
+
+@parcerias_bp.route("/api/listagem", methods=["GET"])
+@login_required
+def api_listagem():
+    """
+    Janela de linhas da listagem (tabela virtual de limite=todas)
+    
+    Parâmetros: os filtros da listagem, inicio e quantidade.
+    Resposta: {"total": n, "inicio": i, "linhas": [[numero_termo, osc, projeto, tipo_termo,
+    inicio, final, meses, total_previsto, total_pago, sei_celeb, sei_pc], ...]}, datas em dd/mm/aaaa
+    """
+    from flask import jsonify
+
+    query, params = _consulta_listagem(_filtros_listagem())
+    inicio, quantidade = parametros_janela(request.args)
+    
+    cur = get_cursor_leitura()
+    cur.execute(f"SELECT COUNT(*) AS total FROM ({query}) c", params)
+    total = cur.fetchone()['total']
+    cur.execute(query + " ORDER BY numero_termo LIMIT %s OFFSET %s", params + [quantidade, inicio])
+    linhas = [
+        [
+            row['numero_termo'],
+            row['osc'],
+            row['projeto'],
+            row['tipo_termo'],
+            row['inicio'].strftime('%d/%m/%Y') if row['inicio'] else None,
+            row['final'].strftime('%d/%m/%Y') if row['final'] else None,
+            row['meses'],
+            float(row['total_previsto'] or 0),
+            float(row['total_pago'] or 0),
+            row['sei_celeb'],
+            row['sei_pc'],
+        ]
+        for row in cur.fetchall()
+    ]
+    cur.close()
+    
+    return jsonify({'total': total, 'inicio': inicio, 'linhas': linhas})
 
 
 @parcerias_bp.route("/nova", methods=["GET", "POST"])
@@ -157,7 +218,10 @@ def nova():
                 1 if request.form.get('contrapartida') == 'on' else 0
             )
             
-            if execute_dual(query, params):
+            resultado = execute_dual(query, params)
+            # OSC nova ou CNPJ alterado: o índice do autocomplete precisa ser remontado
+            oscs.invalidar()
+            if resultado:
                 flash("Parceria criada com sucesso!", "success")
                 return redirect(url_for('parcerias.nova'))
             else:
@@ -167,18 +231,14 @@ def nova():
             flash(f"Erro ao criar parceria: {str(e)}", "danger")
     
     # GET - retornar formulário vazio
-    # Buscar dados dos dropdowns
-    cur = get_cursor()
-    cur.execute("SELECT informacao FROM c_tipo_contrato ORDER BY informacao")
-    tipos_contrato = [row['informacao'] for row in cur.fetchall()]
-    cur.execute("SELECT lei FROM c_legislacao ORDER BY lei")
-    legislacoes = [row['lei'] for row in cur.fetchall()]
-    cur.close()
+    # Dados dos dropdowns e do autocomplete (ver formulario_parceria.py)
+    dados = formulario_parceria.obter(get_cursor_leitura)
     
     return render_template("parcerias_form.html", 
                          parceria=None,
-                         tipos_contrato=tipos_contrato,
-                         legislacoes=legislacoes)
+                         tipos_contrato=dados.tipos_contrato,
+                         legislacoes=dados.legislacoes,
+                         formulario_versao=dados.versao)
 
 
 @parcerias_bp.route("/editar/<path:numero_termo>", methods=["GET", "POST"])
@@ -235,7 +295,9 @@ def editar(numero_termo):
                 numero_termo
             )
             
-            if execute_dual(query, params):
+            resultado = execute_dual(query, params)
+            oscs.invalidar()
+            if resultado:
                 flash("Parceria atualizada com sucesso!", "success")
                 return redirect(url_for('parcerias.listar'))
             else:
@@ -272,49 +334,76 @@ def editar(numero_termo):
     """, (numero_termo,))
     
     parceria = cur.fetchone()
-    
-    # Buscar dados dos dropdowns
-    cur.execute("SELECT informacao FROM c_tipo_contrato ORDER BY informacao")
-    tipos_contrato = [row['informacao'] for row in cur.fetchall()]
-    cur.execute("SELECT lei FROM c_legislacao ORDER BY lei")
-    legislacoes = [row['lei'] for row in cur.fetchall()]
     cur.close()
     
     if not parceria:
         flash("Parceria não encontrada!", "danger")
         return redirect(url_for('parcerias.listar'))
     
+    # Dados dos dropdowns e do autocomplete (ver formulario_parceria.py)
+    dados = formulario_parceria.obter(get_cursor_leitura)
+    
     return render_template("parcerias_form.html", 
                          parceria=parceria,
-                         tipos_contrato=tipos_contrato,
-                         legislacoes=legislacoes)
+                         tipos_contrato=dados.tipos_contrato,
+                         legislacoes=dados.legislacoes,
+                         formulario_versao=dados.versao)
+
+
+@parcerias_bp.route("/api/formulario", methods=["GET"])
+@login_required
+def api_formulario():
+    """
+    Pacote de dados do formulário (tipos_contrato, siglas e legislacoes).
+    O autocomplete de OSCs usa /parcerias/api/oscs/buscar.
+    Com ?v=<versão atual> o navegador pode guardá-lo indefinidamente; ETag/304 nos demais casos.
+    """
+    dados = formulario_parceria.obter(get_cursor_leitura)
+    
+    if request.args.get('v') == dados.versao:
+        cache_control = 'private, max-age=31536000, immutable'
+    else:
+        cache_control = 'private, no-cache'
+    cabecalhos = {'ETag': f'"{dados.versao}"', 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    
+    if dados.versao in request.if_none_match:
+        return Response(status=304, headers=cabecalhos)
+    
+    if 'gzip' in request.accept_encodings:
+        return Response(dados.corpo_gzip, mimetype='application/json',
+                        headers={**cabecalhos, 'Content-Encoding': 'gzip'})
+    return Response(dados.corpo, mimetype='application/json', headers=cabecalhos)
 
 
 @parcerias_bp.route("/api/oscs", methods=["GET"])
 @login_required
 def api_oscs():
     """
-    API para buscar lista de OSCs únicas para autocomplete
+    API com a lista completa de OSCs únicas e seus CNPJs ({osc: cnpj}).
+    O formulário usa /api/oscs/buscar, que devolve só as sugestões do texto digitado.
     """
     from flask import jsonify
     
-    cur = get_cursor()
-    cur.execute("""
-        SELECT DISTINCT osc, cnpj 
-        FROM Parcerias 
-        WHERE osc IS NOT NULL AND osc != ''
-        ORDER BY osc
-    """)
-    oscs = cur.fetchall()
-    cur.close()
+    indice = oscs.obter_indice(get_cursor_leitura)
+    return jsonify(dict(zip(indice.nomes, indice.cnpjs)))
+
+
+@parcerias_bp.route("/api/oscs/buscar", methods=["GET"])
+@login_required
+def api_buscar_oscs():
+    """
+    Autocomplete de OSCs: ?q=<texto digitado>&limite=<até 50, padrão 10>
+    Retorna {"oscs": [{"osc": ..., "cnpj": ...}]} (ver oscs.py)
+    """
+    from flask import jsonify
     
-    # Criar dicionário com OSC e CNPJ
-    result = {}
-    for row in oscs:
-        if row['osc']:
-            result[row['osc']] = row['cnpj'] or ''
+    try:
+        limite = min(max(int(request.args.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
     
-    return jsonify(result)
+    indice = oscs.obter_indice(get_cursor_leitura)
+    return jsonify({"oscs": indice.buscar(request.args.get('q', ''), limite)})
 
 
 @parcerias_bp.route("/api/sigla-tipo-termo", methods=["GET"])
@@ -325,7 +414,7 @@ def api_sigla_tipo_termo():
     """
     from flask import jsonify
     
-    cur = get_cursor()
+    cur = get_cursor_leitura()
     cur.execute("SELECT id, informacao, sigla FROM c_tipo_contrato ORDER BY sigla")
     tipos = cur.fetchall()
     cur.close()
@@ -339,6 +428,121 @@ def api_sigla_tipo_termo():
     return jsonify(mapeamento)
 
 
+def buscar_parcerias_csv(cur):
+    """
+    Executa a consulta da exportação CSV e devolve as linhas
+    """
+    # Query para buscar TODAS as parcerias
+    query = """
+        SELECT 
+            numero_termo,
+            tipo_termo,
+            osc,
+            cnpj,
+            projeto,
+            portaria,
+            inicio,
+            final,
+            meses,
+            total_previsto,
+            sei_celeb,
+            sei_pc,
+            sei_plano,
+            sei_orcamento,
+            transicao
+        FROM Parcerias
+        ORDER BY numero_termo
+    """
+    
+    cur.execute(query)
+    return cur.fetchall()
+
+
+def iterar_csv_parcerias(parcerias):
+    """
+    Gera o CSV em blocos de texto, para a resposta ser enviada (e comprimida) enquanto é escrita
+    """
+    # O CSV é escrito em memória e entregue a cada LINHAS_POR_BLOCO_CSV linhas
+    output = StringIO()
+    writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+    
+    # Cabeçalho do CSV
+    writer.writerow([
+        'Número do Termo',
+        'Tipo de Termo',
+        'OSC',
+        'CNPJ',
+        'Projeto',
+        'Portaria',
+        'Coordenação',
+        'Data Início',
+        'Data Término',
+        'Meses',
+        'Total Previsto',
+        'SEI Celebração',
+        'SEI P&C',
+        'SEI Plano',
+        'SEI Orçamento',
+        'Transição'
+    ])
+    
+    # Escrever dados
+    for i, parceria in enumerate(parcerias, 1):
+        total_previsto = float(parceria['total_previsto'] or 0)
+        
+        writer.writerow([
+            parceria['numero_termo'],
+            parceria['tipo_termo'] or '-',
+            parceria['osc'] or '-',
+            parceria['cnpj'] or '-',
+            parceria['projeto'] or '-',
+            parceria['portaria'] or '-',
+            parceria['inicio'].strftime('%d/%m/%Y') if parceria['inicio'] else '-',
+            parceria['final'].strftime('%d/%m/%Y') if parceria['final'] else '-',
+            parceria['meses'] if parceria['meses'] is not None else '-',
+            f"R$ {total_previsto:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
+            parceria['sei_celeb'] or '-',
+            parceria['sei_pc'] or '-',
+            parceria['sei_plano'] or '-',
+            parceria['sei_orcamento'] or '-',
+            'Sim' if parceria['transicao'] else 'Não'
+        ])
+        
+        if i % LINHAS_POR_BLOCO_CSV == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    
+    yield output.getvalue()
+
+
+def gerar_csv_parcerias(cur):
+    """
+    Gera o conteúdo CSV completo (usado pelo job de exportação)
+    """
+    return ''.join(iterar_csv_parcerias(buscar_parcerias_csv(cur)))
+
+
+@registrar_job('exportar_csv_parcerias')
+def job_exportar_csv(contexto):
+    """
+    Job que gera o CSV de parcerias fora da requisição e o anexa ao job para download
+    """
+    conn = conectar('railway')
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        conteudo = gerar_csv_parcerias(cur)
+        cur.close()
+    finally:
+        conn.close()
+    
+    filename = f"parcerias_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    dados = conteudo.encode('utf-8')
+    registrar_exportacao('csv_parcerias', len(dados))
+    contexto.anexar_arquivo(filename, 'text/csv; charset=utf-8', dados)
+    return {'arquivo': filename}
+
+
 @parcerias_bp.route("/exportar-csv", methods=["GET"])
 @login_required
 def exportar_csv():
@@ -346,87 +550,24 @@ def exportar_csv():
     Exporta TODAS as parcerias para CSV
     """
     try:
-        cur = get_cursor()
-        
-        # Query para buscar TODAS as parcerias
-        query = """
-            SELECT 
-                numero_termo,
-                tipo_termo,
-                osc,
-                cnpj,
-                projeto,
-                portaria,
-                inicio,
-                final,
-                meses,
-                total_previsto,
-                sei_celeb,
-                sei_pc,
-                sei_plano,
-                sei_orcamento,
-                transicao
-            FROM Parcerias
-            ORDER BY numero_termo
-        """
-        
-        cur.execute(query)
-        parcerias = cur.fetchall()
+        cur = get_cursor_leitura()
+        parcerias = buscar_parcerias_csv(cur)
         cur.close()
         
-        # Criar arquivo CSV em memória
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-        
-        # Cabeçalho do CSV
-        writer.writerow([
-            'Número do Termo',
-            'Tipo de Termo',
-            'OSC',
-            'CNPJ',
-            'Projeto',
-            'Portaria',
-            'Coordenação',
-            'Data Início',
-            'Data Término',
-            'Meses',
-            'Total Previsto',
-            'SEI Celebração',
-            'SEI P&C',
-            'SEI Plano',
-            'SEI Orçamento',
-            'Transição'
-        ])
-        
-        # Escrever dados
-        for parceria in parcerias:
-            total_previsto = float(parceria['total_previsto'] or 0)
-            
-            writer.writerow([
-                parceria['numero_termo'],
-                parceria['tipo_termo'] or '-',
-                parceria['osc'] or '-',
-                parceria['cnpj'] or '-',
-                parceria['projeto'] or '-',
-                parceria['portaria'] or '-',
-                parceria['inicio'].strftime('%d/%m/%Y') if parceria['inicio'] else '-',
-                parceria['final'].strftime('%d/%m/%Y') if parceria['final'] else '-',
-                parceria['meses'] if parceria['meses'] is not None else '-',
-                f"R$ {total_previsto:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-                parceria['sei_celeb'] or '-',
-                parceria['sei_pc'] or '-',
-                parceria['sei_plano'] or '-',
-                parceria['sei_orcamento'] or '-',
-                'Sim' if parceria['transicao'] else 'Não'
-            ])
+        def conteudo():
+            tamanho = 0
+            for bloco in iterar_csv_parcerias(parcerias):
+                dados = bloco.encode('utf-8')
+                tamanho += len(dados)
+                yield dados
+            registrar_exportacao('csv_parcerias', tamanho)
         
         # Preparar resposta
-        output.seek(0)
         data_atual = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'parcerias_{data_atual}.csv'
         
         return Response(
-            output.getvalue(),
+            conteudo(),
             mimetype='text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename={filename}',
@@ -438,6 +579,21 @@ def exportar_csv():
         return f"Erro ao exportar CSV: {str(e)}", 500
 
 
+@parcerias_bp.route("/exportar-csv", methods=["POST"])
+@login_required
+def exportar_csv_job():
+    """
+    Agenda a exportação CSV como job em segundo plano (202 + id do job)
+    """
+    from flask import jsonify
+    
+    try:
+        job_id = enfileirar('exportar_csv_parcerias', usuario_id=session.get('user_id'))
+        return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+    except Exception as e:
+        return jsonify({"error": f"Erro ao agendar exportação: {str(e)}"}), 500
+
+
 @parcerias_bp.route("/exportar-pdf", methods=["GET"])
 @login_required
 def exportar_pdf():
@@ -451,7 +607,7 @@ def exportar_pdf():
         if not numero_termo:
             return "Número do termo não informado", 400
         
-        cur = get_cursor()
+        cur = get_cursor_leitura()
         
         # Query para buscar a parceria
         query = """
@@ -579,6 +735,7 @@ def exportar_pdf():
         
         # Preparar resposta
         buffer.seek(0)
+        registrar_exportacao('pdf_parceria', buffer.getbuffer().nbytes)
         filename = f'parceria_{numero_termo.replace("/", "-")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
         
         return Response(
@@ -0,0 +1,57 @@
+"""
+Blueprint dos perfis de requisição (apenas Agente Público)
+"""
+
+from flask import Blueprint, jsonify, session, send_file
+from perfilamento import listar_perfis, obter_resumo, caminho_pstats
+from utils import login_required
+
+perfis_bp = Blueprint('perfis', __name__, url_prefix='/perfis')
+
+
+def _acesso_negado():
+    return session.get("tipo_usuario") != "Agente Público"
+
+
+@perfis_bp.route("/", methods=["GET"])
+@login_required
+def listar():
+    """
+    Lista os perfis gravados (rota, tempo total, SQL e Python)
+    """
+    if _acesso_negado():
+        return jsonify({"erro": "Acesso negado"}), 403
+    perfis = listar_perfis()
+    for perfil in perfis:
+        perfil['arquivo_url'] = f"/perfis/{perfil['id']}/arquivo"
+    return jsonify({"perfis": perfis}), 200
+
+
+@perfis_bp.route("/<perfil_id>", methods=["GET"])
+@login_required
+def detalhar(perfil_id):
+    """
+    Resumo de um perfil, com as funções de maior tempo acumulado
+    """
+    if _acesso_negado():
+        return jsonify({"erro": "Acesso negado"}), 403
+    resumo = obter_resumo(perfil_id)
+    if resumo is None:
+        return jsonify({"error": "Perfil não encontrado"}), 404
+    resumo['arquivo_url'] = f"/perfis/{perfil_id}/arquivo"
+    return jsonify(resumo), 200
+
+
+@perfis_bp.route("/<perfil_id>/arquivo", methods=["GET"])
+@login_required
+def baixar(perfil_id):
+    """
+    Download do perfil no formato pstats (.prof)
+    """
+    if _acesso_negado():
+        return jsonify({"erro": "Acesso negado"}), 403
+    caminho = caminho_pstats(perfil_id)
+    if caminho is None:
+        return jsonify({"error": "Perfil não encontrado"}), 404
+    return send_file(caminho, mimetype='application/octet-stream',
+                     as_attachment=True, download_name=f"perfil_{perfil_id}.prof")
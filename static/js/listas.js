@@ -0,0 +1,240 @@
+// Listas suspensas (tabelas categóricas) - templates/listas.html
+
+let tabelaAtual = null;
+let configAtual = null;
+let registroEditando = null;
+let modalFormulario = null;
+
+document.addEventListener('DOMContentLoaded', function() {
+  modalFormulario = new bootstrap.Modal(document.getElementById('modalFormulario'));
+});
+
+async function carregarTabela() {
+  const select = document.getElementById('seletorTabela');
+  tabelaAtual = select.value;
+
+  if (!tabelaAtual) {
+    document.getElementById('areaConteudo').style.display = 'none';
+    return;
+  }
+
+  try {
+    const response = await fetch(`/listas/api/dados/${tabelaAtual}`);
+    const data = await response.json();
+
+    if (data.erro) {
+      alert('Erro: ' + data.erro);
+      return;
+    }
+
+    configAtual = data.config;
+    const dados = data.dados;
+
+    // Atualizar título
+    document.getElementById('tituloTabela').textContent = configAtual.nome;
+
+    // Construir cabeçalho da tabela
+    const cabecalho = document.getElementById('cabecalhoTabela');
+    cabecalho.innerHTML = '';
+
+    // Adicionar colunas
+    for (const col of configAtual.colunas_editaveis) {
+      const th = document.createElement('th');
+      th.textContent = configAtual.labels[col];
+      cabecalho.appendChild(th);
+    }
+
+    // Coluna de ações
+    const thAcoes = document.createElement('th');
+    thAcoes.textContent = 'Ações';
+    thAcoes.style.width = '150px';
+    cabecalho.appendChild(thAcoes);
+
+    // Construir corpo da tabela
+    const corpo = document.getElementById('corpoTabela');
+    corpo.innerHTML = '';
+
+    for (const registro of dados) {
+      const tr = document.createElement('tr');
+
+      // Adicionar dados
+      for (const col of configAtual.colunas_editaveis) {
+        const td = document.createElement('td');
+        td.textContent = registro[col] || '-';
+        tr.appendChild(td);
+      }
+
+      // Adicionar ações
+      const tdAcoes = document.createElement('td');
+      tdAcoes.innerHTML = `
+        <button class="btn btn-sm btn-primary" onclick='editarRegistro(${JSON.stringify(registro)})'>
+          <i class="bi bi-pencil"></i>
+        </button>
+        <button class="btn btn-sm btn-danger" onclick="excluirRegistro(${registro.id})">
+          <i class="bi bi-trash"></i>
+        </button>
+      `;
+      tr.appendChild(tdAcoes);
+
+      corpo.appendChild(tr);
+    }
+
+    // Mostrar área de conteúdo
+    document.getElementById('areaConteudo').style.display = 'block';
+
+  } catch (error) {
+    console.error('Erro ao carregar tabela:', error);
+    alert('Erro ao carregar dados da tabela');
+  }
+}
+
+function abrirModalCriar() {
+  registroEditando = null;
+  document.getElementById('tituloModal').textContent = `Novo Registro - ${configAtual.nome}`;
+
+  // Construir formulário
+  const camposDiv = document.getElementById('camposFormulario');
+  camposDiv.innerHTML = '';
+
+  for (const col of configAtual.colunas_editaveis) {
+    const div = document.createElement('div');
+    div.className = 'mb-3';
+
+    const label = document.createElement('label');
+    label.className = 'form-label';
+    label.textContent = configAtual.labels[col];
+
+    let input;
+    if (col === 'descricao') {
+      input = document.createElement('textarea');
+      input.rows = 3;
+    } else {
+      input = document.createElement('input');
+      input.type = 'text';
+    }
+    input.className = 'form-control';
+    input.id = `campo_${col}`;
+    input.required = true;
+
+    div.appendChild(label);
+    div.appendChild(input);
+    camposDiv.appendChild(div);
+  }
+
+  modalFormulario.show();
+}
+
+function editarRegistro(registro) {
+  registroEditando = registro;
+  document.getElementById('tituloModal').textContent = `Editar Registro - ${configAtual.nome}`;
+
+  // Construir formulário com valores
+  const camposDiv = document.getElementById('camposFormulario');
+  camposDiv.innerHTML = '';
+
+  for (const col of configAtual.colunas_editaveis) {
+    const div = document.createElement('div');
+    div.className = 'mb-3';
+
+    const label = document.createElement('label');
+    label.className = 'form-label';
+    label.textContent = configAtual.labels[col];
+
+    let input;
+    if (col === 'descricao') {
+      input = document.createElement('textarea');
+      input.rows = 3;
+    } else {
+      input = document.createElement('input');
+      input.type = 'text';
+    }
+    input.className = 'form-control';
+    input.id = `campo_${col}`;
+    input.value = registro[col] || '';
+    input.required = true;
+
+    div.appendChild(label);
+    div.appendChild(input);
+    camposDiv.appendChild(div);
+  }
+
+  modalFormulario.show();
+}
+
+async function salvarRegistro() {
+  // Coletar dados do formulário
+  const dados = {};
+  for (const col of configAtual.colunas_editaveis) {
+    const input = document.getElementById(`campo_${col}`);
+    if (!input.value.trim()) {
+      alert(`O campo ${configAtual.labels[col]} é obrigatório`);
+      return;
+    }
+    dados[col] = input.value.trim();
+  }
+
+  try {
+    let url, method;
+
+    if (registroEditando) {
+      // Editar
+      url = `/listas/api/dados/${tabelaAtual}/${registroEditando.id}`;
+      method = 'PUT';
+    } else {
+      // Criar
+      url = `/listas/api/dados/${tabelaAtual}`;
+      method = 'POST';
+    }
+
+    const response = await fetch(url, {
+      method: method,
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify(dados)
+    });
+
+    const result = await response.json();
+
+    if (result.erro) {
+      alert('Erro: ' + result.erro);
+      return;
+    }
+
+    // Fechar modal e recarregar tabela
+    modalFormulario.hide();
+    carregarTabela();
+
+    alert(result.mensagem);
+
+  } catch (error) {
+    console.error('Erro ao salvar:', error);
+    alert('Erro ao salvar registro');
+  }
+}
+
+async function excluirRegistro(id) {
+  if (!confirm('Tem certeza que deseja excluir este registro?')) {
+    return;
+  }
+
+  try {
+    const response = await fetch(`/listas/api/dados/${tabelaAtual}/${id}`, {
+      method: 'DELETE'
+    });
+
+    const result = await response.json();
+
+    if (result.erro) {
+      alert('Erro: ' + result.erro);
+      return;
+    }
+
+    carregarTabela();
+    alert(result.mensagem);
+
+  } catch (error) {
+    console.error('Erro ao excluir:', error);
+    alert('Erro ao excluir registro');
+  }
+}
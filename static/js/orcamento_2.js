@@ -0,0 +1,835 @@
+// Editor da matriz de orçamento - templates/orcamento_2.html
+// Valores da página vêm dos atributos data-* da tag <script>
+const dadosPagina = document.currentScript.dataset;
+
+  // util: criar header de mês com botão remover
+  function makeMonthHeader(name){
+    const th = document.createElement('th');
+    th.className = 'month-th';
+    const div = document.createElement('div');
+    div.className = 'd-flex gap-1';
+    const inp = document.createElement('input'); inp.className = 'form-control form-control-sm month-name'; inp.value = name;
+    const btn = document.createElement('button'); btn.type='button'; btn.className='btn btn-sm btn-outline-danger remove-month'; btn.textContent='✕';
+    div.appendChild(inp); div.appendChild(btn); th.appendChild(div);
+    btn.onclick = function(){ removeMonthByTh(th); };
+    // adicionar resizer ao th
+    const res = document.createElement('span'); res.className = 'col-resizer'; th.appendChild(res);
+    makeResizable(th);
+    return th;
+  }
+
+  // centraliza a lógica de remoção de um mês a partir do elemento <th>
+  function removeMonthByTh(th){
+    if (!th) return;
+    const thead = document.querySelector('#tabelaOrc2 thead tr');
+    const currentMonths = thead.querySelectorAll('.month-th').length;
+    if (currentMonths <= 1){
+      // não permite remover a última coluna de mês
+      alert('Deve permanecer pelo menos 1 mês.');
+      return;
+    }
+    const ths = Array.from(thead.querySelectorAll('.month-th'));
+    const idx = ths.indexOf(th);
+    if (idx >= 0){
+      // remover a célula correspondente em cada linha
+      document.querySelectorAll('#bodyOrc2 tr').forEach(tr => {
+        const cells = tr.querySelectorAll('td');
+        const cellIdx = 3 + idx; // 0:rubrica,1:quant,2:categoria -> meses começam em 3
+        if (cells[cellIdx]) cells[cellIdx].remove();
+      });
+      // remover total correspondente
+      const foot = document.querySelectorAll('#tabelaOrc2 tfoot .col-total');
+      if (foot[idx]) foot[idx].remove();
+      th.remove();
+      recalcTotals();
+    }
+  }
+
+  // adicionar meses N de uma vez
+  document.getElementById('addMonthsBtn').addEventListener('click', function(){
+    const n = parseInt(document.getElementById('numCols').value,10) || 0; if (n<=0) return;
+    const thead = document.querySelector('#tabelaOrc2 thead tr'); const currentMonths = thead.querySelectorAll('.month-th').length;
+    // Inserir no thead: antes da coluna "Total" (penúltima)
+    const theadTotalCol = thead.children[thead.children.length - 2]; // penúltima coluna
+    for (let k=0;k<n;k++){ const idx = currentMonths + k + 1; const th = makeMonthHeader('Mês ' + idx); thead.insertBefore(th, theadTotalCol); }
+// inserir inputs em cada linha do tbody: antes da coluna Total (penúltima)
+document.querySelectorAll('#bodyOrc2 tr').forEach(tr => { 
+  const totalCol = tr.children[tr.children.length - 2]; // penúltima = Total
+  for (let k=0;k<n;k++){ 
+    const td = document.createElement('td'); 
+    td.className = 'month-td'; 
+    td.innerHTML = `<input type="text" class="form-control form-control-sm valor" placeholder="0,00">`; 
+    tr.insertBefore(td, totalCol); 
+  }
+});
+    // adicionar tfoot colunas: antes da coluna de Grand Total (penúltima)
+    const tfootRow = document.querySelector('#tabelaOrc2 tfoot tr'); 
+    const tfootTotalCol = tfootRow.children[tfootRow.children.length - 1]; // última = Grand Total
+    for (let k=0;k<n;k++){ 
+      const td = document.createElement('td'); 
+      td.className='col-total month-td'; 
+      td.textContent='0,00'; 
+      tfootRow.insertBefore(td, tfootTotalCol); 
+    }
+  });
+
+  // ligar os botões de remoção já existentes no HTML inicial
+  document.querySelectorAll('#tabelaOrc2 thead .remove-month').forEach(btn => {
+    btn.addEventListener('click', function(){
+      const th = btn.closest('.month-th');
+      removeMonthByTh(th);
+    });
+  });
+
+  // --- Redimensionamento de colunas (drag) ---
+  function makeResizable(th){
+    const resizer = th.querySelector('.col-resizer');
+    if (!resizer) return;
+    let startX, startWidth, colIndex;
+    resizer.addEventListener('mousedown', initDrag);
+
+    function initDrag(e){
+      e.preventDefault();
+      startX = e.clientX;
+      const table = document.getElementById('tabelaOrc2');
+      const ths = Array.from(table.querySelectorAll('thead tr th'));
+      colIndex = ths.indexOf(th);
+      startWidth = th.offsetWidth;
+      document.addEventListener('mousemove', doDrag);
+      document.addEventListener('mouseup', stopDrag);
+    }
+
+    function doDrag(e){
+      const diff = e.clientX - startX;
+      const newWidth = Math.max(40, startWidth + diff);
+      // aplicar largura em px ao th e à todas as células correspondentes
+      const table = document.getElementById('tabelaOrc2');
+      const ths = Array.from(table.querySelectorAll('thead tr th'));
+      if (ths[colIndex]) ths[colIndex].style.width = newWidth + 'px';
+      // aplicar nas tds
+      table.querySelectorAll('tbody tr').forEach(tr => {
+        const cells = tr.querySelectorAll('td'); if (cells[colIndex]) cells[colIndex].style.width = newWidth + 'px';
+      });
+      // aplicar ao tfoot
+      const footCells = table.querySelectorAll('tfoot tr td'); if (footCells[colIndex]) footCells[colIndex].style.width = newWidth + 'px';
+    }
+
+    function stopDrag(){
+      document.removeEventListener('mousemove', doDrag);
+      document.removeEventListener('mouseup', stopDrag);
+    }
+  }
+
+  // inicializar redimensionáveis nos headers existentes
+  document.querySelectorAll('#tabelaOrc2 thead tr th').forEach(th => makeResizable(th));
+
+  // ---------- Importar Excel (cliente) ----------
+  document.getElementById('importExcelBtn').addEventListener('click', function(){
+    const f = document.getElementById('excelFileInput').files[0];
+    if (!f){ alert('Selecione um arquivo Excel (.xlsx ou .xls)'); return; }
+    const reader = new FileReader();
+    reader.onload = function(e){
+      const data = new Uint8Array(e.target.result);
+      const wb = XLSX.read(data, {type:'array'});
+      const sheetName = wb.SheetNames[0];
+      const ws = wb.Sheets[sheetName];
+      const json = XLSX.utils.sheet_to_json(ws, {defval: ''});
+      // json é array de objetos com chaves baseadas no header
+      importFromJson(json);
+    };
+    reader.readAsArrayBuffer(f);
+  });
+
+  // gerar e baixar modelo de importação
+  document.getElementById('downloadTemplateBtn').addEventListener('click', function(){
+    const headers = ['Rubrica','Quantidade','Categoria de Despesa','Mês 1','Mês 2','Mês 3'];
+    const ws = XLSX.utils.aoa_to_sheet([headers]);
+    const wb = XLSX.utils.book_new();
+    XLSX.utils.book_append_sheet(wb, ws, 'Modelo');
+    XLSX.writeFile(wb, 'modelo_importacao_orcamento.xlsx');
+  });
+
+  // mapeia colunas do excel para rubrica, quantidade, categoria e meses (qualquer coluna restante é considerado mês)
+  function importFromJson(rows){
+    if (!rows || rows.length === 0){ alert('Planilha vazia'); return; }
+    // filtrar linhas vazias (todas as células vazias) para não contar linhas em branco
+    const filtered = rows.filter(r => Object.values(r).some(v => String(v).trim() !== ''));
+    if (filtered.length === 0){ alert('Planilha não contém linhas preenchidas'); return; }
+
+    // detect keys a partir da primeira linha não vazia
+    const keys = Object.keys(filtered[0]);
+    // heurística: procurar colunas com nomes parecidos
+    let colRubrica = keys.find(k => /rubri|descr|rubrica/i.test(k)) || keys.find(k => /descricao/i.test(k)) || keys[0];
+    let colQuantidade = keys.find(k => /quant/i.test(k)) || keys.find(k => /qtd|qty/i.test(k)) || null;
+    let colCategoria = keys.find(k => /categoria|cat/i.test(k)) || keys.find(k => /tipo/i.test(k)) || null;
+    // meses: as demais colunas que não sejam rubrica/quantidade/categoria
+    const monthCols = keys.filter(k => k !== colRubrica && k !== colQuantidade && k !== colCategoria);
+
+    // ajustar número de meses na tabela para igualar monthCols.length (adicionar/remover em bloco)
+    const currentMonths = document.querySelectorAll('#tabelaOrc2 thead .month-th').length;
+    const needMonths = monthCols.length;
+    if (needMonths > currentMonths){
+      document.getElementById('numCols').value = needMonths - currentMonths;
+      document.getElementById('addMonthsBtn').click();
+    } else if (needMonths < currentMonths){
+      const thead = document.querySelector('#tabelaOrc2 thead tr');
+      // remover do final até restarem needMonths
+      const ths = thead.querySelectorAll('.month-th');
+      for (let i = ths.length - 1; i >= needMonths; i--) {
+        removeMonthByTh(ths[i]);
+      }
+    }
+
+    // ajustar número de linhas em bloco: manter exatamente filtered.length
+    const tbody = document.getElementById('bodyOrc2');
+    let currentRows = tbody.querySelectorAll('tr').length;
+    const needRows = filtered.length;
+    if (currentRows > needRows){
+      // remover linhas extras do final
+      for (let i = currentRows - 1; i >= needRows; i--){
+        const row = tbody.children[i]; if (row) tbody.removeChild(row);
+      }
+    } else if (currentRows < needRows){
+      // adicionar linhas necessárias
+      for (let i = currentRows; i < needRows; i++){ document.getElementById('addLinha').click(); }
+    }
+
+    // preencher os dados nas linhas agora que o DOM está preparado
+    const allRows = tbody.querySelectorAll('tr');
+    allRows.forEach((tr, i) => {
+      const data = filtered[i];
+      if (!data) return;
+      // preencher rubrica
+      const r = data[colRubrica] || '';
+      const select = tr.querySelector('select[name="rubrica"]');
+      if (select){
+        const opt = Array.from(select.options).find(o => (o.text || '').toLowerCase().includes(String(r).toLowerCase()));
+        if (opt) select.value = opt.value; else select.value = '';
+      }
+      // quantidade: '-' => 0
+      if (colQuantidade){
+        let q = data[colQuantidade]; if (String(q).trim() === '-') q = 0; tr.querySelector('.quantidade').value = q;
+      }
+      // categoria
+      if (colCategoria){ tr.querySelector('.categoria').value = data[colCategoria] || ''; }
+      // meses - NORMALIZAR VALORES MONETÁRIOS
+      const valorInputs = tr.querySelectorAll('input.valor');
+      monthCols.forEach((mc, idx) => {
+        let v = data[mc];
+        if (v === undefined || v === null || String(v).trim() === '' || String(v).trim() === '-') {
+          if (valorInputs[idx]) valorInputs[idx].value = '';
+          return;
+        }
+        // Normalizar valor: aceitar 52499.56 (US) ou 52.499,56 (BR)
+        let vStr = String(v).replace(/R\$\s*/g, '').trim();
+        // Se tiver ponto E vírgula, é formato BR (1.234,56) -> remover pontos, trocar vírgula por ponto
+        if (vStr.includes('.') && vStr.includes(',')) {
+          vStr = vStr.replace(/\./g, '').replace(',', '.');
+        } 
+        // Se tiver apenas vírgula, é decimal BR (1234,56) -> trocar vírgula por ponto
+        else if (vStr.includes(',')) {
+          vStr = vStr.replace(',', '.');
+        }
+        // Converter para número e formatar no padrão BR para exibição
+        const num = parseFloat(vStr);
+        if (!isNaN(num) && num !== 0) {
+          // Formatar como BR: 52499.56 -> "52.499,56"
+          const formatted = num.toLocaleString('pt-BR', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+          if (valorInputs[idx]) valorInputs[idx].value = formatted;
+        } else {
+          if (valorInputs[idx]) valorInputs[idx].value = num === 0 ? '0' : '';
+        }
+      });
+    });
+
+    recalcTotals();
+    // Log para debug
+    console.log('[IMPORTACAO] Linhas importadas:', filtered.length);
+    console.log('[IMPORTACAO] Meses detectados:', monthCols.length);
+    console.log('[IMPORTACAO] Total calculado:', document.getElementById('grandTotal').textContent);
+    alert('Importação concluída: ' + filtered.length + ' linhas e ' + monthCols.length + ' meses detectados.');
+  }
+
+  // adicionar linha
+  document.getElementById('addLinha').addEventListener('click', function(){
+    const tbody = document.getElementById('bodyOrc2'); const tr = document.createElement('tr');
+    // número de meses atual
+    const monthCount = document.querySelectorAll('#tabelaOrc2 thead .month-th').length;
+    let cols = `
+      <td>
+        <select class="form-select form-select-sm" name="rubrica">
+          <option value="">Selecione...</option>
+          <option>Pessoal</option>
+          <option>Materiais</option>
+          <option>Administrativas</option>
+          <option>Serviços de Terceiros</option>
+          <option>Outras Despesas</option>
+          <option>Imobilizado</option>
+          <option>Implantação</option>
+        </select>
+      </td>
+      <td><input type="text" class="form-control form-control-sm quantidade" value="1"></td>
+      <td><input type="text" class="form-control form-control-sm categoria" placeholder="Ex: Gerente de Serviço I" list="categoriasDisponiveis"></td>`;
+for (let i=0;i<monthCount;i++) cols += `<td class="month-td"><input type="text" class="form-control form-control-sm valor" placeholder="0,00"></td>`;
+    cols += `<td class="col-total-linha text-end total-linha">0,00</td>`;
+    cols += `<td><button type="button" class="btn btn-danger btn-sm remover">Remover</button></td>`;
+    tr.innerHTML = cols; tbody.appendChild(tr); recalcTotals();
+  });
+
+  // remover linha
+  document.getElementById('bodyOrc2').addEventListener('click', function(e){ if (e.target && e.target.classList.contains('remover')){ e.target.closest('tr').remove(); recalcTotals(); }});
+
+  // salvar: coleta a tabela, normaliza valores e envia para o backend
+  document.getElementById('salvarOrc2').addEventListener('click', function(){
+    const numeroTermo = dadosPagina.numeroTermo;
+    const monthNames = Array.from(document.querySelectorAll('.month-name')).map(n => n.value || 'Mês');
+    const rows = document.querySelectorAll('#bodyOrc2 tr');
+    const despesas = [];
+
+    console.log('[SALVAR] Iniciando coleta de dados...');
+
+    rows.forEach((tr) => {
+      const selectRub = tr.querySelector('select[name="rubrica"]');
+      const rubrica = selectRub ? selectRub.value : '';
+      const qInp = tr.querySelector('.quantidade');
+      const quantidade = qInp ? (qInp.value === '-' ? null : qInp.value) : null;
+      const categoria = tr.querySelector('.categoria') ? tr.querySelector('.categoria').value : '';
+      if (!rubrica) return;
+      const valores_por_mes = {};
+      tr.querySelectorAll('input.valor').forEach((inp, idx) => {
+        const raw = inp.value && inp.value.trim();
+        if (!raw) return;
+        // normalizar: aceitar formatos 1.234,56 ou 1234.56
+        const normalized = String(raw).replace(/\./g,'').replace(',', '.').replace('R$', '').trim();
+        const num = parseFloat(normalized);
+        if (!isNaN(num) && num !== 0) {
+          // enviar como string com ponto decimal — backend aceita com ',' e 'R$' também
+          valores_por_mes[idx+1] = num.toString();
+        } else if (normalized === '-' ) {
+          // ignorar
+        } else if (!isNaN(num) && num === 0) {
+          // include zeros explicitly
+          valores_por_mes[idx+1] = '0';
+        }
+      });
+      if (Object.keys(valores_por_mes).length > 0) despesas.push({rubrica, quantidade, categoria_despesa: categoria, valores_por_mes});
+    });
+
+    if (despesas.length === 0) { alert('Preencha pelo menos uma despesa com valores'); return; }
+
+    console.log('[SALVAR] Total de despesas:', despesas.length);
+
+    // Mostrar progresso
+    const btn = document.getElementById('salvarOrc2');
+    const btnText = document.getElementById('salvarText');
+    const btnIcon = document.getElementById('salvarIcon');
+    const btnSpinner = document.getElementById('salvarSpinner');
+    const progressContainer = document.getElementById('progressContainer');
+    const progressBar = document.getElementById('progressBar');
+    const progressText = document.getElementById('progressText');
+
+    // Desabilitar botão e mostrar spinner
+    btn.disabled = true;
+    btnIcon.classList.add('d-none');
+    btnText.textContent = 'Salvando...';
+    btnSpinner.classList.remove('d-none');
+    progressContainer.classList.remove('d-none');
+
+    // Simular progresso (0% -> 30% durante preparação)
+    let progress = 0;
+    progressBar.style.width = '0%';
+    progressText.textContent = '0%';
+
+    const progressInterval = setInterval(() => {
+      if (progress < 30) {
+        progress += 5;
+        progressBar.style.width = progress + '%';
+        progressText.textContent = progress + '%';
+      }
+    }, 100);
+
+    // obter aditivo selecionado
+    const aditivoSelecionado = parseInt(document.getElementById('aditivoSelect').value) || 0;
+
+    console.log('[SALVAR] Enviando requisição para /api/despesa...');
+
+    // 30% -> 70% durante envio
+    setTimeout(() => {
+      clearInterval(progressInterval);
+      progress = 30;
+      const uploadInterval = setInterval(() => {
+        if (progress < 70) {
+          progress += 2;
+          progressBar.style.width = progress + '%';
+          progressText.textContent = progress + '%';
+        }
+      }, 50);
+
+      // enviar para /api/despesa
+      fetch('/api/despesa', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({numero_termo: numeroTermo, despesas, month_names: monthNames, aditivo: aditivoSelecionado})
+      })
+      .then(r => {
+        clearInterval(uploadInterval);
+        progress = 70;
+        progressBar.style.width = '70%';
+        progressText.textContent = '70%';
+        return r.json();
+      })
+      .then(data => {
+        console.log('[SALVAR] Resposta recebida:', data);
+
+        // 70% -> 90%
+        progress = 90;
+        progressBar.style.width = '90%';
+        progressText.textContent = '90%';
+
+        if (data.warning){
+          // Resetar UI
+          btn.disabled = false;
+          btnIcon.classList.remove('d-none');
+          btnText.textContent = 'Salvar';
+          btnSpinner.classList.add('d-none');
+          progressContainer.classList.add('d-none');
+
+          if (confirm(data.message + '\nDeseja prosseguir e salvar mesmo assim?')){
+            // Re-iniciar progresso para confirmação
+            btn.disabled = true;
+            btnIcon.classList.add('d-none');
+            btnText.textContent = 'Confirmando...';
+            btnSpinner.classList.remove('d-none');
+            progressContainer.classList.remove('d-none');
+            progressBar.style.width = '50%';
+            progressText.textContent = '50%';
+
+            // forçar com confirmar
+            fetch('/api/despesa/confirmar',{
+              method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({numero_termo: numeroTermo, despesas, month_names: monthNames, aditivo: aditivoSelecionado})
+            }).then(r => {
+              progressBar.style.width = '90%';
+              progressText.textContent = '90%';
+              return r.json();
+            }).then(d=>{
+              progressBar.style.width = '100%';
+              progressText.textContent = '100%';
+              progressBar.classList.remove('progress-bar-animated');
+              progressBar.classList.add('bg-success');
+
+              if (d.message) alert(d.message);
+              else if (d.error) alert('Erro: ' + d.error);
+              atualizarMatrizes();
+
+              // Resetar botão após 1 segundo
+              setTimeout(() => {
+                btn.disabled = false;
+                btnIcon.classList.remove('d-none');
+                btnText.textContent = 'Salvar';
+                btnSpinner.classList.add('d-none');
+                progressContainer.classList.add('d-none');
+                progressBar.style.width = '0%';
+                progressBar.classList.remove('bg-success', 'bg-warning', 'bg-danger');
+                progressBar.classList.add('progress-bar-animated');
+              }, 1000);
+            }).catch(e=>{ 
+              btn.disabled = false;
+              btnIcon.classList.remove('d-none');
+              btnText.textContent = 'Salvar';
+              btnSpinner.classList.add('d-none');
+              progressContainer.classList.add('d-none');
+              alert('Erro ao confirmar. Veja console.'); 
+              console.error(e); 
+            });
+          }
+        } else {
+          // 90% -> 100%
+          progressBar.style.width = '100%';
+          progressText.textContent = '100%';
+          progressBar.classList.remove('progress-bar-animated');
+
+          // Mostrar resultado detalhado dos bancos
+          let alertMessage = '';
+          if (data.message) {
+            alertMessage = data.message;
+
+            // Adicionar detalhes dos bancos se disponível
+            if (data.databases) {
+              const dbInfo = [];
+              if (data.databases.local) dbInfo.push('✅ LOCAL');
+              else dbInfo.push('❌ LOCAL');
+
+              if (data.databases.railway) dbInfo.push('✅ RAILWAY');
+              else dbInfo.push('❌ RAILWAY');
+
+              alertMessage += '\n\nStatus dos bancos:\n' + dbInfo.join('\n');
+
+              // Adicionar contadores se disponível
+              if (data.databases.local_count !== undefined) {
+                alertMessage += `\n\nRegistros salvos:\nLOCAL: ${data.databases.local_count}/${data.registros}\nRAILWAY: ${data.databases.railway_count}/${data.registros}`;
+              }
+            }
+
+            // Se salvou em pelo menos um banco, marcar como sucesso
+            if (data.databases && (data.databases.local || data.databases.railway)) {
+              progressBar.classList.add('bg-success');
+            } else {
+              progressBar.classList.add('bg-warning');
+            }
+          }
+
+          if (data.error) {
+            alertMessage = 'Erro: ' + data.error;
+            progressBar.classList.add('bg-danger');
+            alert(alertMessage);
+            // Resetar em caso de erro
+            btn.disabled = false;
+            btnIcon.classList.remove('d-none');
+            btnText.textContent = 'Salvar';
+            btnSpinner.classList.add('d-none');
+            progressContainer.classList.add('d-none');
+            return;
+          }
+
+          if (alertMessage) alert(alertMessage);
+          atualizarMatrizes();
+
+          console.log('[SALVAR] Salvamento concluído! Permanecendo na página.');
+
+          // Resetar botão após 1 segundo
+          setTimeout(() => {
+            btn.disabled = false;
+            btnIcon.classList.remove('d-none');
+            btnText.textContent = 'Salvar';
+            btnSpinner.classList.add('d-none');
+            progressContainer.classList.add('d-none');
+            progressBar.style.width = '0%';
+            progressBar.classList.remove('bg-success', 'bg-warning', 'bg-danger');
+            progressBar.classList.add('progress-bar-animated');
+          }, 1000);
+        }
+      }).catch(e=>{ 
+        clearInterval(uploadInterval);
+        btn.disabled = false;
+        btnIcon.classList.remove('d-none');
+        btnText.textContent = 'Salvar';
+        btnSpinner.classList.add('d-none');
+        progressContainer.classList.add('d-none');
+        progressBar.classList.remove('progress-bar-animated');
+        progressBar.classList.add('bg-danger');
+        alert('Erro ao salvar. Veja console.'); 
+        console.error(e); 
+      });
+    }, 300);
+  });
+
+  // recalcular totais por coluna, total geral E total por linha
+  function recalcTotals(){
+    const thead = document.querySelector('#tabelaOrc2 thead tr');
+    const monthCount = thead.querySelectorAll('.month-th').length;
+    const totals = Array.from({length: monthCount}, ()=>0);
+    document.querySelectorAll('#bodyOrc2 tr').forEach(tr => {
+      const vals = Array.from(tr.querySelectorAll('input.valor')).map(i=>parseFloat(i.value.replace(/\./g,'').replace(',','.'))||0);
+      // Calcular total da linha
+      const totalLinha = vals.reduce((a,b)=>a+b,0);
+      const totalLinhaCell = tr.querySelector('.total-linha');
+      if (totalLinhaCell) {
+        totalLinhaCell.textContent = totalLinha.toLocaleString('pt-BR', {minimumFractionDigits:2});
+      }
+      // Somar para totais por coluna
+      for (let j=0;j<monthCount;j++) totals[j] += (vals[j]||0);
+    });
+    // preencher tfoot
+    const foot = document.querySelector('#tabelaOrc2 tfoot tr');
+    const colTotals = foot.querySelectorAll('.col-total');
+    for (let j=0;j<colTotals.length;j++){
+      colTotals[j].textContent = (totals[j]||0).toLocaleString('pt-BR', {minimumFractionDigits:2});
+    }
+    const grand = totals.reduce((a,b)=>a+b,0);
+    document.getElementById('grandTotal').textContent = grand.toLocaleString('pt-BR', {minimumFractionDigits:2});
+  }
+
+  // escutar mudanças nos inputs de valor para recalcular
+  document.addEventListener('input', function(e){ if (e.target && e.target.classList && e.target.classList.contains('valor')) recalcTotals(); });
+
+  // --- NAVEGAÇÃO COM ENTER ---
+  document.addEventListener('keydown', function(e){
+    // Verificar se o Enter foi pressionado em um input de valor, categoria ou quantidade
+    const isValor = e.target.classList && e.target.classList.contains('valor');
+    const isCategoria = e.target.classList && e.target.classList.contains('categoria');
+    const isQuantidade = e.target.classList && e.target.classList.contains('quantidade');
+
+    if (e.key === 'Enter' && (isValor || isCategoria || isQuantidade)){
+      e.preventDefault();
+      const currentTr = e.target.closest('tr');
+      const currentTd = e.target.closest('td');
+      const allTds = Array.from(currentTr.querySelectorAll('td'));
+      const tdIndex = allTds.indexOf(currentTd);
+
+      // Próxima linha
+      const nextTr = currentTr.nextElementSibling;
+      if (nextTr && nextTr.tagName === 'TR'){
+        const nextTds = nextTr.querySelectorAll('td');
+        if (nextTds[tdIndex]){
+          // Procurar o input correspondente na próxima linha (valor, categoria ou quantidade)
+          let nextInput = null;
+          if (isValor) {
+            nextInput = nextTds[tdIndex].querySelector('input.valor');
+          } else if (isCategoria) {
+            nextInput = nextTds[tdIndex].querySelector('input.categoria');
+          } else if (isQuantidade) {
+            nextInput = nextTds[tdIndex].querySelector('input.quantidade');
+          }
+
+          if (nextInput) {
+            nextInput.focus();
+            nextInput.select();
+          }
+        }
+      }
+    }
+  });
+
+  // --- BOTÃO OCULTAR/MOSTRAR MESES ---
+  document.getElementById('toggleMonthsBtn').addEventListener('click', function(){
+    const table = document.getElementById('tabelaOrc2');
+    const isHidden = table.classList.contains('hide-months');
+    if (isHidden){
+      table.classList.remove('hide-months');
+      document.getElementById('toggleMonthsText').textContent = '👁️ Ocultar Meses';
+    } else {
+      table.classList.add('hide-months');
+      document.getElementById('toggleMonthsText').textContent = '👁️ Mostrar Meses';
+    }
+  });
+
+  // --- BOTÃO LIMPAR ---
+  document.getElementById('limparBtn').addEventListener('click', function(){
+    const tbody = document.getElementById('bodyOrc2');
+    const hasData = Array.from(tbody.querySelectorAll('input.valor')).some(inp => inp.value.trim() !== '');
+
+    if (hasData){
+      if (!confirm('Tem certeza que deseja limpar todos os dados? Esta ação não pode ser desfeita.')){
+        return;
+      }
+    }
+
+    // Limpar todos os inputs
+    tbody.querySelectorAll('input, select').forEach(el => {
+      if (el.classList.contains('quantidade')) {
+        el.value = '1';
+      } else {
+        el.value = '';
+      }
+    });
+
+    recalcTotals();
+    alert('Dados limpos com sucesso!');
+  });
+
+  // Matrizes de todos os aditivos do termo, carregadas numa única requisição:
+  // Promise de Map aditivo -> matriz colunar (meses, linhas [rubrica, categoria, quantidade],
+  // valores linha a linha e total). Trocar de aditivo não faz nova requisição.
+  let matrizesAditivos = null;
+
+  function obterMatrizes(){
+    if (!matrizesAditivos) {
+      const numeroTermo = dadosPagina.numeroTermo;
+      matrizesAditivos = fetch(`/api/despesas-aditivos/${encodeURIComponent(numeroTermo)}`)
+        .then(r => r.json())
+        .then(data => {
+          if (data.error) throw new Error(data.error);
+          return new Map(data.aditivos.map(matriz => [matriz.aditivo, matriz]));
+        })
+        .catch(e => {
+          matrizesAditivos = null;
+          throw e;
+        });
+    }
+    return matrizesAditivos;
+  }
+
+  // Depois de salvar: recarrega as matrizes e os totais por aditivo
+  function atualizarMatrizes(){
+    matrizesAditivos = null;
+    obterMatrizes().then(mostrarTotaisAditivos).catch(e => console.error('Erro ao atualizar aditivos:', e));
+  }
+
+  // Comparação dos aditivos: total de cada um e diferença em relação à Base
+  function mostrarTotaisAditivos(matrizes){
+    const moeda = v => 'R$ ' + v.toLocaleString('pt-BR', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+    const base = matrizes.has(0) ? matrizes.get(0).total : null;
+    const partes = [];
+    matrizes.forEach((matriz, aditivo) => {
+      let texto = `${aditivo === 0 ? 'Base' : 'Aditivo ' + aditivo}: ${moeda(matriz.total)}`;
+      if (aditivo !== 0 && base !== null) {
+        const diferenca = matriz.total - base;
+        texto += ` (${diferenca >= 0 ? '+' : '-'}${moeda(Math.abs(diferenca))} em relação à Base)`;
+      }
+      partes.push(texto);
+    });
+    document.getElementById('totaisAditivos').textContent = partes.join(' | ');
+  }
+
+  // carregar dados existentes do aditivo selecionado
+  function carregarDadosExistentes(){
+    const numeroTermo = dadosPagina.numeroTermo;
+    const aditivoSelecionado = parseInt(document.getElementById('aditivoSelect').value) || 0;
+    obterMatrizes()
+    .then(matrizes => {
+      const data = matrizes.get(aditivoSelecionado) || {meses: [], linhas: [], valores: []};
+
+      const linhas = data.linhas || [];
+      if (linhas.length === 0) {
+        console.log('Nenhuma despesa encontrada para este termo');
+        return;
+      }
+
+      // Meses vêm em ordem crescente
+      const meses = data.meses;
+      const posicaoMes = new Map(meses.map((mes, i) => [mes, i]));
+      const maxMes = meses.length ? meses[meses.length - 1] : 0;
+
+      // Ajustar número de colunas de meses se necessário
+      const currentMonths = document.querySelectorAll('#tabelaOrc2 thead .month-th').length;
+      if (maxMes > currentMonths) {
+        document.getElementById('numCols').value = maxMes - currentMonths;
+        document.getElementById('addMonthsBtn').click();
+      }
+
+      // Ajustar número de linhas se necessário
+      const tbody = document.getElementById('bodyOrc2');
+      const currentRows = tbody.querySelectorAll('tr').length;
+      const needRows = linhas.length;
+
+      if (currentRows > needRows) {
+        // Remover linhas extras do final
+        for (let i = currentRows - 1; i >= needRows; i--) {
+          const row = tbody.children[i];
+          if (row) tbody.removeChild(row);
+        }
+      } else if (currentRows < needRows) {
+        // Adicionar linhas necessárias
+        for (let i = currentRows; i < needRows; i++) {
+          document.getElementById('addLinha').click();
+        }
+      }
+
+      // Preencher os dados nas linhas
+      const rows = tbody.querySelectorAll('tr');
+      linhas.forEach(([rubrica, categoria, quantidade], index) => {
+        if (index >= rows.length) return;
+
+        const tr = rows[index];
+
+        // Rubrica
+        const selectRub = tr.querySelector('select[name="rubrica"]');
+        if (selectRub) {
+          selectRub.value = rubrica || '';
+        }
+
+        // Quantidade
+        const qInp = tr.querySelector('.quantidade');
+        if (qInp) {
+          qInp.value = quantidade || '1';
+        }
+
+        // Categoria
+        const catInp = tr.querySelector('.categoria');
+        if (catInp) {
+          catInp.value = categoria || '';
+        }
+
+        // Valores por mês
+        const inicioLinha = index * meses.length;
+        const valorInputs = tr.querySelectorAll('input.valor');
+        valorInputs.forEach((inp, mesIndex) => {
+          const posicao = posicaoMes.get(mesIndex + 1);
+          const valor = posicao === undefined ? null : data.valores[inicioLinha + posicao];
+          if (valor !== null) {
+            // Formatar como moeda brasileira
+            inp.value = valor.toLocaleString('pt-BR', {minimumFractionDigits: 2});
+          }
+        });
+      });
+
+      // Recalcular totais após carregar dados
+      recalcTotals();
+      console.log(`Carregadas ${linhas.length} despesas para ${numeroTermo}`);
+    })
+    .catch(e => {
+      console.error('Erro ao carregar dados:', e);
+    });
+  }
+
+  // Carregar categorias disponíveis do banco de dados
+  function carregarCategorias() {
+    fetch('/api/categorias')
+      .then(r => r.json())
+      .then(data => {
+        if (data.categorias) {
+          const datalist = document.getElementById('categoriasDisponiveis');
+          datalist.innerHTML = '';
+          data.categorias.forEach(cat => {
+            const option = document.createElement('option');
+            option.value = cat;
+            datalist.appendChild(option);
+          });
+        }
+      })
+      .catch(e => console.error('Erro ao carregar categorias:', e));
+  }
+
+  // Auto-preencher rubrica quando categoria for selecionada
+  function configurarAutoPreenchemento() {
+    const tbody = document.getElementById('bodyOrc2');
+
+    // Usar delegação de eventos para inputs de categoria
+    tbody.addEventListener('change', function(e) {
+      if (e.target.classList.contains('categoria')) {
+        const categoria = e.target.value.trim();
+        if (categoria) {
+          // Buscar rubrica sugerida
+          fetch(`/api/rubrica-sugerida/${encodeURIComponent(categoria)}`)
+            .then(r => r.json())
+            .then(data => {
+              if (data.rubrica) {
+                // Encontrar o select de rubrica na mesma linha
+                const linha = e.target.closest('tr');
+                const selectRubrica = linha.querySelector('select[name="rubrica"]');
+                if (selectRubrica) {
+                  // Verificar se a rubrica existe nas opções
+                  const opcoes = Array.from(selectRubrica.options);
+                  const opcaoEncontrada = opcoes.find(opt => opt.value === data.rubrica);
+                  if (opcaoEncontrada) {
+                    selectRubrica.value = data.rubrica;
+                  }
+                }
+              }
+            })
+            .catch(e => console.error('Erro ao buscar rubrica sugerida:', e));
+        }
+      }
+    });
+  }
+
+  // inicial
+  recalcTotals();
+  carregarCategorias();
+  configurarAutoPreenchemento();
+  carregarDadosExistentes();
+  obterMatrizes().then(mostrarTotaisAditivos).catch(() => {});
+
+  // Adicionar listener para mudança de aditivo
+  document.getElementById('aditivoSelect').addEventListener('change', function() {
+    // Limpar tabela antes de recarregar
+    const tbody = document.getElementById('bodyOrc2');
+    const rows = tbody.querySelectorAll('tr');
+    rows.forEach(row => {
+      // Limpar valores dos inputs
+      row.querySelectorAll('input').forEach(input => input.value = '');
+      row.querySelectorAll('select').forEach(select => select.selectedIndex = 0);
+    });
+    // Preencher com a matriz do aditivo selecionado (já carregada)
+    carregarDadosExistentes();
+  });
@@ -0,0 +1,437 @@
+// Dicionário de categorias de despesa - templates/orcamento_3_dict.html
+// Valores da página vêm dos atributos data-* da tag <script>
+const dadosPagina = document.currentScript.dataset;
+
+// Variável para armazenar timeout de busca
+let timeoutBusca = null;
+
+// Função para ver termos de uma categoria
+function verTermos(categoria, totalTermos) {
+    // Atualizar informações do modal
+    document.getElementById('categoriaNome').textContent = categoria;
+    document.getElementById('totalTermos').textContent = totalTermos;
+
+    // Mostrar modal
+    const modal = new bootstrap.Modal(document.getElementById('modalTermos'));
+    modal.show();
+
+    // Resetar conteúdo
+    const listaTermos = document.getElementById('listaTermos');
+    listaTermos.innerHTML = '<div class="text-center"><div class="spinner-border text-success" role="status"><span class="visually-hidden">Carregando...</span></div></div>';
+
+    // Buscar termos do backend
+    fetch('/orcamento/termos-por-categoria/' + encodeURIComponent(categoria))
+        .then(r => r.json())
+        .then(data => {
+            if (data.error) {
+                listaTermos.innerHTML = '<div class="alert alert-danger">❌ Erro: ' + data.error + '</div>';
+                return;
+            }
+
+            if (data.termos.length === 0) {
+                listaTermos.innerHTML = '<div class="alert alert-warning">Nenhum termo encontrado.</div>';
+                return;
+            }
+
+            // Criar tabela com os termos
+            let html = '<table class="table table-hover table-striped">';
+            html += '<thead class="table-success"><tr>';
+            html += '<th style="width: 50%"><i class="bi bi-file-text"></i> Número do Termo</th>';
+            html += '<th style="width: 25%" class="text-center"><i class="bi bi-list"></i> Despesas</th>';
+            html += '<th style="width: 25%" class="text-end"><i class="bi bi-currency-dollar"></i> Valor Total</th>';
+            html += '</tr></thead><tbody>';
+
+            let totalDespesas = 0;
+            let valorGrandTotal = 0;
+
+            data.termos.forEach(termo => {
+                totalDespesas += termo.total_despesas;
+                valorGrandTotal += termo.valor_total;
+
+                html += '<tr>';
+                html += '<td><strong>' + termo.numero_termo + '</strong></td>';
+                html += '<td class="text-center"><span class="badge bg-info">' + termo.total_despesas + '</span></td>';
+                html += '<td class="text-end">R$ ' + termo.valor_total.toLocaleString('pt-BR', {minimumFractionDigits: 2, maximumFractionDigits: 2}) + '</td>';
+                html += '</tr>';
+            });
+
+            html += '</tbody>';
+            html += '<tfoot class="table-secondary"><tr>';
+            html += '<th>TOTAL</th>';
+            html += '<th class="text-center"><span class="badge bg-dark">' + totalDespesas + '</span></th>';
+            html += '<th class="text-end"><strong>R$ ' + valorGrandTotal.toLocaleString('pt-BR', {minimumFractionDigits: 2, maximumFractionDigits: 2}) + '</strong></th>';
+            html += '</tr></tfoot>';
+            html += '</table>';
+
+            listaTermos.innerHTML = html;
+        })
+        .catch(error => {
+            listaTermos.innerHTML = '<div class="alert alert-danger">❌ Erro ao carregar termos: ' + error + '</div>';
+        });
+}
+
+// Gerenciamento de checkboxes e seleção múltipla
+function atualizarContadorSelecao() {
+    const checkboxesMarcadas = document.querySelectorAll('.checkbox-linha:checked');
+    const total = checkboxesMarcadas.length;
+    document.getElementById('contadorSelecionados').textContent = total;
+
+    const actionBar = document.getElementById('actionBar');
+    if (total > 0) {
+        actionBar.classList.add('show');
+    } else {
+        actionBar.classList.remove('show');
+    }
+
+    // Atualizar card de modificações pendentes
+    const cardModificacoes = document.querySelectorAll('.stats-card.info h2')[0];
+    if (cardModificacoes) {
+        cardModificacoes.textContent = total;
+    }
+}
+
+// Selecionar/Desmarcar todos
+document.getElementById('selecionarTodos').addEventListener('change', function() {
+    const checkboxes = document.querySelectorAll('.checkbox-linha:not(:disabled)');
+    checkboxes.forEach(cb => {
+        cb.checked = this.checked;
+        const linha = cb.closest('tr');
+        if (this.checked) {
+            linha.classList.add('marcado-alteracao');
+        } else {
+            linha.classList.remove('marcado-alteracao');
+        }
+    });
+    atualizarContadorSelecao();
+});
+
+function desmarcarTodos() {
+    document.querySelectorAll('.checkbox-linha:checked').forEach(cb => {
+        cb.checked = false;
+        cb.closest('tr').classList.remove('marcado-alteracao');
+    });
+    document.getElementById('selecionarTodos').checked = false;
+    atualizarContadorSelecao();
+}
+
+// Busca global no banco de dados
+document.getElementById('filtroCategoria').addEventListener('input', function(e) {
+    const termoBusca = e.target.value.trim();
+
+    // Limpar timeout anterior
+    if (timeoutBusca) {
+        clearTimeout(timeoutBusca);
+    }
+
+    // Se vazio, recarregar página normal
+    if (termoBusca === '') {
+        window.location.href = dadosPagina.urlDicionario;
+        return;
+    }
+
+    // Aguardar 500ms antes de fazer a busca (debounce)
+    timeoutBusca = setTimeout(() => {
+        realizarBuscaGlobal(termoBusca);
+    }, 500);
+});
+
+function realizarBuscaGlobal(termo) {
+    // Mostrar indicador de carregamento
+    const tbody = document.querySelector('tbody');
+    tbody.innerHTML = '<tr><td colspan="6" class="text-center"><div class="spinner-border text-primary" role="status"><span class="visually-hidden">Buscando...</span></div></td></tr>';
+
+    fetch('/orcamento/buscar-categorias?q=' + encodeURIComponent(termo))
+        .then(r => r.json())
+        .then(data => {
+            if (data.error) {
+                tbody.innerHTML = '<tr><td colspan="6" class="text-center text-danger">❌ Erro: ' + data.error + '</td></tr>';
+                return;
+            }
+
+            if (data.categorias.length === 0) {
+                tbody.innerHTML = '<tr><td colspan="6" class="text-center text-muted">🔍 Nenhuma categoria encontrada com "' + termo + '"</td></tr>';
+                return;
+            }
+
+            // Atualizar estatísticas
+            document.querySelector('.stats-card h2').textContent = data.total;
+
+            // Ocultar paginação durante busca
+            document.querySelectorAll('nav[aria-label="Paginação de categorias"]').forEach(nav => {
+                nav.style.display = 'none';
+            });
+
+            // Atualizar alerta de info
+            const alertInfo = document.querySelector('.alert-info');
+            alertInfo.innerHTML = '<i class="bi bi-search"></i> Mostrando <strong>' + data.total + '</strong> resultado(s) para "<strong>' + data.termo_busca + '</strong>" | <a href="' + dadosPagina.urlDicionario + '" class="alert-link">Limpar busca</a>';
+
+            // Renderizar resultados
+            let html = '';
+            data.categorias.forEach(cat => {
+                html += `
+                <tr data-original-categoria="${cat.categoria_despesa}">
+                    <td class="text-center"><input type="checkbox" class="checkbox-alteracao checkbox-linha" disabled></td>
+                    <td><input type="text" class="categoria-input" value="${cat.categoria_despesa}" data-original="${cat.categoria_despesa}"></td>
+                    <td><span class="badge bg-secondary">${cat.rubrica_comum || 'N/A'}</span></td>
+                    <td class="text-center"><span class="badge bg-info">${cat.total_ocorrencias}</span></td>
+                    <td class="text-center">
+                        <span class="badge bg-success badge-termos" data-categoria="${cat.categoria_despesa}" data-total-termos="${cat.total_termos}" title="Clique para ver os termos" style="cursor: pointer;">
+                            <i class="bi bi-list-ul"></i> ${cat.total_termos}
+                        </span>
+                    </td>
+                    <td class="text-center"><button class="btn btn-primary btn-sm btn-salvar" onclick="salvarCategoria(this)"><i class="bi bi-check-lg"></i> Salvar</button></td>
+                </tr>
+                `;
+            });
+            tbody.innerHTML = html;
+
+            // Reconfigurar eventos nos inputs e badges
+            configurarEventosInputs();
+            configurarEventosBadges();
+        })
+        .catch(error => {
+            tbody.innerHTML = '<tr><td colspan="6" class="text-center text-danger">❌ Erro na busca: ' + error + '</td></tr>';
+        });
+}
+
+function configurarEventosInputs() {
+    document.querySelectorAll('.categoria-input').forEach(input => {
+        input.addEventListener('input', function() {
+            const modificado = this.value.trim() !== this.dataset.original;
+            this.classList.toggle('modified', modificado);
+
+            const linha = this.closest('tr');
+            const checkbox = linha.querySelector('.checkbox-linha');
+
+            // Habilitar/desabilitar checkbox baseado na modificação
+            if (modificado) {
+                checkbox.disabled = false;
+                checkbox.checked = true;
+                linha.classList.add('marcado-alteracao');
+            } else {
+                checkbox.disabled = true;
+                checkbox.checked = false;
+                linha.classList.remove('marcado-alteracao');
+            }
+
+            atualizarContadorSelecao();
+        });
+
+        input.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') salvarCategoria(this.closest('tr').querySelector('.btn-salvar'));
+        });
+    });
+
+    // Eventos das checkboxes
+    document.querySelectorAll('.checkbox-linha').forEach(cb => {
+        cb.addEventListener('change', function() {
+            const linha = this.closest('tr');
+            if (this.checked) {
+                linha.classList.add('marcado-alteracao');
+            } else {
+                linha.classList.remove('marcado-alteracao');
+            }
+            atualizarContadorSelecao();
+        });
+    });
+}
+
+// Configurar eventos iniciais
+configurarEventosInputs();
+
+// Salvar categorias selecionadas em lote
+function salvarSelecionados() {
+    const linhasSelecionadas = document.querySelectorAll('.checkbox-linha:checked');
+
+    if (linhasSelecionadas.length === 0) {
+        alert('⚠ Nenhuma alteração selecionada!');
+        return;
+    }
+
+    // Coletar todas as alterações
+    const alteracoes = [];
+    linhasSelecionadas.forEach(cb => {
+        const linha = cb.closest('tr');
+        const input = linha.querySelector('.categoria-input');
+        const categoriaAntiga = input.dataset.original;
+        const categoriaNova = input.value.trim();
+
+        if (categoriaNova && categoriaAntiga !== categoriaNova) {
+            alteracoes.push({
+                antiga: categoriaAntiga,
+                nova: categoriaNova
+            });
+        }
+    });
+
+    if (alteracoes.length === 0) {
+        alert('⚠ Nenhuma alteração válida encontrada!');
+        return;
+    }
+
+    // Confirmar ação
+    let mensagem = `⚠ Você está prestes a atualizar ${alteracoes.length} categoria(s):\n\n`;
+    alteracoes.slice(0, 5).forEach(alt => {
+        mensagem += `"${alt.antiga}" → "${alt.nova}"\n`;
+    });
+    if (alteracoes.length > 5) {
+        mensagem += `\n... e mais ${alteracoes.length - 5} alteração(ões)\n`;
+    }
+    mensagem += '\nTODOS os registros no banco serão atualizados!\n\nDeseja continuar?';
+
+    if (!confirm(mensagem)) {
+        return;
+    }
+
+    // Desabilitar botão e mostrar progresso
+    const actionBar = document.getElementById('actionBar');
+    const btnSalvar = actionBar.querySelector('.btn-success');
+    btnSalvar.disabled = true;
+    btnSalvar.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Salvando...';
+
+    // Processar alterações sequencialmente
+    processarAlteracoesSequenciais(alteracoes, 0, []);
+}
+
+function processarAlteracoesSequenciais(alteracoes, indice, resultados) {
+    if (indice >= alteracoes.length) {
+        // Todas concluídas
+        const sucesso = resultados.filter(r => r.sucesso).length;
+        const erros = resultados.filter(r => !r.sucesso).length;
+
+        let mensagem = `✅ Processo concluído!\n\n`;
+        mensagem += `Sucesso: ${sucesso}\n`;
+        if (erros > 0) {
+            mensagem += `Erros: ${erros}\n\n`;
+            mensagem += 'Erros encontrados:\n';
+            resultados.filter(r => !r.sucesso).forEach(r => {
+                mensagem += `- ${r.antiga}: ${r.erro}\n`;
+            });
+        }
+
+        alert(mensagem);
+        setTimeout(() => location.reload(), 1000);
+        return;
+    }
+
+    const alteracao = alteracoes[indice];
+
+    // Atualizar contador
+    document.getElementById('contadorSelecionados').textContent = 
+        `Processando ${indice + 1} de ${alteracoes.length}...`;
+
+    fetch('/orcamento/atualizar-categoria', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            categoria_antiga: alteracao.antiga,
+            categoria_nova: alteracao.nova
+        })
+    })
+    .then(r => r.json())
+    // A renomeação roda como job: aguardar o resultado final
+    .then(data => data.error ? data : aguardarJob(data.status_url).then(job => job.resultado))
+    .then(data => {
+        if (data.error) {
+            resultados.push({
+                antiga: alteracao.antiga,
+                nova: alteracao.nova,
+                sucesso: false,
+                erro: data.error
+            });
+        } else {
+            resultados.push({
+                antiga: alteracao.antiga,
+                nova: alteracao.nova,
+                sucesso: true,
+                linhas: data.linhas_afetadas
+            });
+        }
+
+        // Processar próxima
+        processarAlteracoesSequenciais(alteracoes, indice + 1, resultados);
+    })
+    .catch(error => {
+        resultados.push({
+            antiga: alteracao.antiga,
+            nova: alteracao.nova,
+            sucesso: false,
+            erro: error.toString()
+        });
+
+        // Processar próxima mesmo com erro
+        processarAlteracoesSequenciais(alteracoes, indice + 1, resultados);
+    });
+}
+
+function salvarCategoria(btn) {
+const linha = btn.closest('tr');
+const input = linha.querySelector('.categoria-input');
+const categoriaAntiga = input.dataset.original;
+const categoriaNova = input.value.trim();
+if (!categoriaNova) { alert('⚠ Categoria não pode estar vazia!'); return; }
+if (categoriaAntiga === categoriaNova) { alert('ℹ Nenhuma alteração detectada.'); return; }
+if (!confirm('⚠ Atualizar TODOS os registros de:\n"' + categoriaAntiga + '"\n\nPara:\n"' + categoriaNova + '"?')) return;
+btn.disabled = true;
+const htmlOriginal = btn.innerHTML;
+btn.innerHTML = '<span class="spinner-border spinner-border-sm"></span>';
+fetch('/orcamento/atualizar-categoria', {
+method: 'POST',
+headers: {'Content-Type': 'application/json'},
+body: JSON.stringify({categoria_antiga: categoriaAntiga, categoria_nova: categoriaNova})
+})
+.then(r => r.json())
+.then(data => data.error ? data : aguardarJob(data.status_url).then(job => job.resultado))
+.then(data => {
+if (data.error) {
+alert('❌ Erro: ' + data.error);
+btn.disabled = false;
+btn.innerHTML = htmlOriginal;
+} else {
+alert('✅ ' + data.message);
+input.dataset.original = categoriaNova;
+input.classList.remove('modified');
+setTimeout(() => location.reload(), 1000);
+}
+})
+.catch(error => {
+alert('❌ Erro: ' + error);
+btn.disabled = false;
+btn.innerHTML = htmlOriginal;
+});
+}
+
+// Consulta /jobs/<id> até o job terminar
+function aguardarJob(statusUrl, intervalo = 1000) {
+    return new Promise((resolve, reject) => {
+        const consultar = () => {
+            fetch(statusUrl)
+                .then(r => r.json())
+                .then(job => {
+                    if (job.status === 'concluido') resolve(job);
+                    else if (job.status === 'erro' || job.error) reject(new Error(job.erro || job.error));
+                    else setTimeout(consultar, intervalo);
+                })
+                .catch(reject);
+        };
+        consultar();
+    });
+}
+
+// Event listener para badges de termos
+document.addEventListener('DOMContentLoaded', function() {
+    configurarEventosBadges();
+});
+
+function configurarEventosBadges() {
+    document.querySelectorAll('.badge-termos').forEach(badge => {
+        badge.removeEventListener('click', handleBadgeClick); // Remove listener antigo se existir
+        badge.addEventListener('click', handleBadgeClick);
+    });
+}
+
+function handleBadgeClick() {
+    const categoria = this.getAttribute('data-categoria');
+    const totalTermos = this.getAttribute('data-total-termos');
+    verTermos(categoria, totalTermos);
+}
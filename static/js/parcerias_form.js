@@ -0,0 +1,483 @@
+// Formulário de parceria (autocomplete de OSCs, cálculos, exportação) - templates/parcerias_form.html
+// Valores da página vêm dos atributos data-* da tag <script>
+const dadosPagina = document.currentScript.dataset;
+
+// ========== VARIÁVEIS GLOBAIS ==========
+const formId = 'parceriaForm_' + (document.getElementById('numero_termo').value || 'nova');
+let autosaveTimeout;
+let lastSaved = Date.now();
+let oscData = {}; // Mapeamento OSC -> CNPJ (das sugestões já recebidas)
+let siglaMapping = {}; // Mapeamento sigla -> tipo de termo
+let oscBuscaTimeout;
+let oscBuscaController;
+const OSC_MAX_SUGESTOES = 20;
+
+// ========== 1. CARREGAR DADOS DO FORMULÁRIO ==========
+// Uma única requisição versionada (ver formulario_parceria.py): enquanto a versão
+// não mudar, o navegador responde do próprio cache
+async function carregarDados() {
+  try {
+    const response = await fetch(dadosPagina.urlFormulario);
+    const dados = await response.json();
+
+    siglaMapping = dados.siglas;
+  } catch (error) {
+    console.error('Erro ao carregar dados:', error);
+  }
+}
+
+// Sugestões de OSC vindas do servidor (ver oscs.py): só as que combinam com o texto digitado
+async function sugerirOscs(texto) {
+  if (oscBuscaController) {
+    oscBuscaController.abort(); // resposta de uma tecla anterior não interessa mais
+  }
+  oscBuscaController = new AbortController();
+  const params = new URLSearchParams({ q: texto, limite: OSC_MAX_SUGESTOES });
+  const response = await fetch(`${dadosPagina.urlBuscarOscs}?${params}`, {
+    signal: oscBuscaController.signal
+  });
+  const dados = await response.json();
+  dados.oscs.forEach(item => { oscData[item.osc] = item.cnpj; });
+  return dados.oscs.map(item => item.osc);
+}
+
+document.getElementById('osc').addEventListener('input', function(e) {
+  const texto = e.target.value.trim();
+  clearTimeout(oscBuscaTimeout);
+  if (!texto || oscData[texto] !== undefined) {
+    return; // vazio ou OSC escolhida na lista
+  }
+  oscBuscaTimeout = setTimeout(async () => {
+    try {
+      const nomes = await sugerirOscs(texto);
+      document.getElementById('osc-list').replaceChildren(...nomes.map(nome => {
+        const option = document.createElement('option');
+        option.value = nome;
+        return option;
+      }));
+    } catch (error) {
+      if (error.name !== 'AbortError') {
+        console.error('Erro ao buscar OSCs:', error);
+      }
+    }
+  }, 150);
+});
+
+// ========== 2. RECONHECIMENTO AUTOMÁTICO DE TIPO DE TERMO ==========
+document.getElementById('numero_termo').addEventListener('input', function(e) {
+  const numeroTermo = e.target.value.trim().toUpperCase();
+
+  if (numeroTermo.length >= 3) {
+    const sigla = numeroTermo.substring(0, 3);
+
+    if (siglaMapping[sigla]) {
+      const tipoSelect = document.getElementById('tipo_termo');
+      const opcoes = Array.from(tipoSelect.options);
+
+      // Encontrar e selecionar a opção correspondente
+      const opcaoCorreta = opcoes.find(opt => opt.value === siglaMapping[sigla]);
+      if (opcaoCorreta) {
+        tipoSelect.value = opcaoCorreta.value;
+
+        // Feedback visual
+        tipoSelect.style.borderColor = '#28a745';
+        setTimeout(() => {
+          tipoSelect.style.borderColor = '';
+        }, 1000);
+      }
+    }
+  }
+});
+
+// ========== 3. PREENCHIMENTO AUTOMÁTICO DE CNPJ ==========
+document.getElementById('osc').addEventListener('change', function(e) {
+  const oscSelecionada = e.target.value;
+
+  if (oscData[oscSelecionada]) {
+    const cnpjField = document.getElementById('cnpj');
+    cnpjField.value = oscData[oscSelecionada];
+
+    // Feedback visual
+    cnpjField.style.borderColor = '#28a745';
+    setTimeout(() => {
+      cnpjField.style.borderColor = '';
+    }, 1000);
+  }
+});
+
+// ========== 4. CÁLCULO AUTOMÁTICO DE MESES ==========
+function calcularMeses() {
+  const inicioInput = document.getElementById('inicio');
+  const finalInput = document.getElementById('final');
+  const mesesInput = document.getElementById('meses');
+
+  if (inicioInput.value && finalInput.value) {
+    const dataInicio = new Date(inicioInput.value + 'T00:00:00');
+    const dataFinal = new Date(finalInput.value + 'T00:00:00');
+
+    if (dataFinal >= dataInicio) {
+      // Calcular diferença em meses
+      let meses = (dataFinal.getFullYear() - dataInicio.getFullYear()) * 12;
+      meses += dataFinal.getMonth() - dataInicio.getMonth();
+
+      // Se o dia final é maior ou igual ao dia inicial, conta o mês completo
+      if (dataFinal.getDate() >= dataInicio.getDate()) {
+        meses += 1;
+      }
+
+      mesesInput.value = meses;
+
+      // Feedback visual
+      mesesInput.style.borderColor = '#28a745';
+      setTimeout(() => {
+        mesesInput.style.borderColor = '';
+      }, 1000);
+    } else {
+      // Apenas limpa o campo, sem alertar
+      mesesInput.value = '';
+    }
+  }
+}
+
+document.getElementById('inicio').addEventListener('change', calcularMeses);
+document.getElementById('final').addEventListener('change', calcularMeses);
+
+// ========== 4.5. SELEÇÃO AUTOMÁTICA DE PORTARIA ==========
+async function detectarPortaria() {
+  const inicioInput = document.getElementById('inicio');
+  const numeroTermoInput = document.getElementById('numero_termo');
+  const portariaSelect = document.getElementById('portaria');
+  const transicaoCheckbox = document.getElementById('transicao');
+  const finalInput = document.getElementById('final');
+
+  const dataInicio = inicioInput.value;
+  const numeroTermo = numeroTermoInput.value;
+  const dataFinal = finalInput.value;
+
+  if (!dataInicio || !numeroTermo) {
+    return; // Precisa dos dois dados
+  }
+
+  try {
+    // Buscar portaria automaticamente
+    const response = await fetch('/api/portaria-automatica', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        data_inicio: dataInicio,
+        numero_termo: numeroTermo
+      })
+    });
+
+    const data = await response.json();
+
+    if (data.portaria) {
+      // Selecionar a portaria no dropdown
+      const opcoes = Array.from(portariaSelect.options);
+      const opcaoCorreta = opcoes.find(opt => opt.value === data.portaria);
+
+      if (opcaoCorreta) {
+        portariaSelect.value = opcaoCorreta.value;
+
+        // Feedback visual
+        portariaSelect.style.borderColor = '#28a745';
+        setTimeout(() => {
+          portariaSelect.style.borderColor = '';
+        }, 2000);
+      }
+    }
+
+    // Verificar transição se tiver data final
+    if (dataFinal && dataInicio) {
+      verificarTransicao(dataInicio, dataFinal, numeroTermo);
+    }
+
+  } catch (error) {
+    console.error('Erro ao detectar portaria:', error);
+  }
+}
+
+async function verificarTransicao(dataInicio, dataFinal, numeroTermo) {
+  const transicaoCheckbox = document.getElementById('transicao');
+
+  // Regras de transição:
+  // Portaria nº 140/SMDHC/2019 (até 31/12/2023) para Portaria nº 90/SMDHC/2023 (a partir de 01/01/2024)
+  // Portaria nº 121/SMDHC/2019 (até 31/12/2023) para Portaria nº 21/SMDHC/2023 (a partir de 01/03/2023)
+
+  const inicio = new Date(dataInicio);
+  const final = new Date(dataFinal);
+
+  const transicao140para090_inicio = new Date('2017-10-01');
+  const transicao140para090_fim = new Date('2023-12-31');
+  const transicao140para090_nova = new Date('2024-01-01');
+
+  const transicao121para021_inicio = new Date('2017-10-01');
+  const transicao121para021_fim = new Date('2023-12-31');
+  const transicao121para021_nova = new Date('2023-03-01');
+
+  let ehTransicao = false;
+
+  // Verifica se atravessa a mudança 140 -> 090
+  if (inicio >= transicao140para090_inicio && inicio <= transicao140para090_fim && 
+      final >= transicao140para090_nova) {
+    const numeroTermoUpper = numeroTermo.toUpperCase();
+    if (numeroTermoUpper.includes('FUMCAD') || numeroTermoUpper.includes('FMID')) {
+      ehTransicao = true;
+    }
+  }
+
+  // Verifica se atravessa a mudança 121 -> 021
+  if (inicio >= transicao121para021_inicio && inicio <= transicao121para021_fim && 
+      final >= transicao121para021_nova) {
+    const numeroTermoUpper = numeroTermo.toUpperCase();
+    if (!numeroTermoUpper.includes('FUMCAD') && !numeroTermoUpper.includes('FMID')) {
+      ehTransicao = true;
+    }
+  }
+
+  if (ehTransicao) {
+    transicaoCheckbox.checked = true;
+    // Feedback visual
+    const transicaoLabel = document.querySelector('label[for="transicao"]');
+    transicaoLabel.style.color = '#ffc107';
+    transicaoLabel.innerHTML = '<i class="bi bi-exclamation-triangle"></i> É transição de Portaria?';
+    setTimeout(() => {
+      transicaoLabel.style.color = '';
+      transicaoLabel.textContent = 'É transição de Portaria?';
+    }, 5000);
+  }
+}
+
+// Chamar detecção ao alterar campos relevantes
+document.getElementById('inicio').addEventListener('change', detectarPortaria);
+document.getElementById('numero_termo').addEventListener('blur', detectarPortaria);
+document.getElementById('final').addEventListener('change', function() {
+  const dataInicio = document.getElementById('inicio').value;
+  const numeroTermo = document.getElementById('numero_termo').value;
+  if (dataInicio && numeroTermo && this.value) {
+    verificarTransicao(dataInicio, this.value, numeroTermo);
+  }
+});
+
+// ========== 5. AUTOSAVE (código anterior mantido) ==========
+window.addEventListener('DOMContentLoaded', function() {
+  // Carregar dados das APIs primeiro
+  carregarDados();
+
+  const savedData = localStorage.getItem(formId);
+  if (savedData) {
+    const data = JSON.parse(savedData);
+    const confirmRestore = confirm('Dados não salvos foram encontrados. Deseja restaurá-los?');
+
+    if (confirmRestore) {
+      // Restaurar todos os campos
+      Object.keys(data).forEach(key => {
+        const field = document.getElementById(key);
+        if (field) {
+          if (field.type === 'checkbox') {
+            field.checked = data[key];
+          } else {
+            field.value = data[key];
+          }
+        }
+      });
+
+      // Mostrar mensagem
+      const alertDiv = document.createElement('div');
+      alertDiv.className = 'alert alert-info alert-dismissible fade show';
+      alertDiv.innerHTML = `
+        <i class="bi bi-info-circle"></i> Dados restaurados do autosave (${new Date(data._timestamp).toLocaleString()})
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+      `;
+      document.querySelector('.form-container').insertBefore(alertDiv, document.querySelector('form'));
+    } else {
+      localStorage.removeItem(formId);
+    }
+  }
+});
+
+// Salvar dados automaticamente
+function autosaveForm() {
+  const formData = {};
+  const form = document.querySelector('form');
+  const inputs = form.querySelectorAll('input, select, textarea');
+
+  inputs.forEach(input => {
+    if (input.id && !input.disabled) {
+      if (input.type === 'checkbox') {
+        formData[input.id] = input.checked;
+      } else {
+        formData[input.id] = input.value;
+      }
+    }
+  });
+
+  formData._timestamp = Date.now();
+  localStorage.setItem(formId, JSON.stringify(formData));
+  lastSaved = Date.now();
+
+  // Mostrar indicador de salvamento
+  showSaveIndicator();
+}
+
+// Indicador visual de autosave
+function showSaveIndicator() {
+  let indicator = document.getElementById('saveIndicator');
+  if (!indicator) {
+    indicator = document.createElement('div');
+    indicator.id = 'saveIndicator';
+    indicator.style.cssText = 'position: fixed; bottom: 20px; right: 20px; background: #28a745; color: white; padding: 10px 20px; border-radius: 5px; z-index: 9999; display: none;';
+    indicator.innerHTML = '<i class="bi bi-check-circle"></i> Salvo automaticamente';
+    document.body.appendChild(indicator);
+  }
+
+  indicator.style.display = 'block';
+  setTimeout(() => {
+    indicator.style.display = 'none';
+  }, 2000);
+}
+
+// Observar mudanças no formulário
+document.querySelectorAll('input, select, textarea').forEach(element => {
+  element.addEventListener('input', function() {
+    // Cancelar timeout anterior
+    clearTimeout(autosaveTimeout);
+
+    // Criar novo timeout de 60 segundos
+    autosaveTimeout = setTimeout(autosaveForm, 60000);
+  });
+
+  // Salvar imediatamente ao sair do campo (blur)
+  element.addEventListener('blur', function() {
+    if (Date.now() - lastSaved > 5000) { // Só salvar se passou mais de 5 segundos
+      autosaveForm();
+    }
+  });
+});
+
+// Limpar autosave ao submeter o formulário
+document.querySelector('form').addEventListener('submit', function(e) {
+  // Validar datas antes de submeter
+  const inicioInput = document.getElementById('inicio');
+  const finalInput = document.getElementById('final');
+
+  if (inicioInput.value && finalInput.value) {
+    const dataInicio = new Date(inicioInput.value + 'T00:00:00');
+    const dataFinal = new Date(finalInput.value + 'T00:00:00');
+
+    if (dataFinal < dataInicio) {
+      e.preventDefault();
+      alert('❌ Erro: A data de término não pode ser anterior à data de início!');
+      finalInput.focus();
+      return false;
+    }
+  }
+
+  // Converter valores monetários formatados para números antes de enviar
+  document.querySelectorAll('.valor-monetario').forEach(input => {
+    const hiddenInput = document.getElementById(input.id + '_hidden');
+    if (hiddenInput) {
+      const valorNumerico = converterParaNumero(input.value);
+      hiddenInput.value = valorNumerico;
+    }
+  });
+
+  localStorage.removeItem(formId);
+});
+
+// ========== 6. FORMATAÇÃO MONETÁRIA ==========
+function formatarMoeda(valor) {
+  // Remove tudo que não é número
+  valor = valor.replace(/\D/g, '');
+
+  // Converte para centavos
+  valor = (parseInt(valor) / 100).toFixed(2);
+
+  // Formata com separadores brasileiros
+  valor = valor.replace('.', ',');
+  valor = valor.replace(/\B(?=(\d{3})+(?!\d))/g, '.');
+
+  return valor;
+}
+
+function converterParaNumero(valorFormatado) {
+  if (!valorFormatado) return '0';
+  // Remove pontos de milhar e substitui vírgula por ponto
+  return valorFormatado.replace(/\./g, '').replace(',', '.');
+}
+
+// Aplicar formatação monetária aos campos
+document.querySelectorAll('.valor-monetario').forEach(input => {
+  // Formatação ao digitar
+  input.addEventListener('input', function(e) {
+    let valor = e.target.value;
+    e.target.value = formatarMoeda(valor);
+
+    // Atualizar campo hidden
+    const hiddenInput = document.getElementById(e.target.id + '_hidden');
+    if (hiddenInput) {
+      hiddenInput.value = converterParaNumero(e.target.value);
+    }
+  });
+
+  // Formatação ao sair do campo
+  input.addEventListener('blur', function(e) {
+    if (!e.target.value || e.target.value === '') {
+      if (e.target.id === 'total_pago') {
+        e.target.value = '0,00';
+        const hiddenInput = document.getElementById(e.target.id + '_hidden');
+        if (hiddenInput) {
+          hiddenInput.value = '0';
+        }
+      }
+    }
+  });
+
+  // Inicializar campo hidden com valor inicial
+  const hiddenInput = document.getElementById(input.id + '_hidden');
+  if (hiddenInput) {
+    hiddenInput.value = converterParaNumero(input.value) || '0';
+  }
+});
+
+// Salvar periodicamente a cada 2 minutos
+setInterval(function() {
+  const form = document.querySelector('form');
+  const inputs = form.querySelectorAll('input, select, textarea');
+  let hasContent = false;
+
+  inputs.forEach(input => {
+    if (input.value && !input.disabled) {
+      hasContent = true;
+    }
+  });
+
+  if (hasContent) {
+    autosaveForm();
+  }
+}, 120000); // 2 minutos
+
+// Exportar para PDF
+function exportarPDF() {
+  const numeroTermo = dadosPagina.numeroTermo;
+
+  if (!numeroTermo) {
+    alert('Salve a parceria primeiro antes de exportar para PDF.');
+    return;
+  }
+
+  // Mostrar indicador de carregamento
+  const btnExportar = event.target.closest('button');
+  const textoOriginal = btnExportar.innerHTML;
+  btnExportar.disabled = true;
+  btnExportar.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Gerando PDF...';
+
+  // Fazer requisição para a API de exportação usando query string
+  window.location.href = `/parcerias/exportar-pdf?numero_termo=${encodeURIComponent(numeroTermo)}`;
+
+  // Restaurar botão após um tempo
+  setTimeout(() => {
+    btnExportar.disabled = false;
+    btnExportar.innerHTML = textoOriginal;
+  }, 2000);
+}
@@ -0,0 +1,160 @@
+// Tabela virtual das listagens com limite=todas (orcamento_1.html, parcerias.html)
+//
+// Só as linhas visíveis (mais uma folga) ficam no DOM; o espaço das demais é
+// ocupado por duas linhas espaçadoras. Os dados chegam em blocos de uma API
+// JSON ({total, inicio, linhas}) à medida que a rolagem alcança cada bloco.
+// As linhas precisam ter altura fixa (células sem quebra de linha): a altura
+// é medida na primeira linha desenhada.
+
+class TabelaVirtual {
+  constructor({ container, tbody, url, parametros, colunas, linha, alturaLinha = 41, bloco = 200, folga = 15, aoCarregar = null, vazia = 'Nenhum registro encontrado.' }) {
+    this.container = container;  // elemento com altura limitada e overflow-y: auto
+    this.tbody = tbody;
+    this.url = url;
+    this.parametros = new URLSearchParams(parametros);
+    this.colunas = colunas;
+    this.linha = linha;          // (valores) => HTML das células (<td>...</td>) de uma linha
+    this.alturaLinha = alturaLinha;
+    this.bloco = bloco;
+    this.folga = folga;
+    this.aoCarregar = aoCarregar;
+    this.vazia = vazia;
+
+    this.total = null;
+    this.blocos = new Map();     // número do bloco -> linhas, ou a Promise da requisição em andamento
+    this.geracao = 0;            // respostas de uma ordenação anterior são descartadas
+    this.medida = false;
+    this.agendado = false;
+    this.htmlAtual = '';
+
+    container.addEventListener('scroll', () => this.agendar(), { passive: true });
+    window.addEventListener('resize', () => this.agendar());
+  }
+
+  iniciar() {
+    return this.carregarBloco(0);
+  }
+
+  ordenar(ordem, direcao) {
+    this.parametros.set('ordem', ordem);
+    this.parametros.set('direcao', direcao);
+    this.blocos.clear();
+    this.geracao++;
+    this.total = null;
+    this.container.scrollTop = 0;
+    return this.iniciar();
+  }
+
+  agendar() {
+    if (this.agendado) return;
+    this.agendado = true;
+    requestAnimationFrame(() => {
+      this.agendado = false;
+      this.desenhar();
+    });
+  }
+
+  carregarBloco(numero) {
+    if (this.blocos.has(numero)) return this.blocos.get(numero);
+
+    const geracao = this.geracao;
+    const params = new URLSearchParams(this.parametros);
+    params.set('inicio', numero * this.bloco);
+    params.set('quantidade', this.bloco);
+
+    const requisicao = fetch(`${this.url}?${params}`, { headers: { 'Accept': 'application/json' } })
+      .then(r => {
+        if (!r.ok) throw new Error(`HTTP ${r.status}`);
+        return r.json();
+      })
+      .then(dados => {
+        if (geracao !== this.geracao) return;
+        this.blocos.set(numero, dados.linhas);
+        if (this.total !== dados.total) {
+          this.total = dados.total;
+          if (this.aoCarregar) this.aoCarregar(this.total);
+        }
+        this.agendar();
+      })
+      .catch(erro => {
+        if (geracao === this.geracao) this.blocos.delete(numero);
+        console.error('Erro ao carregar linhas da tabela:', erro);
+      });
+
+    this.blocos.set(numero, requisicao);
+    return requisicao;
+  }
+
+  espacador(altura) {
+    return `<tr aria-hidden="true"><td colspan="${this.colunas}" style="height:${altura}px;padding:0;border:0"></td></tr>`;
+  }
+
+  desenhar() {
+    if (this.total === null) return;
+
+    let html;
+    if (this.total === 0) {
+      html = `<tr><td colspan="${this.colunas}" class="text-center text-muted">${this.vazia}</td></tr>`;
+    } else {
+      const topo = this.container.scrollTop;
+      const primeira = Math.max(0, Math.floor(topo / this.alturaLinha) - this.folga);
+      const ultima = Math.min(this.total, Math.ceil((topo + this.container.clientHeight) / this.alturaLinha) + this.folga);
+
+      const partes = [this.espacador(primeira * this.alturaLinha)];
+      // Mantém a paridade das linhas (table-striped) igual à da tabela completa
+      if (primeira % 2 === 0) partes.push('<tr aria-hidden="true" style="display:none"></tr>');
+
+      for (let i = primeira; i < ultima; i++) {
+        const numero = Math.floor(i / this.bloco);
+        const linhas = this.blocos.get(numero);
+        if (Array.isArray(linhas) && i % this.bloco < linhas.length) {
+          partes.push(`<tr data-linha="${i}">${this.linha(linhas[i % this.bloco])}</tr>`);
+        } else {
+          if (!linhas) this.carregarBloco(numero);
+          partes.push(`<tr class="carregando"><td colspan="${this.colunas}" class="text-muted">Carregando...</td></tr>`);
+        }
+      }
+
+      partes.push(this.espacador((this.total - ultima) * this.alturaLinha));
+      html = partes.join('');
+    }
+
+    if (html !== this.htmlAtual) {
+      this.tbody.innerHTML = html;
+      this.htmlAtual = html;
+    }
+
+    // Ajusta a altura estimada à altura real da primeira linha desenhada
+    if (!this.medida) {
+      const tr = this.tbody.querySelector('tr[data-linha]');
+      if (tr) {
+        this.medida = true;
+        const altura = tr.getBoundingClientRect().height;
+        if (altura > 0 && Math.abs(altura - this.alturaLinha) > 0.5) {
+          this.alturaLinha = altura;
+          this.htmlAtual = '';
+          this.agendar();
+        }
+      }
+    }
+  }
+
+  static escapar(valor) {
+    return String(valor ?? '')
+      .replace(/&/g, '&amp;')
+      .replace(/</g, '&lt;')
+      .replace(/>/g, '&gt;')
+      .replace(/"/g, '&quot;')
+      .replace(/'/g, '&#39;');
+  }
+
+  // Texto de uma célula: '-' quando vazio, como nos templates
+  static texto(valor) {
+    return valor === null || valor === undefined || valor === '' ? '-' : TabelaVirtual.escapar(valor);
+  }
+
+  // Mesmo formato do filtro format_brl: 1551410.4 -> "1.551.410,40"
+  static moeda(valor) {
+    return Number(valor || 0).toLocaleString('pt-BR', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+  }
+}
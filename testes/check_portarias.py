@@ -0,0 +1,148 @@
+"""
+Confere o motor de portarias (portarias.py) contra a regra fixa antiga
+
+Até a migração 003 a portaria era escolhida por uma lista de regras fixa em
+main.portaria_automatica. Ela está reproduzida abaixo (portaria_antiga) como
+referência. O script percorre combinações de data de início × numero_termo
+(limites de vigência de cada legislação ±1 dia, dias 1 e 15 de cada mês, tipos
+e coordenações sintéticos e os termos cadastrados em Parcerias) e compara a
+resposta das duas implementações.
+
+Rodar de novo sempre que as regras de c_legislacao mudarem: as diferenças
+listadas devem ser exatamente as pretendidas com a mudança.
+
+    python testes/check_portarias.py [local|railway]
+
+Sai com código 1 se houver diferença.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from db import conectar
+from portarias import carregar
+
+# Regras fixas de main.portaria_automatica antes da migração 003
+REGRAS_ANTIGAS = [
+    {'lei': 'Decreto nº 6.170', 'inicio': '2007-07-25', 'termino': '2008-08-11',
+     'regra_termo': ['TCV'], 'regra_coordenacao': []},
+    {'lei': 'Portaria nº 006/2008/SF-SEMPLA', 'inicio': '2008-08-12', 'termino': '2012-03-21',
+     'regra_termo': ['TCV'], 'regra_coordenacao': []},
+    {'lei': 'Portaria nº 072/SMPP/2012', 'inicio': '2012-03-22', 'termino': '2014-05-21',
+     'regra_termo': ['TCV'], 'regra_coordenacao': ['FUMCAD']},
+    {'lei': 'Portaria nº 009/SMDHC/2014', 'inicio': '2014-05-22', 'termino': '2017-09-30',
+     'regra_termo': ['TCV'], 'regra_coordenacao': ['FUMCAD']},
+    {'lei': 'Portaria nº 121/SMDHC/2019', 'inicio': '2017-10-01', 'termino': '2023-02-28',
+     'regra_termo': ['TFM', 'TCL'], 'regra_coordenacao': []},
+    {'lei': 'Portaria nº 140/SMDHC/2019', 'inicio': '2017-10-01', 'termino': '2023-12-31',
+     'regra_termo': ['TFM', 'TCL'], 'regra_coordenacao': ['FUMCAD', 'FMID']},
+    {'lei': 'Portaria nº 021/SMDHC/2023', 'inicio': '2023-03-01', 'termino': '2030-12-31',
+     'regra_termo': ['TFM', 'TCL'], 'regra_coordenacao': []},
+    {'lei': 'Portaria nº 090/SMDHC/2023', 'inicio': '2024-01-01', 'termino': '2030-12-31',
+     'regra_termo': ['TFM', 'TCL'], 'regra_coordenacao': ['FUMCAD', 'FMID']},
+]
+
+TIPOS = ['', 'TCV', 'TFM', 'TCL', 'TCV/TFM']
+COORDENACOES = ['', 'FUMCAD', 'FMID', 'FUMCAD/FMID']
+
+
+def portaria_antiga(data_inicio, numero_termo):
+    """
+    Corpo de main.portaria_automatica antes da migração 003 (data_inicio em 'AAAA-MM-DD').
+    """
+    regras = REGRAS_ANTIGAS
+    numero_termo_upper = numero_termo.upper()
+    tem_tfm_tcl = 'TFM' in numero_termo_upper or 'TCL' in numero_termo_upper
+    tem_fumcad = 'FUMCAD' in numero_termo_upper
+    tem_fmid = 'FMID' in numero_termo_upper
+    tem_tcv = 'TCV' in numero_termo_upper
+
+    for regra in regras:
+        if data_inicio < regra['inicio'] or data_inicio > regra['termino']:
+            continue
+
+        if tem_tfm_tcl and not any(t in regra['regra_termo'] for t in ['TFM', 'TCL']):
+            continue
+        if tem_tcv and 'TCV' not in regra['regra_termo']:
+            continue
+
+        if tem_fumcad or tem_fmid:
+            if tem_fumcad and 'FUMCAD' not in regra['regra_coordenacao']:
+                continue
+            if tem_fmid and 'FMID' not in regra['regra_coordenacao']:
+                continue
+        else:
+            if regra['regra_coordenacao']:
+                outras_opcoes = [
+                    r for r in regras
+                    if data_inicio >= r['inicio'] and data_inicio <= r['termino']
+                    and not r['regra_coordenacao']
+                ]
+                if outras_opcoes:
+                    continue
+
+        return regra['lei']
+    return None
+
+
+def datas_da_varredura():
+    """
+    Limites de vigência (±1 dia) das regras antigas e dias 1 e 15 de cada mês de 2006 a 2031.
+    """
+    datas = set()
+    for regra in REGRAS_ANTIGAS:
+        for limite in (date.fromisoformat(regra['inicio']), date.fromisoformat(regra['termino'])):
+            datas.update(limite + timedelta(days=d) for d in (-1, 0, 1))
+    for ano in range(2006, 2032):
+        for mes in range(1, 13):
+            datas.update((date(ano, mes, 1), date(ano, mes, 15)))
+    return sorted(datas)
+
+
+def termos_da_varredura(conn):
+    """
+    Números sintéticos (tipo × coordenação) e os termos cadastrados em Parcerias.
+    """
+    termos = {
+        '/'.join(parte for parte in (tipo, '001/2020/SMDHC', coordenacao) if parte)
+        for tipo in TIPOS for coordenacao in COORDENACOES
+    }
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT numero_termo FROM Parcerias WHERE numero_termo IS NOT NULL")
+    termos.update(row[0] for row in cur.fetchall())
+    cur.close()
+    return sorted(termos)
+
+
+def main():
+    banco = sys.argv[1] if len(sys.argv) > 1 else 'railway'
+    conn = conectar(banco)
+    try:
+        indice = carregar(conn)
+        termos = termos_da_varredura(conn)
+    finally:
+        conn.close()
+
+    datas = datas_da_varredura()
+    diferencas = []
+    for data_inicio in datas:
+        for numero_termo in termos:
+            antiga = portaria_antiga(data_inicio.isoformat(), numero_termo)
+            nova = indice.resolver(data_inicio, numero_termo)
+            if antiga != nova:
+                diferencas.append((data_inicio, numero_termo, antiga, nova))
+
+    print(f"Banco {banco.upper()}: {len(datas)} datas x {len(termos)} termos = {len(datas) * len(termos)} combinações")
+    for data_inicio, numero_termo, antiga, nova in diferencas[:50]:
+        print(f"  {data_inicio} {numero_termo}: antiga={antiga!r} nova={nova!r}")
+    if len(diferencas) > 50:
+        print(f"  ... e mais {len(diferencas) - 50}")
+    print(f"{len(diferencas)} diferença(s)")
+    return 1 if diferencas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
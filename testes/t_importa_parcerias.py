@@ -1,10 +1,15 @@
 # importa_parcerias.py
 import sqlite3
+import sys
 import pandas as pd
 import re
 from pathlib import Path
 from decimal import Decimal, getcontext
 
+# Funções de conversão compartilhadas com a importação em lote (importacao.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from importacao import parse_date_general, parse_number_br, parse_int, parse_boolean
+
 # Configurar precisão alta para decimal
 getcontext().prec = 50
 
@@ -103,71 +108,6 @@ def parse_long_number(val):
     s = re.sub(r'\D', '', s)
     return s or None
 
-def parse_date_general(val):
-    """
-    Aceita:
-    - strings no formato ISO 'YYYY-MM-DD' -> retorna igual se válido
-    - strings em 'DD/MM/YYYY' -> converte para 'YYYY-MM-DD'
-    - objetos datetime ou outros formatos reconhecidos por pandas
-    """
-    if val is None:
-        return None
-    s = str(val).strip()
-    if s == "":
-        return None
-    # já em ISO?
-    if re.match(r'^\d{4}-\d{2}-\d{2}$', s):
-        return s
-    # tentar parse com pandas (dayfirst True lida com dd/mm/YYYY)
-    dt = pd.to_datetime(s, dayfirst=True, errors='coerce')
-    if pd.isna(dt):
-        return None
-    return dt.strftime("%Y-%m-%d")
-
-def parse_number_br(val):
-    if val is None:
-        return None
-    s = str(val).strip()
-    if s == "":
-        return None
-    # remover espaços
-    s = s.replace(" ", "")
-    # remover pontos de milhar prováveis (ex: 1.234 -> 1234) - tentativa conservadora
-    s = re.sub(r'\.(?=\d{3}(?:[^\d]|$))', '', s)
-    s = s.replace(',', '.')
-    # remover símbolos de moeda, se houver
-    s = re.sub(r'[^\d\.\-]', '', s)
-    if s == "" or s == ".":
-        return None
-    try:
-        return float(s)
-    except:
-        return None
-
-def parse_int(val):
-    if val is None:
-        return None
-    s = str(val).strip()
-    if s == "":
-        return None
-    s = re.sub(r'\D', '', s)
-    if s == "":
-        return None
-    try:
-        return int(s)
-    except:
-        return None
-
-def parse_boolean(val):
-    if val is None:
-        return None
-    s = str(val).strip().lower()
-    if s in {"1","true","t","sim","s","yes","y"}:
-        return 1
-    if s in {"0","false","f","nao","não","n","no"}:
-        return 0
-    return None
-
 # --- 4) Aplicar conversões nas colunas presentes
 conversions = {
     "cnpj": parse_long_number,  # mudança: usar parse_long_number para CNPJ
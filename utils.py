@@ -38,3 +38,23 @@ def login_required(f):
             return redirect(url_for("auth.login"))
         return f(*args, **kwargs)
     return decorated
+
+
+# Tamanho máximo de uma janela de linhas das listagens em JSON (limite=todas)
+JANELA_MAXIMA = 500
+
+
+def parametros_janela(args, padrao=200):
+    """
+    Lê inicio/quantidade da janela de linhas pedida por uma listagem virtual.
+    Retorna (inicio, quantidade), com quantidade entre 1 e JANELA_MAXIMA.
+    """
+    try:
+        inicio = max(0, int(args.get('inicio', 0)))
+    except ValueError:
+        inicio = 0
+    try:
+        quantidade = min(JANELA_MAXIMA, max(1, int(args.get('quantidade', padrao))))
+    except ValueError:
+        quantidade = padrao
+    return inicio, quantidade